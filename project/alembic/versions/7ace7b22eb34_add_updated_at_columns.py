@@ -0,0 +1,167 @@
+"""add updated_at columns
+
+Revision ID: 7ace7b22eb34
+Revises: fefdca9b73bc
+Create Date: 2026-10-19 19:54:54.236851
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7ace7b22eb34'
+down_revision: Union[str, None] = 'fefdca9b73bc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 'updated_at' is set by the database on every change to a row, whichever way
+# the row is changed. The rows existing before this migration get its time,
+# the latest they may have been changed at. The notes are also touched when
+# their tags, or the names of these tags, change, as both are part of a note.
+#
+# The times are read from the clock when the row is written, not at the start
+# of the transaction like now(), and only ever grow for a row: a transaction
+# that started earlier but writes later must not set a time older than the one
+# a client already read, or the change would be missed by If-Modified-Since
+# and 'updated_since'.
+CREATE_FUNCTIONS = [
+    """
+CREATE FUNCTION set_updated_at() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := greatest(
+        OLD.updated_at + interval '1 microsecond', clock_timestamp()
+    );
+    RETURN NEW;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION notes_touch_notes_tags_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- the notes already written by this transaction are left as they are
+    IF TG_OP = 'INSERT' THEN
+        UPDATE notes SET updated_at = clock_timestamp()
+        WHERE id IN (SELECT note_id FROM new_links)
+          AND xmin <> pg_current_xact_id()::xid;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE notes SET updated_at = clock_timestamp()
+        WHERE id IN (SELECT note_id FROM old_links)
+          AND xmin <> pg_current_xact_id()::xid;
+    ELSE
+        UPDATE notes SET updated_at = clock_timestamp()
+        WHERE id IN (SELECT note_id FROM old_links UNION SELECT note_id FROM new_links)
+          AND xmin <> pg_current_xact_id()::xid;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION notes_touch_tags_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE notes SET updated_at = clock_timestamp()
+    WHERE id IN (
+        SELECT l.note_id
+        FROM new_tags t
+        JOIN old_tags o ON o.id = t.id
+        JOIN notes_tags l ON l.tag_id = t.id
+        WHERE t.name <> o.name
+    )
+      AND xmin <> pg_current_xact_id()::xid;
+    RETURN NULL;
+END;
+$$;
+""",
+]
+
+CREATE_TRIGGERS = [
+    """
+CREATE TRIGGER set_updated_at BEFORE UPDATE ON projects
+FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE FUNCTION set_updated_at();
+""",
+    """
+CREATE TRIGGER set_updated_at BEFORE UPDATE ON notes
+FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE FUNCTION set_updated_at();
+""",
+    """
+CREATE TRIGGER set_updated_at BEFORE UPDATE ON project_stats
+FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*)
+EXECUTE FUNCTION set_updated_at();
+""",
+    """
+CREATE TRIGGER notes_touch_insert AFTER INSERT ON notes_tags
+REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION notes_touch_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER notes_touch_update AFTER UPDATE ON notes_tags
+REFERENCING OLD TABLE AS old_links NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION notes_touch_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER notes_touch_delete AFTER DELETE ON notes_tags
+REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE FUNCTION notes_touch_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER notes_touch_update AFTER UPDATE ON tags
+REFERENCING OLD TABLE AS old_tags NEW TABLE AS new_tags
+FOR EACH STATEMENT EXECUTE FUNCTION notes_touch_tags_trigger();
+""",
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER notes_touch_update ON tags;",
+    "DROP TRIGGER notes_touch_delete ON notes_tags;",
+    "DROP TRIGGER notes_touch_update ON notes_tags;",
+    "DROP TRIGGER notes_touch_insert ON notes_tags;",
+    "DROP TRIGGER set_updated_at ON project_stats;",
+    "DROP TRIGGER set_updated_at ON notes;",
+    "DROP TRIGGER set_updated_at ON projects;",
+    "DROP FUNCTION notes_touch_tags_trigger();",
+    "DROP FUNCTION notes_touch_notes_tags_trigger();",
+    "DROP FUNCTION set_updated_at();",
+]
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column('notes', sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_notes_project_id_updated_at', 'notes', ['project_id', 'updated_at'], unique=False)
+    op.add_column('project_stats', sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('projects', sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False))
+    # ### end Alembic commands ###
+    # the existing rows get the time of the migration, the new ones the time
+    # they are written at: a volatile default in ADD COLUMN would rewrite the
+    # tables
+    for table in ('notes', 'project_stats', 'projects'):
+        op.alter_column(table, 'updated_at', server_default=sa.text('clock_timestamp()'))
+    # the defaults of 'created_at' used to be the time the application started
+    op.alter_column('projects', 'created_at', server_default=sa.text('now()'))
+    op.alter_column('notes', 'created_at', server_default=sa.text('now()'))
+    for statement in CREATE_FUNCTIONS:
+        op.execute(statement)
+    for statement in CREATE_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DROP_TRIGGERS:
+        op.execute(statement)
+    op.alter_column('notes', 'created_at', server_default=None)
+    op.alter_column('projects', 'created_at', server_default=None)
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_column('projects', 'updated_at')
+    op.drop_column('project_stats', 'updated_at')
+    op.drop_index('ix_notes_project_id_updated_at', table_name='notes')
+    op.drop_column('notes', 'updated_at')
+    # ### end Alembic commands ###
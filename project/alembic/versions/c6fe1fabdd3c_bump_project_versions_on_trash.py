@@ -0,0 +1,65 @@
+"""bump project versions on trash
+
+Revision ID: c6fe1fabdd3c
+Revises: 7ace7b22eb34
+Create Date: 2026-10-19 20:15:56.469706
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6fe1fabdd3c'
+down_revision: Union[str, None] = '7ace7b22eb34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Moving a project to the trash, or restoring it, also gives it a new version:
+# the live projects are identified by their greatest version and their number,
+# which would otherwise stay the same when one project is trashed and another
+# one, holding neither the greatest version, is restored.
+CREATE_FUNCTIONS = [
+    """
+CREATE FUNCTION project_versions_projects_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM project_versions_bump(ARRAY(
+        SELECT n.id
+        FROM new_projects n
+        JOIN old_projects o ON o.id = n.id
+        WHERE n.deleted_at IS DISTINCT FROM o.deleted_at
+    ));
+    RETURN NULL;
+END;
+$$;
+""",
+]
+
+CREATE_TRIGGERS = [
+    """
+CREATE TRIGGER project_versions_update AFTER UPDATE ON projects
+REFERENCING OLD TABLE AS old_projects NEW TABLE AS new_projects
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_projects_trigger();
+""",
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER project_versions_update ON projects;",
+    "DROP FUNCTION project_versions_projects_trigger();",
+]
+
+
+def upgrade() -> None:
+    for statement in CREATE_FUNCTIONS:
+        op.execute(statement)
+    for statement in CREATE_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DROP_TRIGGERS:
+        op.execute(statement)
@@ -0,0 +1,355 @@
+"""add project stats
+
+Revision ID: f167cb8c0c7d
+Revises: 270635fa8ef2
+Create Date: 2026-10-19 19:05:52.679954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f167cb8c0c7d'
+down_revision: Union[str, None] = '270635fa8ef2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Only live notes (deleted_at IS NULL) are counted. Every trigger is a
+# statement-level trigger with transition tables, so that bulk statements
+# (imports, bulk tag updates, purges) update every project once, except the
+# row-level trigger subtracting the tags of a deleted note, whose notes_tags
+# rows are removed by the ON DELETE CASCADE foreign key once the note, and
+# with it its project id, is gone.
+CREATE_FUNCTIONS = [
+    """
+CREATE FUNCTION project_stats_count_notes(removed notes[], added notes[])
+RETURNS void LANGUAGE sql AS $$
+    -- rows are locked in project order, so that concurrent statements
+    -- touching the same projects cannot deadlock
+    SELECT 1 FROM project_stats
+    WHERE project_id IN (
+        SELECT project_id FROM unnest(removed)
+        UNION SELECT project_id FROM unnest(added)
+    )
+    ORDER BY project_id
+    FOR UPDATE;
+
+    UPDATE project_stats s
+    SET note_count = s.note_count + d.note_count,
+        latest_note_at = greatest(s.latest_note_at, d.latest_note_at),
+        min_publication_year = least(s.min_publication_year, d.min_year),
+        max_publication_year = greatest(s.max_publication_year, d.max_year)
+    FROM (
+        SELECT project_id,
+               sum(n) AS note_count,
+               max(created_at) AS latest_note_at,
+               min(publication_year) AS min_year,
+               max(publication_year) AS max_year
+        FROM (
+            SELECT project_id, -1 AS n, NULL::timestamptz AS created_at,
+                   NULL::integer AS publication_year
+            FROM unnest(removed)
+            UNION ALL
+            SELECT project_id, 1, created_at, publication_year FROM unnest(added)
+        ) AS changes
+        GROUP BY project_id
+    ) AS d
+    WHERE s.project_id = d.project_id;
+
+    -- the extremes cannot be decremented: when a removed note held one of
+    -- them, they are computed again from the remaining live notes
+    UPDATE project_stats s
+    SET (latest_note_at, min_publication_year, max_publication_year) = (
+        SELECT max(created_at), min(publication_year), max(publication_year)
+        FROM notes
+        WHERE project_id = s.project_id AND deleted_at IS NULL
+    )
+    WHERE s.project_id IN (
+        SELECT r.project_id
+        FROM unnest(removed) AS r
+        JOIN project_stats p ON p.project_id = r.project_id
+        WHERE r.created_at >= p.latest_note_at
+           OR r.publication_year <= p.min_publication_year
+           OR r.publication_year >= p.max_publication_year
+    );
+$$;
+""",
+    """
+CREATE FUNCTION project_stats_count_tags(
+    project_ids integer[], tag_ids integer[], delta integer
+)
+RETURNS void LANGUAGE sql AS $$
+    SELECT 1 FROM project_stats
+    WHERE project_id = ANY(project_ids)
+    ORDER BY project_id
+    FOR UPDATE;
+
+    WITH deltas AS (
+        SELECT project_id, tag_id, count(*)::integer * delta AS n
+        FROM unnest(project_ids, tag_ids) AS d(project_id, tag_id)
+        GROUP BY project_id, tag_id
+    ),
+    counted AS (
+        INSERT INTO project_tag_counts AS c (project_id, tag_id, note_count)
+        SELECT project_id, tag_id, n FROM deltas WHERE delta > 0
+        ORDER BY project_id, tag_id
+        ON CONFLICT (project_id, tag_id)
+        DO UPDATE SET note_count = c.note_count + excluded.note_count
+        -- xmax is 0 for the rows the upsert inserted rather than updated
+        RETURNING c.project_id, (c.xmax = 0) AS is_new
+    ),
+    uncounted AS (
+        UPDATE project_tag_counts c
+        SET note_count = c.note_count + d.n
+        FROM deltas d
+        WHERE delta < 0 AND c.project_id = d.project_id AND c.tag_id = d.tag_id
+        RETURNING c.project_id, (c.note_count <= 0) AS is_gone
+    )
+    UPDATE project_stats s
+    SET tag_count = s.tag_count + d.n
+    FROM (
+        SELECT project_id, sum(n) AS n
+        FROM (
+            SELECT project_id, 1 AS n FROM counted WHERE is_new
+            UNION ALL
+            SELECT project_id, -1 FROM uncounted WHERE is_gone
+        ) AS changes
+        GROUP BY project_id
+    ) AS d
+    WHERE s.project_id = d.project_id;
+
+    DELETE FROM project_tag_counts c
+    USING unnest(project_ids, tag_ids) AS d(project_id, tag_id)
+    WHERE c.project_id = d.project_id
+      AND c.tag_id = d.tag_id
+      AND c.note_count <= 0;
+$$;
+""",
+    """
+CREATE FUNCTION project_stats_projects_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO project_stats (project_id) SELECT id FROM new_projects;
+    RETURN NULL;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION project_stats_notes_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM project_stats_count_notes(
+            '{}', (SELECT array_agg(ROW(n.*)::notes) FROM new_notes n WHERE n.deleted_at IS NULL)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM project_stats_count_notes(
+            (SELECT array_agg(ROW(o.*)::notes) FROM old_notes o WHERE o.deleted_at IS NULL), '{}'
+        );
+    ELSE
+        -- only the notes moved to or out of the trash, or whose counted
+        -- columns changed, are counted again
+        PERFORM project_stats_count_notes(
+            array_agg(ROW(o.*)::notes) FILTER (WHERE o.deleted_at IS NULL),
+            array_agg(ROW(n.*)::notes) FILTER (WHERE n.deleted_at IS NULL)
+        )
+        FROM old_notes o JOIN new_notes n ON n.id = o.id
+        WHERE (o.deleted_at IS NULL) <> (n.deleted_at IS NULL)
+           OR o.project_id <> n.project_id
+           OR o.created_at IS DISTINCT FROM n.created_at
+           OR o.publication_year IS DISTINCT FROM n.publication_year;
+
+        PERFORM project_stats_count_tags(
+            array_agg(o.project_id), array_agg(l.tag_id), -1
+        )
+        FROM old_notes o
+        JOIN new_notes n ON n.id = o.id
+        JOIN notes_tags l ON l.note_id = o.id
+        WHERE o.deleted_at IS NULL
+          AND (n.deleted_at IS NOT NULL OR n.project_id <> o.project_id);
+
+        PERFORM project_stats_count_tags(
+            array_agg(n.project_id), array_agg(l.tag_id), 1
+        )
+        FROM old_notes o
+        JOIN new_notes n ON n.id = o.id
+        JOIN notes_tags l ON l.note_id = n.id
+        WHERE n.deleted_at IS NULL
+          AND (o.deleted_at IS NOT NULL OR n.project_id <> o.project_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION project_stats_note_deleted_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM project_stats_count_tags(
+        array_agg(OLD.project_id), array_agg(tag_id), -1
+    )
+    FROM notes_tags
+    WHERE note_id = OLD.id
+      -- the tag counts are deleted with the project, the note may be one of
+      -- its notes deleted by the ON DELETE CASCADE foreign key
+      AND EXISTS (SELECT FROM projects WHERE id = OLD.project_id);
+    RETURN OLD;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION project_stats_notes_tags_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- the links of deleted notes are not found in 'notes' any more, they
+    -- were subtracted by project_stats_note_deleted_trigger
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM project_stats_count_tags(
+            array_agg(n.project_id), array_agg(l.tag_id), -1
+        )
+        FROM old_links l JOIN notes n ON n.id = l.note_id
+        WHERE n.deleted_at IS NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM project_stats_count_tags(
+            array_agg(n.project_id), array_agg(l.tag_id), 1
+        )
+        FROM new_links l JOIN notes n ON n.id = l.note_id
+        WHERE n.deleted_at IS NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+""",
+    """
+-- computes all the figures from scratch, used to fill the tables and after
+-- bulk loads run with the triggers disabled
+CREATE FUNCTION project_stats_refresh() RETURNS void LANGUAGE sql AS $$
+    DELETE FROM project_tag_counts;
+    DELETE FROM project_stats;
+
+    INSERT INTO project_tag_counts (project_id, tag_id, note_count)
+    SELECT n.project_id, l.tag_id, count(*)
+    FROM notes_tags l JOIN notes n ON n.id = l.note_id
+    WHERE n.deleted_at IS NULL
+    GROUP BY n.project_id, l.tag_id;
+
+    INSERT INTO project_stats (
+        project_id, note_count, tag_count, latest_note_at,
+        min_publication_year, max_publication_year
+    )
+    SELECT p.id,
+           count(n.id),
+           coalesce(
+               (SELECT count(*) FROM project_tag_counts c
+                WHERE c.project_id = p.id), 0
+           ),
+           max(n.created_at),
+           min(n.publication_year),
+           max(n.publication_year)
+    FROM projects p
+    LEFT JOIN notes n ON n.project_id = p.id AND n.deleted_at IS NULL
+    GROUP BY p.id;
+$$;
+""",
+]
+
+CREATE_TRIGGERS = [
+    """
+CREATE TRIGGER project_stats_insert AFTER INSERT ON projects
+REFERENCING NEW TABLE AS new_projects
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_projects_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_insert AFTER INSERT ON notes
+REFERENCING NEW TABLE AS new_notes
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_notes_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_update AFTER UPDATE ON notes
+REFERENCING OLD TABLE AS old_notes NEW TABLE AS new_notes
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_notes_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_delete AFTER DELETE ON notes
+REFERENCING OLD TABLE AS old_notes
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_notes_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_delete_tags BEFORE DELETE ON notes
+FOR EACH ROW WHEN (OLD.deleted_at IS NULL)
+EXECUTE FUNCTION project_stats_note_deleted_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_insert AFTER INSERT ON notes_tags
+REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_update AFTER UPDATE ON notes_tags
+REFERENCING OLD TABLE AS old_links NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER project_stats_delete AFTER DELETE ON notes_tags
+REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE FUNCTION project_stats_notes_tags_trigger();
+""",
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER project_stats_delete ON notes_tags;",
+    "DROP TRIGGER project_stats_update ON notes_tags;",
+    "DROP TRIGGER project_stats_insert ON notes_tags;",
+    "DROP TRIGGER project_stats_delete_tags ON notes;",
+    "DROP TRIGGER project_stats_delete ON notes;",
+    "DROP TRIGGER project_stats_update ON notes;",
+    "DROP TRIGGER project_stats_insert ON notes;",
+    "DROP TRIGGER project_stats_insert ON projects;",
+    "DROP FUNCTION project_stats_refresh();",
+    "DROP FUNCTION project_stats_notes_tags_trigger();",
+    "DROP FUNCTION project_stats_note_deleted_trigger();",
+    "DROP FUNCTION project_stats_notes_trigger();",
+    "DROP FUNCTION project_stats_projects_trigger();",
+    "DROP FUNCTION project_stats_count_tags(integer[], integer[], integer);",
+    "DROP FUNCTION project_stats_count_notes(notes[], notes[]);",
+]
+
+
+def upgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('note_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('tag_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('latest_note_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.Column('min_publication_year', sa.Integer(), nullable=True),
+    sa.Column('max_publication_year', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], name=op.f('fk_project_stats_project_id_projects'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id', name=op.f('pk_project_stats'))
+    )
+    op.create_table('project_tag_counts',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.Column('note_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], name=op.f('fk_project_tag_counts_project_id_projects'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id', 'tag_id', name=op.f('pk_project_tag_counts'))
+    )
+    # ### end Alembic commands ###
+    for statement in CREATE_FUNCTIONS:
+        op.execute(statement)
+    op.execute("SELECT project_stats_refresh()")
+    for statement in CREATE_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DROP_TRIGGERS:
+        op.execute(statement)
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('project_tag_counts')
+    op.drop_table('project_stats')
+    # ### end Alembic commands ###
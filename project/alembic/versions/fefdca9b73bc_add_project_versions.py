@@ -0,0 +1,176 @@
+"""add project versions
+
+Revision ID: fefdca9b73bc
+Revises: fc47f1dcc951
+Create Date: 2026-10-19 19:42:44.688424
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fefdca9b73bc'
+down_revision: Union[str, None] = 'fc47f1dcc951'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Every statement changing the notes of a project, their tags, or the names of
+# these tags gives the project a new version from the 'project_versions'
+# sequence, in the same transaction, once per statement. Versions only grow,
+# also across projects, so that the greatest version and the number of
+# projects identify the state of all the projects.
+CREATE_FUNCTIONS = [
+    """
+CREATE FUNCTION project_versions_bump(project_ids integer[])
+RETURNS void LANGUAGE sql AS $$
+    -- rows are locked in project order, like project_stats_count_notes does
+    SELECT 1 FROM project_stats
+    WHERE project_id = ANY(project_ids)
+    ORDER BY project_id
+    FOR UPDATE;
+
+    UPDATE project_stats
+    SET version = nextval('project_versions')
+    WHERE project_id = ANY(project_ids);
+$$;
+""",
+    """
+CREATE FUNCTION project_versions_notes_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM project_versions_bump(
+            ARRAY(SELECT DISTINCT project_id FROM new_notes)
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM project_versions_bump(
+            ARRAY(SELECT DISTINCT project_id FROM old_notes)
+        );
+    ELSE
+        PERFORM project_versions_bump(
+            ARRAY(SELECT project_id FROM old_notes UNION SELECT project_id FROM new_notes)
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION project_versions_notes_tags_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- the links of deleted notes are not found in 'notes' any more, the
+    -- deletion of the notes changed the versions already
+    IF TG_OP = 'INSERT' THEN
+        PERFORM project_versions_bump(ARRAY(
+            SELECT DISTINCT n.project_id
+            FROM new_links l JOIN notes n ON n.id = l.note_id
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM project_versions_bump(ARRAY(
+            SELECT DISTINCT n.project_id
+            FROM old_links l JOIN notes n ON n.id = l.note_id
+        ));
+    ELSE
+        PERFORM project_versions_bump(ARRAY(
+            SELECT n.project_id FROM old_links l JOIN notes n ON n.id = l.note_id
+            UNION
+            SELECT n.project_id FROM new_links l JOIN notes n ON n.id = l.note_id
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+""",
+    """
+CREATE FUNCTION project_versions_tags_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM project_versions_bump(ARRAY(
+        SELECT DISTINCT c.project_id
+        FROM new_tags t
+        JOIN old_tags o ON o.id = t.id
+        JOIN project_tag_counts c ON c.tag_id = t.id
+        WHERE t.name <> o.name
+    ));
+    RETURN NULL;
+END;
+$$;
+""",
+]
+
+CREATE_TRIGGERS = [
+    """
+CREATE TRIGGER project_versions_insert AFTER INSERT ON notes
+REFERENCING NEW TABLE AS new_notes
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_notes_trigger();
+""",
+    """
+CREATE TRIGGER project_versions_update AFTER UPDATE ON notes
+REFERENCING OLD TABLE AS old_notes NEW TABLE AS new_notes
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_notes_trigger();
+""",
+    """
+CREATE TRIGGER project_versions_delete AFTER DELETE ON notes
+REFERENCING OLD TABLE AS old_notes
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_notes_trigger();
+""",
+    """
+CREATE TRIGGER project_versions_insert AFTER INSERT ON notes_tags
+REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER project_versions_update AFTER UPDATE ON notes_tags
+REFERENCING OLD TABLE AS old_links NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER project_versions_delete AFTER DELETE ON notes_tags
+REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_notes_tags_trigger();
+""",
+    """
+CREATE TRIGGER project_versions_update AFTER UPDATE ON tags
+REFERENCING OLD TABLE AS old_tags NEW TABLE AS new_tags
+FOR EACH STATEMENT EXECUTE FUNCTION project_versions_tags_trigger();
+""",
+]
+
+DROP_TRIGGERS = [
+    "DROP TRIGGER project_versions_update ON tags;",
+    "DROP TRIGGER project_versions_delete ON notes_tags;",
+    "DROP TRIGGER project_versions_update ON notes_tags;",
+    "DROP TRIGGER project_versions_insert ON notes_tags;",
+    "DROP TRIGGER project_versions_delete ON notes;",
+    "DROP TRIGGER project_versions_update ON notes;",
+    "DROP TRIGGER project_versions_insert ON notes;",
+    "DROP FUNCTION project_versions_tags_trigger();",
+    "DROP FUNCTION project_versions_notes_tags_trigger();",
+    "DROP FUNCTION project_versions_notes_trigger();",
+    "DROP FUNCTION project_versions_bump(integer[]);",
+]
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence('project_versions')))
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.add_column('project_stats', sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('project_versions')"), nullable=False))
+    # ### end Alembic commands ###
+    for statement in CREATE_FUNCTIONS:
+        op.execute(statement)
+    for statement in CREATE_TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DROP_TRIGGERS:
+        op.execute(statement)
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_column('project_stats', 'version')
+    # ### end Alembic commands ###
+    op.execute(sa.schema.DropSequence(sa.Sequence('project_versions')))
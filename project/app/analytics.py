@@ -0,0 +1,38 @@
+"""
+Analytics computed from the notes of the projects and their tags.
+
+Results are cached together with the version of the projects they were
+computed from, see ProjectStats.version: the version is read with a cheap
+query on every request, and a cached result is only served while it matches,
+so it is never served for projects changed since, even by another process.
+"""
+
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.cache import LRUCache
+
+ANALYTICS_CACHE_SIZE = 1_000
+
+# (kind, parameters...) -> (version, result)
+analytics_cache: LRUCache[tuple[Hashable, ...], tuple[Hashable, Any]] = LRUCache(
+    ANALYTICS_CACHE_SIZE
+)
+
+
+async def get_cached(
+    key: tuple[Hashable, ...],
+    version: Hashable,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Returns the result cached for 'key' if it was computed at 'version',
+    otherwise computes it with 'compute' and caches it.
+    """
+    cached = analytics_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    result = await compute()
+    analytics_cache.set(key, (version, result))
+
+    return result
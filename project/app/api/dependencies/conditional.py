@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Annotated
+
+from fastapi import Depends, Header, Response
+
+
+def get_if_modified_since(
+    if_modified_since: Annotated[str | None, Header()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+) -> datetime | None:
+    """
+    Returns the time of the If-Modified-Since header, or None if there is no
+    valid one. The header is ignored when If-None-Match is also sent, which
+    then decides alone.
+    """
+    if if_modified_since is None or if_none_match is not None:
+        return None
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return None
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    return since
+
+
+IfModifiedSinceDep = Annotated[datetime | None, Depends(get_if_modified_since)]
+
+
+def is_not_modified(
+    last_modified: datetime, if_modified_since: datetime | None
+) -> bool:
+    # HTTP dates have no fractions of a second
+    return (
+        if_modified_since is not None
+        and last_modified.replace(microsecond=0) <= if_modified_since
+    )
+
+
+def last_modified_header(last_modified: datetime) -> str:
+    return format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_response(last_modified: datetime) -> Response:
+    return Response(
+        status_code=304, headers={"Last-Modified": last_modified_header(last_modified)}
+    )
@@ -0,0 +1,155 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, HTTPException, Path, Query
+
+from app.analytics import analytics_cache, get_cached
+from app.api.dependencies.core import DBSessionDep
+from app.crud.analytics import (
+    get_project_version,
+    get_projects_analytics,
+    get_projects_version,
+    get_projects_versions,
+    get_tag_cooccurrences,
+)
+from app.schemas.analytics import (
+    ProjectAnalyticsResponseSchema,
+    TagCooccurrenceOrder,
+    TagCooccurrenceResponseSchema,
+)
+
+router = APIRouter()
+
+
+@router.get(
+    "/analytics/",
+    response_model=list[ProjectAnalyticsResponseSchema],
+    status_code=200,
+)
+async def get_projects_analytics_batch(
+    db_session: DBSessionDep,
+    year_bucket: Annotated[int, Query(ge=1, le=1000)] = 1,
+    top_authors: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> list[dict[str, Any]]:
+    versions = await get_projects_versions(db_session)
+
+    # the projects not changed since their analytics were cached are served
+    # from the cache, the others are aggregated together in one statement
+    analytics: dict[int, dict[str, Any]] = {}
+    for project_id, version in versions.items():
+        cached = analytics_cache.get(
+            ("project_analytics", project_id, year_bucket, top_authors)
+        )
+        if cached is not None and cached[0] == version:
+            analytics[project_id] = cached[1]
+
+    missing = [project_id for project_id in versions if project_id not in analytics]
+    if missing:
+        computed = await get_projects_analytics(
+            project_ids=missing,
+            year_bucket=year_bucket,
+            top_authors=top_authors,
+            db_session=db_session,
+        )
+        for project_id, project_analytics in computed.items():
+            analytics_cache.set(
+                ("project_analytics", project_id, year_bucket, top_authors),
+                (versions[project_id], project_analytics),
+            )
+        analytics.update(computed)
+
+    return [
+        {"project_id": project_id, **analytics[project_id]} for project_id in versions
+    ]
+
+
+@router.get(
+    "/{project_id}/analytics/",
+    response_model=ProjectAnalyticsResponseSchema,
+    status_code=200,
+)
+async def get_project_analytics(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the analytics for", gt=0)
+    ],
+    year_bucket: Annotated[int, Query(ge=1, le=1000)] = 1,
+    top_authors: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> dict[str, Any]:
+    version = await get_project_version(project_id=project_id, db_session=db_session)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project id not found.")
+
+    async def compute() -> dict[str, Any]:
+        analytics = await get_projects_analytics(
+            project_ids=[project_id],
+            year_bucket=year_bucket,
+            top_authors=top_authors,
+            db_session=db_session,
+        )
+        return analytics[project_id]
+
+    key = ("project_analytics", project_id, year_bucket, top_authors)
+    result = await get_cached(key, version, compute)
+
+    return {"project_id": project_id, **result}
+
+
+@router.get(
+    "/analytics/tag-cooccurrence/",
+    response_model=TagCooccurrenceResponseSchema,
+    status_code=200,
+)
+async def get_projects_tag_cooccurrence(
+    db_session: DBSessionDep,
+    order_by: TagCooccurrenceOrder = TagCooccurrenceOrder.COUNT,
+    min_count: Annotated[int, Query(ge=1)] = 1,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 50,
+) -> dict[str, Any]:
+    version = await get_projects_version(db_session)
+
+    async def compute() -> dict[str, Any]:
+        return await get_tag_cooccurrences(
+            project_id=None,
+            order_by=order_by,
+            min_count=min_count,
+            limit=limit,
+            db_session=db_session,
+        )
+
+    key = ("tag_cooccurrence", None, order_by, min_count, limit)
+    result = await get_cached(key, version, compute)
+
+    return {"project_id": None, **result}
+
+
+@router.get(
+    "/{project_id}/analytics/tag-cooccurrence/",
+    response_model=TagCooccurrenceResponseSchema,
+    status_code=200,
+)
+async def get_project_tag_cooccurrence(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the analytics for", gt=0)
+    ],
+    order_by: TagCooccurrenceOrder = TagCooccurrenceOrder.COUNT,
+    min_count: Annotated[int, Query(ge=1)] = 1,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 50,
+) -> dict[str, Any]:
+    version = await get_project_version(project_id=project_id, db_session=db_session)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Project id not found.")
+
+    async def compute() -> dict[str, Any]:
+        return await get_tag_cooccurrences(
+            project_id=project_id,
+            order_by=order_by,
+            min_count=min_count,
+            limit=limit,
+            db_session=db_session,
+        )
+
+    key = ("tag_cooccurrence", project_id, order_by, min_count, limit)
+    result = await get_cached(key, version, compute)
+
+    return {"project_id": project_id, **result}
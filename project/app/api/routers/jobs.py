@@ -0,0 +1,54 @@
+from typing import Annotated, Any
+
+from fastapi import APIRouter, HTTPException, Path
+
+from app.api.dependencies.core import DBSessionDep
+from app.crud.jobs import create_job, get_job_by_id, get_job_result
+from app.crud.project import project_exists
+from app.models import Job
+from app.schemas.jobs import JobPayloadSchema, JobResponseSchema, JobStatus
+
+router = APIRouter()
+
+
+@router.post("/", response_model=JobResponseSchema, status_code=202)
+async def submit_job(payload: JobPayloadSchema, db_session: DBSessionDep) -> Job:
+    if not await project_exists(project_id=payload.project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found.")
+
+    job = await create_job(
+        kind=payload.kind,
+        project_id=payload.project_id,
+        payload=payload.model_dump(mode="json"),
+        db_session=db_session,
+    )
+
+    return job
+
+
+@router.get("/{job_id}/", response_model=JobResponseSchema, status_code=200)
+async def get_job(
+    job_id: Annotated[int, Path(title="The ID of the job to get", gt=0)],
+    db_session: DBSessionDep,
+) -> Job:
+    job = await get_job_by_id(job_id=job_id, db_session=db_session)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job id not found.")
+
+    return job
+
+
+@router.get("/{job_id}/result/", status_code=200)
+async def get_result(
+    job_id: Annotated[int, Path(title="The ID of the job to get the result of", gt=0)],
+    db_session: DBSessionDep,
+) -> Any:
+    job = await get_job_by_id(job_id=job_id, db_session=db_session)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job id not found.")
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail="Job has not finished yet.")
+
+    return await get_job_result(job_id=job_id, db_session=db_session)
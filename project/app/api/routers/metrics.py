@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+
+from app.metrics import METRICS_CONTENT_TYPE, generate_metrics
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(content=generate_metrics(), media_type=METRICS_CONTENT_TYPE)
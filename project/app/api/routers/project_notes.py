@@ -1,27 +1,60 @@
+from datetime import datetime
 from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
 
+from app.api.dependencies.conditional import (
+    IfModifiedSinceDep,
+    is_not_modified,
+    last_modified_header,
+    not_modified_response,
+)
 from app.api.dependencies.core import DBSessionDep
-from app.crud.project import get_project_by_id
+from app.citations import invalidate_note_citations, render_citations
+from app.config import Settings, get_settings
+from app.crud.note_duplicates import find_note_duplicates, get_project_duplicates
+from app.crud.note_revisions import get_note_revision, get_note_revisions
+from app.crud.project import get_project_by_id, project_exists
 from app.crud.project_notes import (
+    bulk_delete_notes,
+    bulk_update_notes_tags,
     delete_note,
     get_all_notes_for_project,
+    get_deleted_notes_for_project,
     get_note_by_id,
     get_note_by_name_and_project,
+    get_notes_for_citation,
     insert_note,
+    restore_note,
     update_note,
 )
+from app.database import get_violated_constraint
 from app.schemas.project_notes import (
+    CitationStyle,
+    ProjectNoteCitationResponseSchema,
     ProjectNoteDeleteResponseSchema,
+    ProjectNoteDuplicateCandidateSchema,
+    ProjectNoteDuplicateCheckPayloadSchema,
+    ProjectNoteDuplicateSchema,
     ProjectNotePayloadSchema,
     ProjectNoteResponseSchema,
+    ProjectNoteRevisionResponseSchema,
+    ProjectNoteRevisionSchema,
+    ProjectNotesBulkDeleteResponseSchema,
+    ProjectNotesBulkTagsPayloadSchema,
+    ProjectNotesBulkTagsResponseSchema,
+    ProjectNotesSelectionSchema,
+    ProjectNoteTrashResponseSchema,
     ProjectNoteUpdateSchema,
 )
-from app.services import handle_note_tags_update, insert_missing_tags
 
 router = APIRouter()
 
+# the most likely duplicates reported when adding or checking a note
+DUPLICATE_CHECK_LIMIT = 10
+
 
 @router.post("/", response_model=ProjectNoteResponseSchema, status_code=200)
 async def add_note_to_project(
@@ -30,26 +63,46 @@ async def add_note_to_project(
         int, Path(title="The ID of the project to add the note for", gt=0)
     ],
     payload: ProjectNotePayloadSchema,
+    check_duplicates: bool = False,
+    settings: Settings = Depends(get_settings),
 ) -> dict[str, Any]:
-    project = await get_project_by_id(db_session, project_id)
-    if not project:
+    if not await project_exists(project_id=project_id, db_session=db_session):
         raise HTTPException(status_code=404, detail="Project id not found")
-    note_info = await get_note_by_name_and_project(
-        payload.note_name, project_id, db_session
-    )
-    if note_info:
+
+    if check_duplicates:
+        duplicates = await find_note_duplicates(
+            project_id=project_id,
+            name=payload.note_name,
+            author=payload.note_author,
+            threshold=settings.duplicate_similarity_threshold,
+            limit=DUPLICATE_CHECK_LIMIT,
+            db_session=db_session,
+        )
+        if duplicates:
+            duplicate_ids = ", ".join(str(duplicate.id) for duplicate in duplicates)
+            raise HTTPException(
+                status_code=400,
+                detail=f"Note '{payload.note_name}' is likely a duplicate of the"
+                f" notes {duplicate_ids} of this project. Add it without"
+                " 'check_duplicates' to keep it anyway.",
+            )
+
+    try:
+        note = await insert_note(payload, project_id, db_session)
+    except IntegrityError as exc:
+        if get_violated_constraint(exc) != "uq_notes_project_id":
+            raise
+        note_info = await get_note_by_name_and_project(
+            payload.note_name, project_id, db_session
+        )
+        # the note may have been purged since
+        project = f"project '{note_info.project_name}'" if note_info else "this project"
         raise HTTPException(
             status_code=400,
-            detail=f"Note '{payload.note_name}' already exists for"
-            f" project '{note_info.project_name}'. Please select a unique note"
-            " name for this project.",
+            detail=f"Note '{payload.note_name}' already exists for {project}."
+            " Please select a unique note name for this project.",
         )
 
-    if payload.note_tags:
-        await insert_missing_tags(tags=payload.note_tags, db_session=db_session)
-
-    note = await insert_note(payload, project_id, db_session)
-
     response = {
         "note_id": note.id,
         "project_id": note.project_id,
@@ -59,6 +112,7 @@ async def add_note_to_project(
         "note_publication_year": note.publication_year,
         "note_comments": note.comments,
         "created_at": note.created_at,
+        "updated_at": note.updated_at,
         "note_tags": [tag.name for tag in note.tags],
     }
 
@@ -68,16 +122,29 @@ async def add_note_to_project(
 @router.get("/", response_model=list[ProjectNoteResponseSchema], status_code=200)
 async def get_all_project_notes(
     db_session: DBSessionDep,
+    response: Response,
     project_id: Annotated[
         int, Path(title="The ID of the project to get the notes for", gt=0)
     ],
-) -> list[dict[str, Any]]:
+    if_modified_since: IfModifiedSinceDep,
+    updated_since: datetime | None = None,
+) -> list[dict[str, Any]] | Response:
     project = await get_project_by_id(db_session, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project id not found")
-    all_project_notes = await get_all_notes_for_project(project_id, db_session)
 
-    response = []
+    # the stats of a project change with every change to its notes, their
+    # tags or the names of these tags
+    last_modified = project.stats.updated_at if project.stats else project.updated_at
+    if is_not_modified(last_modified, if_modified_since):
+        return not_modified_response(last_modified)
+    response.headers["Last-Modified"] = last_modified_header(last_modified)
+
+    all_project_notes = await get_all_notes_for_project(
+        project_id, db_session, updated_since=updated_since
+    )
+
+    notes_response = []
 
     for project_note in all_project_notes:
         note_response = {
@@ -89,21 +156,199 @@ async def get_all_project_notes(
             "note_publication_year": project_note.publication_year,
             "note_comments": project_note.comments,
             "created_at": project_note.created_at,
+            "updated_at": project_note.updated_at,
             "note_tags": [tag.name for tag in project_note.tags],
         }
+        notes_response.append(note_response)
+
+    return notes_response
+
+
+# declared before "/{note_id}/" so that "duplicates" is not taken for an id
+@router.get(
+    "/duplicates/",
+    response_model=list[ProjectNoteDuplicateSchema],
+    status_code=200,
+)
+async def get_project_notes_duplicates(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to find duplicate notes in", gt=0)
+    ],
+    threshold: Annotated[float | None, Query(gt=0, le=1)] = None,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 100,
+    settings: Settings = Depends(get_settings),
+) -> list[dict[str, Any]]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+
+    duplicates = await get_project_duplicates(
+        project_id=project_id,
+        threshold=threshold or settings.duplicate_similarity_threshold,
+        limit=limit,
+        db_session=db_session,
+    )
+
+    return [
+        {
+            "note_id": duplicate.note_id,
+            "duplicate_note_id": duplicate.duplicate_note_id,
+            "similarity": duplicate.similarity,
+        }
+        for duplicate in duplicates
+    ]
+
+
+@router.post(
+    "/duplicates/check/",
+    response_model=list[ProjectNoteDuplicateCandidateSchema],
+    status_code=200,
+)
+async def check_project_note_duplicates(
+    payload: ProjectNoteDuplicateCheckPayloadSchema,
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to find duplicate notes in", gt=0)
+    ],
+    threshold: Annotated[float | None, Query(gt=0, le=1)] = None,
+    settings: Settings = Depends(get_settings),
+) -> list[dict[str, Any]]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+
+    duplicates = await find_note_duplicates(
+        project_id=project_id,
+        name=payload.note_name,
+        author=payload.note_author,
+        threshold=threshold or settings.duplicate_similarity_threshold,
+        limit=DUPLICATE_CHECK_LIMIT,
+        db_session=db_session,
+    )
+
+    return [
+        {
+            "note_id": duplicate.id,
+            "note_name": duplicate.name,
+            "note_author": duplicate.author,
+            "similarity": duplicate.similarity,
+        }
+        for duplicate in duplicates
+    ]
+
+
+# declared before "/{note_id}/" so that "citations" is not taken for an id
+@router.get(
+    "/citations/",
+    response_model=list[ProjectNoteCitationResponseSchema],
+    status_code=200,
+)
+async def get_project_notes_citations(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the citations for", gt=0)
+    ],
+    style: CitationStyle = CitationStyle.APA,
+    settings: Settings = Depends(get_settings),
+) -> list[dict[str, Any]]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+    notes = await get_notes_for_citation(project_id=project_id, db_session=db_session)
+
+    # rendering a large project in a thread keeps the event loop serving the
+    # other requests meanwhile
+    if len(notes) > settings.citation_offload_threshold:
+        citations = await run_in_threadpool(render_citations, notes, style)
+    else:
+        citations = render_citations(notes, style)
+
+    return [
+        {"note_id": note.id, "style": style, "citation": citation}
+        for note, citation in zip(notes, citations)
+    ]
+
+
+# declared before "/{note_id}/" so that "trash" is not taken for an id
+@router.get(
+    "/trash/", response_model=list[ProjectNoteTrashResponseSchema], status_code=200
+)
+async def get_project_notes_trash(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the deleted notes for", gt=0)
+    ],
+) -> list[dict[str, Any]]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+    deleted_notes = await get_deleted_notes_for_project(project_id, db_session)
+
+    response = []
+
+    for deleted_note in deleted_notes:
+        note_response = {
+            "note_id": deleted_note.id,
+            "project_id": deleted_note.project_id,
+            "note_name": deleted_note.name,
+            "note_author": deleted_note.author,
+            "note_publication_details": deleted_note.publication_details,
+            "note_publication_year": deleted_note.publication_year,
+            "note_comments": deleted_note.comments,
+            "created_at": deleted_note.created_at,
+            "updated_at": deleted_note.updated_at,
+            "note_tags": [tag.name for tag in deleted_note.tags],
+            "deleted_at": deleted_note.deleted_at,
+        }
         response.append(note_response)
 
     return response
 
 
-@router.get("/{note_id}/")
+@router.post(
+    "/{note_id}/restore/", response_model=ProjectNoteResponseSchema, status_code=200
+)
+async def restore_project_note(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to restore the note for", gt=0)
+    ],
+    note_id: Annotated[int, Path(title="The ID of the note to restore", gt=0)],
+) -> dict[str, Any]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+
+    restored = await restore_note(
+        note_id=note_id, project_id=project_id, db_session=db_session
+    )
+    if not restored:
+        raise HTTPException(
+            status_code=404, detail="The note id cannot be found in the trash."
+        )
+
+    note: Any = await get_note_by_id(note_id=note_id, db_session=db_session)
+
+    return {
+        "note_id": note.id,
+        "project_id": note.project_id,
+        "note_name": note.name,
+        "note_author": note.author,
+        "note_publication_details": note.publication_details,
+        "note_publication_year": note.publication_year,
+        "note_comments": note.comments,
+        "created_at": note.created_at,
+        "updated_at": note.updated_at,
+        "note_tags": [tag.name for tag in note.tags],
+    }
+
+
+@router.get("/{note_id}/", response_model=ProjectNoteResponseSchema)
 async def get_project_note(
     db_session: DBSessionDep,
+    response: Response,
     project_id: Annotated[
         int, Path(title="The ID of the project to get the note for", gt=0)
     ],
     note_id: Annotated[int, Path(title="The ID of the note to get", gt=0)],
-) -> dict[str, Any]:
+    if_modified_since: IfModifiedSinceDep,
+) -> dict[str, Any] | Response:
     project = await get_project_by_id(db_session, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project id not found")
@@ -118,6 +363,10 @@ async def get_project_note(
             status_code=404, detail="The note id cannot be found for this project."
         )
 
+    if is_not_modified(note.updated_at, if_modified_since):
+        return not_modified_response(note.updated_at)
+    response.headers["Last-Modified"] = last_modified_header(note.updated_at)
+
     note_response = {
         "note_id": note.id,
         "project_id": note.project_id,
@@ -127,12 +376,45 @@ async def get_project_note(
         "note_publication_year": note.publication_year,
         "note_comments": note.comments,
         "created_at": note.created_at,
+        "updated_at": note.updated_at,
         "note_tags": [tag.name for tag in note.tags],
     }
 
     return note_response
 
 
+@router.get(
+    "/{note_id}/citation/",
+    response_model=ProjectNoteCitationResponseSchema,
+    status_code=200,
+)
+async def get_project_note_citation(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the citation for", gt=0)
+    ],
+    note_id: Annotated[int, Path(title="The ID of the note to cite", gt=0)],
+    style: CitationStyle = CitationStyle.APA,
+) -> dict[str, Any]:
+    notes = await get_notes_for_citation(
+        project_id=project_id, db_session=db_session, note_id=note_id
+    )
+
+    # the query only matches a note of the project, find out why it did not
+    if not notes:
+        if not await project_exists(project_id=project_id, db_session=db_session):
+            raise HTTPException(status_code=404, detail="Project id not found")
+        if not await get_note_by_id(note_id=note_id, db_session=db_session):
+            raise HTTPException(status_code=404, detail="Note id not found")
+        raise HTTPException(
+            status_code=404, detail="The note id cannot be found for this project."
+        )
+
+    [citation] = render_citations(notes, style)
+
+    return {"note_id": note_id, "style": style, "citation": citation}
+
+
 @router.patch("/{note_id}/")
 async def patch_note(
     payload: ProjectNoteUpdateSchema,
@@ -141,9 +423,75 @@ async def patch_note(
         int, Path(title="The ID of the project to update the note for", gt=0)
     ],
     note_id: Annotated[int, Path(title="The ID of the note to update", gt=0)],
+    settings: Settings = Depends(get_settings),
 ) -> dict[str, Any]:
-    project = await get_project_by_id(db_session=db_session, project_id=project_id)
-    if not project:
+    update_data = payload.model_dump(exclude_unset=True)
+    # updating tags is handled separately
+    tags = update_data.pop("tags", None)
+
+    try:
+        updated_note = await update_note(
+            note_id=note_id,
+            project_id=project_id,
+            payload=update_data,
+            tags=tags,
+            snapshot_interval=settings.note_revision_snapshot_interval,
+            db_session=db_session,
+        )
+    except IntegrityError as exc:
+        if get_violated_constraint(exc) != "uq_notes_project_id":
+            raise
+        note_info = await get_note_by_name_and_project(
+            note_name=update_data["name"], project_id=project_id, db_session=db_session
+        )
+        # the note may have been purged since
+        project = f"'{note_info.project_name}' project" if note_info else "this project"
+        raise HTTPException(
+            status_code=400,
+            detail=f"Note name '{update_data['name']}' already exists on "
+            f"{project}. Please select a unique note name and try again.",
+        )
+
+    # the update only matches a note of the project, find out why it did not
+    if not updated_note:
+        if not await project_exists(project_id=project_id, db_session=db_session):
+            raise HTTPException(status_code=404, detail="Project id not found")
+        if not await get_note_by_id(note_id=note_id, db_session=db_session):
+            raise HTTPException(status_code=404, detail="Note id not found")
+        raise HTTPException(
+            status_code=404, detail="The note id cannot be found for this project."
+        )
+    invalidate_note_citations(note_id)
+
+    return {
+        "note_id": updated_note.id,
+        "project_id": updated_note.project_id,
+        "note_name": updated_note.name,
+        "note_author": updated_note.author,
+        "note_publication_details": updated_note.publication_details,
+        "note_publication_year": updated_note.publication_year,
+        "note_comments": updated_note.comments,
+        "created_at": updated_note.created_at,
+        "updated_at": updated_note.updated_at,
+        "note_tags": updated_note.tags,
+    }
+
+
+@router.get(
+    "/{note_id}/revisions/",
+    response_model=list[ProjectNoteRevisionSchema],
+    status_code=200,
+)
+async def get_project_note_revisions(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the note revisions for", gt=0)
+    ],
+    note_id: Annotated[
+        int, Path(title="The ID of the note to get revisions for", gt=0)
+    ],
+) -> list[dict[str, Any]]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
         raise HTTPException(status_code=404, detail="Project id not found")
 
     note = await get_note_by_id(note_id=note_id, db_session=db_session)
@@ -156,57 +504,83 @@ async def patch_note(
             status_code=404, detail="The note id cannot be found for this project."
         )
 
-    # check if the note name is requested to be updated
-    if payload.name:
-        if note.name != payload.name:
-            # check if the updated name already exists on the project
-            note_updated_name = await get_note_by_name_and_project(
-                note_name=payload.name, project_id=project_id, db_session=db_session
-            )
-            if note_updated_name:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Note name '{payload.name}' already exists on "
-                    f"'{project.name}' project. Please select a unique note name and "
-                    "try again.",
-                )
+    revisions = await get_note_revisions(note_id=note_id, db_session=db_session)
+    # a note that was never changed is its own and only revision
+    if not revisions:
+        return [{"revision": 1, "created_at": note.created_at, "changed_fields": []}]
 
-    update_data = payload.model_dump(exclude_unset=True)
+    return [
+        {
+            "revision": revision.revision,
+            "created_at": revision.created_at,
+            "changed_fields": revision.changed_fields,
+        }
+        for revision in revisions
+    ]
 
-    # handle updating tags data
-    if "tags" in update_data.keys():
-        existing_note_tags = [tag.name for tag in note.tags]
-        await handle_note_tags_update(
-            note=note,
-            existing_note_tags=existing_note_tags,
-            payload_tags=payload.tags,
-            db_session=db_session,
-        )
 
-    # updating tags is handled separately
-    if "tags" in update_data.keys():
-        update_data.pop("tags")
-
-    # at this point update_data may be an empty dict if only "tags" was sent
-    # in the payload; in this case we don't need to perform any update in
-    # "notes" table
-    if update_data:
-        updated_note: Any = await update_note(
-            payload=update_data, note_id=note_id, db_session=db_session
+@router.get(
+    "/{note_id}/revisions/{revision}/",
+    response_model=ProjectNoteRevisionResponseSchema,
+    status_code=200,
+)
+async def get_project_note_revision(
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to get the note revision for", gt=0)
+    ],
+    note_id: Annotated[
+        int, Path(title="The ID of the note to get the revision of", gt=0)
+    ],
+    revision: Annotated[int, Path(title="The revision of the note to get", gt=0)],
+) -> dict[str, Any]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+
+    note = await get_note_by_id(note_id=note_id, db_session=db_session)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note id not found")
+
+    # check if the requested note belongs to the requested project_id
+    if note.project_id != project_id:
+        raise HTTPException(
+            status_code=404, detail="The note id cannot be found for this project."
         )
+
+    note_revision = await get_note_revision(
+        note_id=note_id, revision=revision, db_session=db_session
+    )
+    if note_revision is not None:
+        state, revised_at = note_revision
+    # a note that was never changed has no revisions, not even the first one
+    elif revision == 1:
+        state = {
+            "name": note.name,
+            "author": note.author,
+            "publication_details": note.publication_details,
+            "publication_year": note.publication_year,
+            "comments": note.comments,
+            "tags": [tag.name for tag in note.tags],
+        }
+        revised_at = note.created_at
     else:
-        updated_note = await get_note_by_id(note_id=note_id, db_session=db_session)
+        raise HTTPException(
+            status_code=404, detail="The revision cannot be found for this note."
+        )
 
     return {
-        "note_id": updated_note.id,
-        "project_id": updated_note.project_id,
-        "note_name": updated_note.name,
-        "note_author": updated_note.author,
-        "note_publication_details": updated_note.publication_details,
-        "note_publication_year": updated_note.publication_year,
-        "note_comments": updated_note.comments,
-        "created_at": updated_note.created_at,
-        "note_tags": [tag.name for tag in updated_note.tags],
+        "note_id": note.id,
+        "project_id": note.project_id,
+        "note_name": state["name"],
+        "note_author": state["author"],
+        "note_publication_details": state["publication_details"],
+        "note_publication_year": state["publication_year"],
+        "note_comments": state["comments"],
+        "created_at": note.created_at,
+        "updated_at": revised_at,
+        "note_tags": state["tags"],
+        "revision": revision,
+        "revised_at": revised_at,
     }
 
 
@@ -237,3 +611,62 @@ async def delete_project_note(
     response = {"message": "Note deleted"}
 
     return response
+
+
+@router.patch(
+    "/bulk/tags/", response_model=ProjectNotesBulkTagsResponseSchema, status_code=200
+)
+async def bulk_update_project_notes_tags(
+    payload: ProjectNotesBulkTagsPayloadSchema,
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to update the notes tags for", gt=0)
+    ],
+    settings: Settings = Depends(get_settings),
+) -> dict[str, int]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+
+    added, removed = await bulk_update_notes_tags(
+        project_id=project_id,
+        selection=payload,
+        add_tags=payload.add_tags,
+        remove_tags=payload.remove_tags,
+        snapshot_interval=settings.note_revision_snapshot_interval,
+        db_session=db_session,
+    )
+
+    response = {"added": added, "removed": removed}
+
+    return response
+
+
+@router.post(
+    "/bulk/delete/",
+    response_model=ProjectNotesBulkDeleteResponseSchema,
+    status_code=200,
+)
+async def bulk_delete_project_notes(
+    payload: ProjectNotesSelectionSchema,
+    db_session: DBSessionDep,
+    project_id: Annotated[
+        int, Path(title="The ID of the project to delete the notes for", gt=0)
+    ],
+    settings: Settings = Depends(get_settings),
+) -> dict[str, int]:
+    if not await project_exists(project_id=project_id, db_session=db_session):
+        raise HTTPException(status_code=404, detail="Project id not found")
+
+    deleted_notes, deleted_note_tags = await bulk_delete_notes(
+        project_id=project_id,
+        selection=payload,
+        batch_size=settings.bulk_delete_batch_size,
+        db_session=db_session,
+    )
+
+    response = {
+        "deleted_notes": deleted_notes,
+        "deleted_note_tags": deleted_note_tags,
+    }
+
+    return response
@@ -1,39 +1,86 @@
-from typing import Annotated, Iterable
+from datetime import timedelta
+from typing import Annotated, Any, Iterable
 
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
+from sqlalchemy.exc import IntegrityError
 
+from app.api.dependencies.conditional import (
+    IfModifiedSinceDep,
+    is_not_modified,
+    last_modified_header,
+    not_modified_response,
+)
 from app.api.dependencies.core import DBSessionDep
+from app.config import Settings, get_settings
 from app.crud.project import (
     get_all_projects,
+    get_deleted_projects,
     get_project_by_id,
-    get_project_by_name,
     post_project,
     remove_project,
+    restore_project,
     update_project,
 )
+from app.database import get_violated_constraint
 from app.models import Project
 from app.schemas.project import (
     ProjectDeleteSchema,
     ProjectPayloadSchema,
     ProjectResponseSchema,
+    ProjectTrashResponseSchema,
     ProjectUpdatePayloadSchema,
 )
 
 router = APIRouter()
 
 
+# declared before "/{project_id}/" so that "trash" is not taken for an id
+@router.get("/trash/", response_model=list[ProjectTrashResponseSchema])
+async def get_projects_trash(db_session: DBSessionDep) -> Iterable[Project]:
+    deleted_projects = await get_deleted_projects(db_session)
+
+    return deleted_projects
+
+
+@router.post(
+    "/{project_id}/restore/", response_model=ProjectResponseSchema, status_code=200
+)
+async def restore_deleted_project(
+    db_session: DBSessionDep,
+    project_id: Annotated[int, Path(title="The ID of the item to restore", gt=0)],
+) -> Project:
+    project = await restore_project(project_id=project_id, db_session=db_session)
+    if not project:
+        raise HTTPException(
+            status_code=404,
+            detail="Project id not found in the trash, or already being purged.",
+        )
+
+    return project
+
+
 @router.get(
     "/{project_id}/",
     response_model=ProjectResponseSchema,
 )
 async def get_project(
     db_session: DBSessionDep,
+    response: Response,
     project_id: Annotated[int, Path(title="The ID of the item to get", gt=0)],
-) -> Project:
+    if_modified_since: IfModifiedSinceDep,
+) -> Project | Response:
     project = await get_project_by_id(db_session, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project id not found.")
 
+    # the project is returned with its stats
+    last_modified = project.updated_at
+    if project.stats and project.stats.updated_at > last_modified:
+        last_modified = project.stats.updated_at
+    if is_not_modified(last_modified, if_modified_since):
+        return not_modified_response(last_modified)
+    response.headers["Last-Modified"] = last_modified_header(last_modified)
+
     return project
 
 
@@ -48,16 +95,17 @@ async def get_projects(db_session: DBSessionDep) -> Iterable[Project] | None:
 async def create_project(
     payload: ProjectPayloadSchema, db_session: DBSessionDep
 ) -> Project:
-    project = await get_project_by_name(payload.name, db_session)
-    if project:
+    try:
+        response = await post_project(payload, db_session)
+    except IntegrityError as exc:
+        if get_violated_constraint(exc) != "ix_projects_name":
+            raise
         raise HTTPException(
             status_code=400,
             detail=f"Project name '{payload.name}' already exists. Please"
             " select a unique project name and try again.",
         )
 
-    response = await post_project(payload, db_session)
-
     return response
 
 
@@ -67,42 +115,42 @@ async def patch_project(
     db_session: DBSessionDep,
     project_id: Annotated[int, Path(title="The ID of the item to update", gt=0)],
 ) -> Project:
-    project = await get_project_by_id(db_session, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project id not found.")
-
-    # check if the project name is requested to be updated
-    if payload.name:
-        if project.name != payload.name:
-            # check if the updated_name already exists
-            updated_name = await get_project_by_name(payload.name, db_session)
-            if updated_name:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Project name '{payload.name}' already exists."
-                    " Please select a unique project name and try again.",
-                )
-
     update_data = payload.model_dump(exclude_unset=True)
 
-    updated_project = await update_project(
-        project_id=project.id, payload=update_data, db_session=db_session
-    )
+    try:
+        updated_project = await update_project(
+            project_id=project_id, payload=update_data, db_session=db_session
+        )
+    except IntegrityError as exc:
+        if get_violated_constraint(exc) != "ix_projects_name":
+            raise
+        raise HTTPException(
+            status_code=400,
+            detail=f"Project name '{payload.name}' already exists."
+            " Please select a unique project name and try again.",
+        )
+    if not updated_project:
+        raise HTTPException(status_code=404, detail="Project id not found.")
 
     return updated_project
 
 
-@router.delete("/{project_id}/", response_model=ProjectDeleteSchema, status_code=200)
+@router.delete("/{project_id}/", response_model=ProjectDeleteSchema, status_code=202)
 async def delete_project(
     db_session: DBSessionDep,
     project_id: Annotated[int, Path(title="The ID of the item to delete", gt=0)],
-) -> dict[str, str]:
-    project = await get_project_by_id(db_session, project_id)
-    if not project:
+    settings: Settings = Depends(get_settings),
+) -> dict[str, Any]:
+    job = await remove_project(
+        project_id=project_id,
+        retention=timedelta(days=settings.trash_retention_days),
+        db_session=db_session,
+    )
+    if not job:
         raise HTTPException(status_code=404, detail="Project id not found.")
 
-    await remove_project(project_id=project_id, db_session=db_session)
-
-    response = {"message": "Project deleted"}
+    # the project is purged by the job once the trash retention is over, its
+    # progress is at /jobs/{job_id}/
+    response = {"message": "Project deleted", "job_id": job.id}
 
     return response
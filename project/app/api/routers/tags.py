@@ -0,0 +1,71 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from app.api.dependencies.core import DBSessionDep
+from app.crud.tags import get_tag_by_name, merge_tags, rename_tag
+from app.database import get_violated_constraint
+from app.models import Tag
+from app.schemas.tags import (
+    TagMergePayloadSchema,
+    TagMergeResponseSchema,
+    TagRenamePayloadSchema,
+    TagResponseSchema,
+)
+
+router = APIRouter()
+
+
+@router.post("/rename/", response_model=TagResponseSchema, status_code=200)
+async def rename(payload: TagRenamePayloadSchema, db_session: DBSessionDep) -> Tag:
+    tag = await get_tag_by_name(tag_name=payload.name, db_session=db_session)
+    if not tag:
+        raise HTTPException(status_code=404, detail=f"Tag '{payload.name}' not found.")
+
+    if tag.name == payload.new_name:
+        return tag
+
+    try:
+        renamed_tag = await rename_tag(
+            tag_id=tag.id, new_name=payload.new_name, db_session=db_session
+        )
+    except IntegrityError as exc:
+        if get_violated_constraint(exc) != "ix_tags_normalized_name":
+            raise
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tag '{payload.new_name}' already exists. Merge the two tags"
+            " instead of renaming.",
+        )
+
+    return renamed_tag
+
+
+@router.post("/merge/", response_model=TagMergeResponseSchema, status_code=200)
+async def merge(
+    payload: TagMergePayloadSchema, db_session: DBSessionDep
+) -> dict[str, Any]:
+    source_tag = await get_tag_by_name(tag_name=payload.source, db_session=db_session)
+    if not source_tag:
+        raise HTTPException(
+            status_code=404, detail=f"Tag '{payload.source}' not found."
+        )
+
+    target_tag = await get_tag_by_name(tag_name=payload.target, db_session=db_session)
+    if not target_tag:
+        raise HTTPException(
+            status_code=404, detail=f"Tag '{payload.target}' not found."
+        )
+
+    moved_notes = await merge_tags(
+        source_id=source_tag.id, target_id=target_tag.id, db_session=db_session
+    )
+
+    response = {
+        "id": target_tag.id,
+        "name": target_tag.name,
+        "moved_notes": moved_notes,
+    }
+
+    return response
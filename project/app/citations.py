@@ -0,0 +1,113 @@
+"""
+Citations of notes, rendered from their author, name, publication details and
+publication year.
+
+Rendered citations are cached per note and style together with the version of
+the note they were rendered from, its last revision, so a cached citation is
+never served for a note changed since, even by another process.
+"""
+
+import re
+from typing import Any, Callable, Iterable
+
+from app.cache import LRUCache
+from app.schemas.project_notes import CitationStyle
+
+CITATION_CACHE_SIZE = 10_000
+
+# (note id, style) -> (note version, citation)
+citation_cache: LRUCache[tuple[int, CitationStyle], tuple[int, str]] = LRUCache(
+    CITATION_CACHE_SIZE
+)
+
+BIBTEX_SPECIAL_CHARACTERS = re.compile(r"([\\{}&%$#_])")
+
+
+def sentence(text: str) -> str:
+    text = text.strip()
+    return text if text.endswith((".", "?", "!")) else f"{text}."
+
+
+def render_apa(note: Any) -> str:
+    year = note.publication_year or "n.d."
+    parts = [sentence(note.author)] if note.author else []
+    parts.append(f"({year}).")
+    parts.append(sentence(note.name))
+    if note.publication_details:
+        parts.append(sentence(note.publication_details))
+    return " ".join(parts)
+
+
+def render_mla(note: Any) -> str:
+    parts = [sentence(note.author)] if note.author else []
+    parts.append(sentence(note.name))
+    source = ", ".join(
+        str(part) for part in (note.publication_details, note.publication_year) if part
+    )
+    if source:
+        parts.append(sentence(source))
+    return " ".join(parts)
+
+
+def render_chicago(note: Any) -> str:
+    # the author-date system
+    parts = [sentence(note.author)] if note.author else []
+    parts.append(sentence(str(note.publication_year or "n.d.")))
+    parts.append(sentence(note.name))
+    if note.publication_details:
+        parts.append(sentence(note.publication_details))
+    return " ".join(parts)
+
+
+def bibtex_value(value: Any) -> str:
+    return BIBTEX_SPECIAL_CHARACTERS.sub(r"\\\1", str(value))
+
+
+def render_bibtex(note: Any) -> str:
+    fields = {
+        "author": note.author,
+        "title": note.name,
+        "howpublished": note.publication_details,
+        "year": note.publication_year,
+    }
+    lines = [f"@misc{{note{note.id},"]
+    lines.extend(
+        f"  {field} = {{{bibtex_value(value)}}},"
+        for field, value in fields.items()
+        if value
+    )
+    lines.append("}")
+    return "\n".join(lines)
+
+
+RENDERERS: dict[CitationStyle, Callable[[Any], str]] = {
+    CitationStyle.APA: render_apa,
+    CitationStyle.MLA: render_mla,
+    CitationStyle.CHICAGO: render_chicago,
+    CitationStyle.BIBTEX: render_bibtex,
+}
+
+
+def render_citation(note: Any, style: CitationStyle) -> str:
+    """
+    Returns the citation of 'note', a row with the note's 'id', 'name',
+    'author', 'publication_details', 'publication_year' and 'version', from the
+    cache if it was rendered from the same version of the note.
+    """
+    key = (note.id, style)
+    cached = citation_cache.get(key)
+    if cached is not None and cached[0] == note.version:
+        return cached[1]
+
+    citation = RENDERERS[style](note)
+    citation_cache.set(key, (note.version, citation))
+    return citation
+
+
+def render_citations(notes: Iterable[Any], style: CitationStyle) -> list[str]:
+    return [render_citation(note, style) for note in notes]
+
+
+def invalidate_note_citations(note_id: int) -> None:
+    for style in CitationStyle:
+        citation_cache.delete((note_id, style))
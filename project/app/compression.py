@@ -0,0 +1,286 @@
+"""
+Compression of the HTTP responses, negotiated with the Accept-Encoding header
+of the request.
+
+gzip is always available, brotli ('br') and zstd ('zstd') are offered when the
+optional 'brotli' and 'zstandard' packages are installed. Levels go from 1
+(fastest) to 9 (smallest) for every encoding.
+
+Complete GET responses are identified by an ETag computed from their body:
+a request whose If-None-Match matches it gets a 304 without a body, and the
+compressed bodies are cached by ETag, so that the same payload polled over
+and over is only compressed once.
+"""
+
+import hashlib
+import zlib
+from typing import Any, Protocol
+
+from anyio import to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import LRUCache
+from app.instrumentation import get_route_name
+
+# optional, neither package ships type hints
+try:
+    import brotli  # type: ignore[import-not-found, unused-ignore]
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # type: ignore[import-not-found, unused-ignore]
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/xml",
+    "application/javascript",
+)
+
+# larger bodies are compressed in a worker thread, so that the event loop keeps
+# serving the other requests meanwhile
+OFFLOAD_SIZE = 256 * 1024
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class BrotliCompressor:
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+def gzip_compressor(level: int) -> Compressor:
+    # wbits=31 writes the gzip header and trailer around the deflate stream
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def zstd_compressor(level: int) -> Compressor:
+    compressor: Compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return compressor
+
+
+# the encodings offered, preferred first when the client accepts several of
+# them equally
+ENCODINGS: dict[str, Any] = {}
+if zstandard is not None:
+    ENCODINGS["zstd"] = zstd_compressor
+if brotli is not None:
+    ENCODINGS["br"] = BrotliCompressor
+ENCODINGS["gzip"] = gzip_compressor
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    compressor = ENCODINGS[encoding](level)
+    return bytes(compressor.compress(body) + compressor.flush())
+
+
+def select_encoding(accept_encoding: str) -> str | None:
+    """
+    Returns the encoding to use for a request sent with 'accept_encoding', the
+    one of highest quality the client accepts, or None to send the body as is.
+    """
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best_encoding, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+
+    return best_encoding
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    The ETag of the 'encoding' representation of a body: every encoding is a
+    different representation, which needs its own strong ETag.
+    """
+    weak, tag = ("W/", etag[2:]) if etag.startswith("W/") else ("", etag)
+    return f'{weak}{tag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    if "no-transform" in headers.get("cache-control", "").lower():
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing the response bodies of at least
+    'minimum_size' bytes with the encoding negotiated with the client, at
+    'level', or at the level of 'route_levels' for the route, by path
+    template. Complete GET responses get an ETag, see the module docstring,
+    and up to 'cache_size' of their compressed bodies are kept.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        level: int = 6,
+        route_levels: dict[str, int] | None = None,
+        cache_size: int = 64,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.route_levels = route_levels or {}
+        # (ETag, encoding, level) -> compressed body
+        self.cache: LRUCache[tuple[str, str, int], bytes] = LRUCache(cache_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = select_encoding(request_headers.get("accept-encoding", ""))
+        if_none_match = request_headers.get("if-none-match")
+        is_get = scope["method"] == "GET"
+        if encoding is None and not is_get:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: Compressor | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, compressor
+
+            if message["type"] == "http.response.start":
+                # held back until the body tells how to send the response
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if compressor is not None:
+                # the rest of a streamed response
+                body = compressor.compress(message.get("body", b""))
+                if not message.get("more_body", False):
+                    body += compressor.flush()
+                await send({**message, "body": body})
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=list(start_message["headers"]))
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            content_encoding = encoding if is_compressible(headers) else None
+            level = self.route_levels.get(get_route_name(scope), self.level)
+            start, start_message = start_message, None
+
+            if more_body:
+                # a streamed response is compressed as it goes, its size is
+                # not known, nor its ETag
+                if content_encoding is not None:
+                    compressor = ENCODINGS[content_encoding](level)
+                    del headers["content-length"]
+                    headers["content-encoding"] = content_encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    body = compressor.compress(body)
+                await send({**start, "headers": headers.raw})
+                await send({**message, "body": body})
+                return
+
+            if is_compressible(headers) and len(body) >= self.minimum_size:
+                # also when this client gets the body as is
+                headers.add_vary_header("Accept-Encoding")
+            else:
+                content_encoding = None
+            status = start["status"]
+            etag = headers.get("etag")
+            if etag is None and is_get and status == 200:
+                etag = body_etag(body)
+            if etag is not None and content_encoding is not None:
+                etag = encoded_etag(etag, content_encoding)
+            if etag is not None:
+                headers["etag"] = etag
+
+            if (
+                status == 200
+                and etag is not None
+                and if_none_match is not None
+                and etag_matches(if_none_match, etag)
+            ):
+                del headers["content-type"]
+                del headers["content-length"]
+                await send({**start, "status": 304, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            if content_encoding is not None:
+                body = await self.compress(body, content_encoding, level, etag)
+                headers["content-encoding"] = content_encoding
+                headers["content-length"] = str(len(body))
+
+            await send({**start, "headers": headers.raw})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def compress(
+        self, body: bytes, encoding: str, level: int, etag: str | None
+    ) -> bytes:
+        key = (etag, encoding, level) if etag is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if len(body) > OFFLOAD_SIZE:
+            compressed = await to_thread.run_sync(compress, body, encoding, level)
+        else:
+            compressed = compress(body, encoding, level)
+
+        if key is not None:
+            self.cache.set(key, compressed)
+
+        return compressed
@@ -1,7 +1,7 @@
 import logging
 from functools import lru_cache
 
-from pydantic import AnyUrl
+from pydantic import AnyUrl, PositiveInt
 from pydantic_settings import BaseSettings
 
 log = logging.getLogger("uvicorn")
@@ -11,6 +11,32 @@ class Settings(BaseSettings):
     environment: str = "dev"
     testing: bool = bool(0)
     database_url: AnyUrl | None = None
+    bulk_delete_batch_size: PositiveInt = 1000
+    n_plus_one_threshold: int = 5
+    slow_query_threshold_ms: float | None = None
+    slow_query_explain: bool = False
+    slow_query_explain_timeout_ms: PositiveInt = 5000
+    slow_query_log_max_per_minute: int = 10
+    tracing_enabled: bool = False
+    tracing_export_path: str = "traces.jsonl"
+    tracing_otlp_endpoint: str | None = None
+    job_worker_enabled: bool = False
+    job_poll_interval: float = 1.0
+    job_heartbeat_interval: float = 10.0
+    job_stale_after: float = 60.0
+    job_max_attempts: int = 3
+    job_batch_size: PositiveInt = 500
+    trash_retention_days: float = 30
+    trash_purge_interval: float = 3600
+    purge_max_active_queries: int = 4
+    note_revision_snapshot_interval: PositiveInt = 10
+    citation_offload_threshold: int = 500
+    duplicate_similarity_threshold: float = 0.5
+    compression_minimum_size: int = 1000
+    compression_level: int = 6
+    # levels by route path template, e.g. {"/projects/{project_id}/notes/": 4}
+    compression_route_levels: dict[str, int] = {}
+    compression_cache_size: int = 64
 
 
 @lru_cache()
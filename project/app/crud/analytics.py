@@ -0,0 +1,316 @@
+from typing import Any
+
+from sqlalchemy import (
+    Float,
+    Integer,
+    and_,
+    any_,
+    cast,
+    func,
+    literal,
+    or_,
+    select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Note, NoteTag, Project, ProjectStats, ProjectTagCount, Tag
+from app.schemas.analytics import TagCooccurrenceOrder
+from app.tracing import traced
+
+
+@traced
+async def get_project_version(project_id: int, db_session: AsyncSession) -> int | None:
+    """
+    Returns the version of the live project 'project_id', or None if there is
+    no such project.
+    """
+    query = (
+        select(ProjectStats.version)
+        .join(Project, Project.id == ProjectStats.project_id)
+        .where(ProjectStats.project_id == project_id, Project.deleted_at.is_(None))
+    )
+    return await db_session.scalar(query)
+
+
+@traced
+async def get_projects_version(db_session: AsyncSession) -> tuple[int, int]:
+    """
+    Returns the greatest version and the number of the live projects: project
+    versions come from a single sequence, and moving a project to the trash or
+    restoring it gives it a new one, so the pair only repeats if the live
+    projects are as they were.
+    """
+    query = (
+        select(func.coalesce(func.max(ProjectStats.version), 0), func.count())
+        .join(Project, Project.id == ProjectStats.project_id)
+        .where(Project.deleted_at.is_(None))
+    )
+    version, project_count = (await db_session.execute(query)).one()
+
+    return version, project_count
+
+
+@traced
+async def get_projects_versions(db_session: AsyncSession) -> dict[int, int]:
+    """
+    Returns the version of every live project, by project id.
+    """
+    query = (
+        select(ProjectStats.project_id, ProjectStats.version)
+        .join(Project, Project.id == ProjectStats.project_id)
+        .where(Project.deleted_at.is_(None))
+        .order_by(ProjectStats.project_id)
+    )
+    result = await db_session.execute(query)
+
+    return {project_id: version for project_id, version in result.all()}
+
+
+# values of GROUPING(year, author, tag) for the grouping sets of
+# get_projects_analytics, a bit is set for every column not grouped on
+YEARS_GROUPING = 0b011
+AUTHORS_GROUPING = 0b101
+TAGS_GROUPING = 0b110
+TOTAL_GROUPING = 0b111
+
+
+@traced
+async def get_projects_analytics(
+    project_ids: list[int],
+    year_bucket: int,
+    top_authors: int,
+    db_session: AsyncSession,
+) -> dict[int, dict[str, Any]]:
+    """
+    Returns, for every project of 'project_ids', the number of its live notes
+    and how they are distributed:
+
+    - publication_years: the number of notes by publication year, rounded down
+      to a multiple of 'year_bucket', the notes without a year last
+    - top_authors: the 'top_authors' authors with the most notes
+    - tags: the number of notes of every tag, the most used first
+
+    All of them are counted in a single statement, with one grouping set each.
+    """
+    year = Note.publication_year // year_bucket * year_bucket
+    source = (
+        select(
+            Note.id.label("note_id"),
+            Note.project_id,
+            year.label("year"),
+            Note.author,
+            Tag.name.label("tag"),
+        )
+        .outerjoin(NoteTag, NoteTag.c.note_id == Note.id)
+        .outerjoin(Tag, Tag.id == NoteTag.c.tag_id)
+        .where(
+            Note.project_id == any_(literal(project_ids, ARRAY(Integer))),
+            Note.deleted_at.is_(None),
+        )
+        .subquery("source")
+    )
+    grouping = func.grouping(source.c.year, source.c.author, source.c.tag)
+    counts = (
+        select(
+            source.c.project_id,
+            source.c.year,
+            source.c.author,
+            source.c.tag,
+            grouping.label("grouping"),
+            # the tags multiply the rows of a note
+            func.count(source.c.note_id.distinct()).label("note_count"),
+        )
+        .group_by(
+            func.grouping_sets(
+                tuple_(source.c.project_id, source.c.year),
+                tuple_(source.c.project_id, source.c.author),
+                tuple_(source.c.project_id, source.c.tag),
+                tuple_(source.c.project_id),
+            )
+        )
+        .subquery("counts")
+    )
+    rank = func.row_number().over(
+        partition_by=(counts.c.project_id, counts.c.grouping),
+        order_by=(
+            counts.c.note_count.desc(),
+            counts.c.author.is_(None),
+            counts.c.author,
+            counts.c.tag,
+        ),
+    )
+    ranked = select(counts, rank.label("rank")).subquery("ranked")
+    query = (
+        select(ranked)
+        .where(
+            or_(
+                ranked.c.grouping.in_([YEARS_GROUPING, TOTAL_GROUPING]),
+                and_(
+                    ranked.c.grouping == AUTHORS_GROUPING,
+                    ranked.c.author.is_not(None),
+                    ranked.c.rank <= top_authors,
+                ),
+                and_(ranked.c.grouping == TAGS_GROUPING, ranked.c.tag.is_not(None)),
+            )
+        )
+        .order_by(
+            ranked.c.project_id,
+            ranked.c.grouping,
+            ranked.c.year.asc().nulls_last(),
+            ranked.c.rank,
+        )
+    )
+    result = await db_session.execute(query)
+
+    analytics: dict[int, dict[str, Any]] = {
+        project_id: {
+            "note_count": 0,
+            "publication_years": [],
+            "top_authors": [],
+            "tags": [],
+        }
+        for project_id in project_ids
+    }
+    for row in result.all():
+        project_analytics = analytics[row.project_id]
+        if row.grouping == TOTAL_GROUPING:
+            project_analytics["note_count"] = row.note_count
+        elif row.grouping == YEARS_GROUPING:
+            project_analytics["publication_years"].append(
+                {"year": row.year, "note_count": row.note_count}
+            )
+        elif row.grouping == AUTHORS_GROUPING:
+            project_analytics["top_authors"].append(
+                {"author": row.author, "note_count": row.note_count}
+            )
+        else:
+            project_analytics["tags"].append(
+                {"tag": row.tag, "note_count": row.note_count}
+            )
+
+    return analytics
+
+
+@traced
+async def get_tag_cooccurrences(
+    project_id: int | None,
+    order_by: TagCooccurrenceOrder,
+    min_count: int,
+    limit: int,
+    db_session: AsyncSession,
+) -> dict[str, Any]:
+    """
+    Returns the number of live notes of 'project_id', or of all the live
+    projects if it is None, and the top 'limit' pairs of tags found together
+    on at least 'min_count' of these notes, with:
+
+    - lift: how many times more often the tags are found together than if
+      they were independent, n(a, b) * n / (n(a) * n(b))
+    - pmi: the pointwise mutual information of the tags in bits, log2(lift)
+
+    The pairs are counted with a self-join of the note-tag associations in a
+    single statement; the number of notes of every tag is read from
+    'project_tag_counts'.
+    """
+    is_live = and_(Note.deleted_at.is_(None), Project.deleted_at.is_(None))
+    project_filter = [Note.project_id == project_id] if project_id is not None else []
+    links = (
+        select(NoteTag.c.note_id, NoteTag.c.tag_id)
+        .join(Note, Note.id == NoteTag.c.note_id)
+        .join(Project, Project.id == Note.project_id)
+        .where(is_live, *project_filter)
+        .cte("links")
+    )
+    other_links = links.alias("other_links")
+    pairs = (
+        select(
+            links.c.tag_id,
+            other_links.c.tag_id.label("other_tag_id"),
+            func.count().label("note_count"),
+        )
+        .join(
+            other_links,
+            and_(
+                other_links.c.note_id == links.c.note_id,
+                other_links.c.tag_id > links.c.tag_id,
+            ),
+        )
+        .group_by(links.c.tag_id, other_links.c.tag_id)
+        .having(func.count() >= min_count)
+        .cte("pairs")
+    )
+
+    stats_filter = (
+        [ProjectStats.project_id == project_id] if project_id is not None else []
+    )
+    note_count = (
+        select(func.coalesce(func.sum(ProjectStats.note_count), 0))
+        .join(Project, Project.id == ProjectStats.project_id)
+        .where(Project.deleted_at.is_(None), *stats_filter)
+        .scalar_subquery()
+    )
+    counts_filter = (
+        [ProjectTagCount.c.project_id == project_id] if project_id is not None else []
+    )
+    tag_counts = (
+        select(
+            ProjectTagCount.c.tag_id,
+            func.sum(ProjectTagCount.c.note_count).label("note_count"),
+        )
+        .join(Project, Project.id == ProjectTagCount.c.project_id)
+        .where(Project.deleted_at.is_(None), *counts_filter)
+        .group_by(ProjectTagCount.c.tag_id)
+        .cte("tag_counts")
+    )
+    other_tag_counts = tag_counts.alias("other_tag_counts")
+    other_tag = Tag.__table__.alias("other_tag")
+
+    lift = (
+        cast(pairs.c.note_count, Float)
+        * note_count
+        / (cast(tag_counts.c.note_count, Float) * other_tag_counts.c.note_count)
+    )
+    pmi = func.ln(lift) / func.ln(2.0)
+    order = {
+        TagCooccurrenceOrder.COUNT: pairs.c.note_count,
+        TagCooccurrenceOrder.LIFT: lift,
+        TagCooccurrenceOrder.PMI: pmi,
+    }[order_by]
+    query = (
+        select(
+            Tag.name.label("tag"),
+            other_tag.c.name.label("other_tag"),
+            pairs.c.note_count,
+            lift.label("lift"),
+            pmi.label("pmi"),
+            note_count.label("total_note_count"),
+        )
+        .select_from(pairs)
+        .join(Tag, Tag.id == pairs.c.tag_id)
+        .join(other_tag, other_tag.c.id == pairs.c.other_tag_id)
+        .join(tag_counts, tag_counts.c.tag_id == pairs.c.tag_id)
+        .join(other_tag_counts, other_tag_counts.c.tag_id == pairs.c.other_tag_id)
+        .order_by(order.desc(), Tag.name, other_tag.c.name)
+        .limit(limit)
+    )
+    rows = (await db_session.execute(query)).all()
+    if rows:
+        total_note_count = rows[0].total_note_count
+    else:
+        total_note_count = await db_session.scalar(select(note_count))
+
+    return {
+        "note_count": total_note_count,
+        "pairs": [
+            {
+                "tag": row.tag,
+                "other_tag": row.other_tag,
+                "note_count": row.note_count,
+                "lift": row.lift,
+                "pmi": row.pmi,
+            }
+            for row in rows
+        ],
+    }
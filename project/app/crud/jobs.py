@@ -0,0 +1,215 @@
+from datetime import timedelta
+from typing import Any, Collection
+
+from sqlalchemy import and_, exists, func, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Job
+from app.schemas.jobs import JobStatus
+from app.tracing import traced
+
+
+@traced
+async def create_job(
+    kind: str, project_id: int, payload: dict[str, Any], db_session: AsyncSession
+) -> Job:
+    job = Job(
+        kind=kind,
+        status=JobStatus.QUEUED,
+        project_id=project_id,
+        payload=payload,
+    )
+    db_session.add(job)
+    await db_session.commit()
+    await db_session.refresh(job)
+
+    return job
+
+
+@traced
+async def get_job_by_id(job_id: int, db_session: AsyncSession) -> Job | None:
+    return await db_session.get(Job, job_id)
+
+
+@traced
+async def get_job_result(job_id: int, db_session: AsyncSession) -> Any:
+    query = select(Job.result).where(Job.id == job_id)
+    return await db_session.scalar(query)
+
+
+@traced
+async def dequeue_job(
+    stale_after: float,
+    max_attempts: int,
+    db_session: AsyncSession,
+    exclude_kinds: Collection[str] = (),
+) -> Job | None:
+    """
+    Claims the oldest queued job that is due, and not of one of 'exclude_kinds',
+    and marks it as running.
+
+    Jobs whose worker stopped sending heartbeats for 'stale_after' seconds are
+    claimed again, until they were attempted 'max_attempts' times; they are
+    failed afterwards. FOR UPDATE SKIP LOCKED lets several workers dequeue
+    concurrently without ever claiming the same job.
+    """
+    stale_before = func.now() - timedelta(seconds=stale_after)
+    is_stale = and_(Job.status == JobStatus.RUNNING, Job.heartbeat_at < stale_before)
+
+    fail_query = (
+        update(Job)
+        .where(is_stale, Job.attempts >= max_attempts)
+        .values(
+            status=JobStatus.FAILED,
+            error="The worker running the job stopped responding.",
+            finished_at=func.now(),
+        )
+    )
+    await db_session.execute(fail_query)
+
+    is_due = and_(Job.status == JobStatus.QUEUED, Job.run_after <= func.now())
+    next_job = (
+        select(Job.id)
+        .where(or_(is_due, is_stale), Job.kind.not_in(exclude_kinds))
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    query = (
+        update(Job)
+        .where(Job.id == next_job)
+        .values(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            started_at=func.now(),
+            heartbeat_at=func.now(),
+        )
+        .returning(Job)
+    )
+    result = await db_session.scalars(query)
+    job = result.one_or_none()
+    await db_session.commit()
+
+    return job
+
+
+def is_claimed(job_id: int, attempt: int) -> ColumnElement[bool]:
+    """
+    Whether the job is still running its attempt 'attempt': a stale job that
+    was claimed again belongs to its new attempt, the worker of the previous
+    one must leave it alone.
+    """
+    return and_(
+        Job.id == job_id, Job.attempts == attempt, Job.status == JobStatus.RUNNING
+    )
+
+
+@traced
+async def update_job_progress(
+    job_id: int,
+    attempt: int,
+    progress: int,
+    total: int | None,
+    db_session: AsyncSession,
+) -> bool:
+    """
+    Returns whether the progress was updated, i.e. the job is still claimed
+    by 'attempt', like touch_job, finish_job and fail_job.
+    """
+    query = (
+        update(Job)
+        .where(is_claimed(job_id, attempt))
+        .values(progress=progress, total=total, heartbeat_at=func.now())
+    )
+    result = await db_session.execute(query)
+    await db_session.commit()
+
+    return result.rowcount > 0
+
+
+@traced
+async def touch_job(job_id: int, attempt: int, db_session: AsyncSession) -> bool:
+    query = (
+        update(Job).where(is_claimed(job_id, attempt)).values(heartbeat_at=func.now())
+    )
+    result = await db_session.execute(query)
+    await db_session.commit()
+
+    return result.rowcount > 0
+
+
+@traced
+async def finish_job(
+    job_id: int, attempt: int, result: Any, db_session: AsyncSession
+) -> bool:
+    query = (
+        update(Job)
+        .where(is_claimed(job_id, attempt))
+        .values(status=JobStatus.SUCCEEDED, result=result, finished_at=func.now())
+    )
+    query_result = await db_session.execute(query)
+    await db_session.commit()
+
+    return query_result.rowcount > 0
+
+
+@traced
+async def fail_job(
+    job_id: int, attempt: int, error: str, db_session: AsyncSession
+) -> bool:
+    query = (
+        update(Job)
+        .where(is_claimed(job_id, attempt))
+        .values(status=JobStatus.FAILED, error=error, finished_at=func.now())
+    )
+    result = await db_session.execute(query)
+    await db_session.commit()
+
+    return result.rowcount > 0
+
+
+@traced
+async def enqueue_job_once(
+    kind: str, payload: dict[str, Any], db_session: AsyncSession
+) -> Job | None:
+    """
+    Enqueues a job unless one of the same kind is already queued or running.
+    A transaction-level advisory lock keyed on the kind serializes concurrent
+    calls, e.g. from several workers.
+
+    Returns the new job, or None if there was one already.
+    """
+    await db_session.execute(
+        select(func.pg_advisory_xact_lock(func.hashtext(f"jobs:{kind}")))
+    )
+    pending = select(
+        exists().where(
+            Job.kind == kind,
+            Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+        )
+    )
+    if await db_session.scalar(pending):
+        await db_session.rollback()
+        return None
+
+    job = Job(kind=kind, status=JobStatus.QUEUED, payload=payload)
+    db_session.add(job)
+    await db_session.commit()
+
+    return job
+
+
+@traced
+async def count_active_queries(db_session: AsyncSession) -> int:
+    """
+    Returns the number of queries being run on the database by other clients,
+    used to postpone maintenance work while the database is busy.
+    """
+    query = text(
+        "SELECT count(*) FROM pg_stat_activity"
+        " WHERE datname = current_database() AND state = 'active'"
+        " AND backend_type = 'client backend' AND pid <> pg_backend_pid()"
+    )
+    return await db_session.scalar(query) or 0
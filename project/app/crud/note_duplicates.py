@@ -0,0 +1,195 @@
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import (
+    BigInteger,
+    Float,
+    Integer,
+    Row,
+    and_,
+    cast,
+    func,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, aliased
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.duplicates import NUM_PERMUTATIONS, lsh_buckets, minhash_signature
+from app.models import Note, NoteSignature
+from app.tracing import traced
+
+
+def signature_similarity(
+    signature: Mapped[list[int]], other: Mapped[list[int]] | ColumnElement[list[int]]
+) -> ColumnElement[float]:
+    """
+    The share of equal values in two signatures, an estimate of the Jaccard
+    similarity of the notes.
+    """
+    pairs = (
+        func.unnest(signature, other)
+        .table_valued("value", "other_value")
+        .render_derived()
+    )
+    equal = (
+        select(func.count())
+        .select_from(pairs)
+        .where(pairs.c.value == pairs.c.other_value)
+        .scalar_subquery()
+    )
+    return cast(equal * 1.0 / NUM_PERMUTATIONS, Float)
+
+
+async def save_note_signatures(notes: Iterable[Any], db_session: AsyncSession) -> None:
+    """
+    Writes the signatures of 'notes', rows with the note's 'id', 'project_id',
+    'name' and 'author', in the current transaction.
+    """
+    signatures = []
+    for note in notes:
+        signature = minhash_signature(note.name, note.author)
+        signatures.append(
+            {
+                "note_id": note.id,
+                "project_id": note.project_id,
+                "signature": signature,
+                "buckets": lsh_buckets(signature),
+            }
+        )
+    if not signatures:
+        return
+
+    query = insert(NoteSignature).values(signatures)
+    query = query.on_conflict_do_update(
+        index_elements=[NoteSignature.note_id],
+        set_={
+            "signature": query.excluded.signature,
+            "buckets": query.excluded.buckets,
+        },
+    )
+    await db_session.execute(query)
+
+
+@traced
+async def get_notes_without_signature(
+    batch_size: int, db_session: AsyncSession
+) -> Sequence[Row[Any]]:
+    query = (
+        select(Note.id, Note.project_id, Note.name, Note.author)
+        .outerjoin(NoteSignature, NoteSignature.note_id == Note.id)
+        .where(NoteSignature.note_id.is_(None))
+        .order_by(Note.id)
+        .limit(batch_size)
+    )
+    result = await db_session.execute(query)
+
+    return result.all()
+
+
+@traced
+async def get_project_duplicates(
+    project_id: int, threshold: float, limit: int, db_session: AsyncSession
+) -> Sequence[Row[Any]]:
+    """
+    Returns the pairs of live notes of 'project_id' that share an LSH bucket
+    and are at least 'threshold' similar, most similar first.
+    """
+    bucket_notes = (
+        select(
+            NoteSignature.note_id, func.unnest(NoteSignature.buckets).label("bucket")
+        )
+        .join(Note, Note.id == NoteSignature.note_id)
+        .where(NoteSignature.project_id == project_id, Note.deleted_at.is_(None))
+        .cte("bucket_notes")
+    )
+    note_bucket = bucket_notes.alias("note_bucket")
+    duplicate_bucket = bucket_notes.alias("duplicate_bucket")
+    candidates = (
+        select(
+            note_bucket.c.note_id,
+            duplicate_bucket.c.note_id.label("duplicate_note_id"),
+        )
+        .join(
+            duplicate_bucket,
+            and_(
+                duplicate_bucket.c.bucket == note_bucket.c.bucket,
+                duplicate_bucket.c.note_id > note_bucket.c.note_id,
+            ),
+        )
+        .distinct()
+        .subquery("candidates")
+    )
+
+    note_signature = aliased(NoteSignature)
+    duplicate_signature = aliased(NoteSignature)
+    similarities = (
+        select(
+            candidates.c.note_id,
+            candidates.c.duplicate_note_id,
+            signature_similarity(
+                note_signature.signature, duplicate_signature.signature
+            ).label("similarity"),
+        )
+        .join(note_signature, note_signature.note_id == candidates.c.note_id)
+        .join(
+            duplicate_signature,
+            duplicate_signature.note_id == candidates.c.duplicate_note_id,
+        )
+        .subquery("similarities")
+    )
+    query = (
+        select(similarities)
+        .where(similarities.c.similarity >= threshold)
+        .order_by(
+            similarities.c.similarity.desc(),
+            similarities.c.note_id,
+            similarities.c.duplicate_note_id,
+        )
+        .limit(limit)
+    )
+    result = await db_session.execute(query)
+
+    return result.all()
+
+
+@traced
+async def find_note_duplicates(
+    project_id: int,
+    name: str,
+    author: str | None,
+    threshold: float,
+    limit: int,
+    db_session: AsyncSession,
+) -> Sequence[Row[Any]]:
+    """
+    Returns the live notes of 'project_id' that are at least 'threshold'
+    similar to a note named 'name' by 'author', most similar first. Only the
+    notes sharing an LSH bucket with it are compared, found with the GIN index
+    on the buckets.
+    """
+    signature = minhash_signature(name, author)
+    buckets = lsh_buckets(signature)
+    similarity = signature_similarity(
+        NoteSignature.signature, literal(signature, ARRAY(Integer))
+    ).label("similarity")
+    candidates = (
+        select(Note.id, Note.name, Note.author, similarity)
+        .join(NoteSignature, NoteSignature.note_id == Note.id)
+        .where(
+            NoteSignature.project_id == project_id,
+            NoteSignature.buckets.overlap(literal(buckets, ARRAY(BigInteger))),
+            Note.deleted_at.is_(None),
+        )
+        .subquery("candidates")
+    )
+    query = (
+        select(candidates)
+        .where(candidates.c.similarity >= threshold)
+        .order_by(candidates.c.similarity.desc(), candidates.c.id)
+        .limit(limit)
+    )
+    result = await db_session.execute(query)
+
+    return result.all()
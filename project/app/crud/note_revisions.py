@@ -0,0 +1,289 @@
+from datetime import datetime
+from os.path import commonprefix
+from typing import Any, Collection, Sequence
+
+from sqlalchemy import (
+    Integer,
+    Select,
+    Text,
+    and_,
+    any_,
+    case,
+    exists,
+    func,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Note, NoteRevision, NoteTag, Tag
+from app.tracing import traced
+
+# the fields of a note its revisions keep track of
+REVISION_FIELDS = (
+    "name",
+    "author",
+    "publication_details",
+    "publication_year",
+    "comments",
+    "tags",
+)
+
+# text fields at least this long only store the span that was edited
+SPLICE_MIN_LENGTH = 200
+
+
+def diff_text(old: str, new: str) -> dict[str, Any]:
+    """
+    Returns the splice turning 'old' into 'new': old[start:end] is replaced
+    by 'text'.
+    """
+    start = len(commonprefix([old, new]))
+    end = len(old)
+    new_end = len(new)
+    while end > start and new_end > start and old[end - 1] == new[new_end - 1]:
+        end -= 1
+        new_end -= 1
+    return {"start": start, "end": end, "text": new[start:new_end]}
+
+
+def diff_note_states(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """
+    Returns the fields of 'new' that differ from 'old', mapped to their new
+    value, or to the splice turning the old value into the new one for long
+    texts.
+    """
+    delta = {}
+    for field in REVISION_FIELDS:
+        old_value, new_value = old[field], new[field]
+        if old_value == new_value:
+            continue
+        if (
+            isinstance(old_value, str)
+            and isinstance(new_value, str)
+            and len(old_value) >= SPLICE_MIN_LENGTH
+        ):
+            delta[field] = diff_text(old_value, new_value)
+        else:
+            delta[field] = new_value
+    return delta
+
+
+def apply_note_delta(state: dict[str, Any], delta: dict[str, Any]) -> dict[str, Any]:
+    state = dict(state)
+    for field, value in delta.items():
+        # no field holds a mapping, so a mapping is always a splice
+        if isinstance(value, dict):
+            old_value = state[field]
+            value = (
+                old_value[: value["start"]] + value["text"] + old_value[value["end"] :]
+            )
+        state[field] = value
+    return state
+
+
+def rebuild_note_revision(revisions: Sequence[NoteRevision]) -> dict[str, Any]:
+    """
+    Returns the state of the note at the last of 'revisions', which start
+    with a snapshot and are in revision order.
+    """
+    state = revisions[0].data
+    for revision in revisions[1:]:
+        state = (
+            revision.data
+            if revision.is_snapshot
+            else apply_note_delta(state, revision.data)
+        )
+    return state
+
+
+def is_snapshot_revision(revision: int, snapshot_interval: int) -> bool:
+    return (revision - 1) % snapshot_interval == 0
+
+
+def note_tag_names() -> ColumnElement[list[str]]:
+    """
+    The names of the tags of the note, in name order, as a subquery
+    correlated to 'notes'.
+    """
+    tags = (
+        select(Tag.name)
+        .join(NoteTag, NoteTag.c.tag_id == Tag.id)
+        .where(NoteTag.c.note_id == Note.id)
+        .order_by(Tag.name)
+        .scalar_subquery()
+    )
+    return func.array(tags)
+
+
+def last_note_revision() -> ColumnElement[int]:
+    """
+    The last revision of the note, 0 if there is none, as a subquery
+    correlated to 'notes'.
+    """
+    last_revision = (
+        select(func.max(NoteRevision.revision))
+        .where(NoteRevision.note_id == Note.id)
+        .scalar_subquery()
+    )
+    return func.coalesce(last_revision, 0)
+
+
+def note_state(tags: ColumnElement[list[str]]) -> ColumnElement[Any]:
+    fields = {field: getattr(Note, field) for field in REVISION_FIELDS[:-1]}
+    fields["tags"] = tags
+    arguments = [item for field, value in fields.items() for item in (field, value)]
+    return func.jsonb_build_object(*arguments)
+
+
+async def add_note_revision(
+    old_note: Any,
+    new_note: Any,
+    snapshot_interval: int,
+    db_session: AsyncSession,
+) -> None:
+    """
+    Records the change from 'old_note' to 'new_note', rows having the
+    REVISION_FIELDS and 'old_note' also the note's 'last_revision' and
+    'created_at'. Nothing is recorded if no field changed.
+
+    The first change of a note also records the note as it was before as its
+    first revision, so that notes never changed take no space.
+    """
+    old_state = {field: getattr(old_note, field) for field in REVISION_FIELDS}
+    new_state = {field: getattr(new_note, field) for field in REVISION_FIELDS}
+    delta = diff_note_states(old_state, new_state)
+    if not delta:
+        return
+
+    revisions = []
+    last_revision = old_note.last_revision
+    if last_revision == 0:
+        revisions.append(
+            {
+                "note_id": new_note.id,
+                "revision": 1,
+                "is_snapshot": True,
+                "changed_fields": [],
+                "data": old_state,
+                "created_at": old_note.created_at,
+            }
+        )
+        last_revision = 1
+
+    revision = last_revision + 1
+    is_snapshot = is_snapshot_revision(revision, snapshot_interval)
+    revisions.append(
+        {
+            "note_id": new_note.id,
+            "revision": revision,
+            "is_snapshot": is_snapshot,
+            "changed_fields": list(delta),
+            "data": new_state if is_snapshot else delta,
+            "created_at": func.now(),
+        }
+    )
+    await db_session.execute(insert(NoteRevision).values(revisions))
+
+
+async def add_first_note_revisions(
+    note_ids: Select[tuple[int]], db_session: AsyncSession
+) -> None:
+    """
+    Records the notes of 'note_ids' that have no revision yet as they are as
+    their first revision, before set-based statements change them.
+    """
+    query = insert(NoteRevision).from_select(
+        ["note_id", "revision", "is_snapshot", "changed_fields", "data", "created_at"],
+        note_ids.add_columns(
+            literal(1),
+            literal(True),
+            literal([], ARRAY(Text)),
+            note_state(note_tag_names()),
+            Note.created_at,
+        ).where(~exists().where(NoteRevision.note_id == Note.id)),
+    )
+    await db_session.execute(query)
+
+
+async def add_tags_revisions(
+    note_ids: Collection[int], snapshot_interval: int, db_session: AsyncSession
+) -> None:
+    """
+    Records the new tags of the notes of 'note_ids', whose first revision was
+    recorded by add_first_note_revisions before their tags were changed.
+    """
+    revision = last_note_revision() + 1
+    is_snapshot = (revision - 1) % snapshot_interval == 0
+    tags = note_tag_names()
+    query = insert(NoteRevision).from_select(
+        ["note_id", "revision", "is_snapshot", "changed_fields", "data"],
+        select(
+            Note.id,
+            revision,
+            is_snapshot,
+            literal(["tags"], ARRAY(Text)),
+            case(
+                (is_snapshot, note_state(tags)),
+                else_=func.jsonb_build_object("tags", tags),
+            ),
+        ).where(Note.id == any_(literal(list(note_ids), ARRAY(Integer)))),
+    )
+    await db_session.execute(query)
+
+
+@traced
+async def get_note_revisions(note_id: int, db_session: AsyncSession) -> list[Any]:
+    query = (
+        select(
+            NoteRevision.revision,
+            NoteRevision.created_at,
+            NoteRevision.changed_fields,
+        )
+        .where(NoteRevision.note_id == note_id)
+        .order_by(NoteRevision.revision)
+    )
+    result = await db_session.execute(query)
+
+    return list(result.all())
+
+
+@traced
+async def get_note_revision(
+    note_id: int, revision: int, db_session: AsyncSession
+) -> tuple[dict[str, Any], datetime] | None:
+    """
+    Returns the state of the note at 'revision' and the time it was made,
+    rebuilt from the last snapshot up to it, or None if the note has no such
+    revision.
+
+    A note that was never changed has no revisions: its only revision is the
+    note itself, which the caller has to fall back to.
+    """
+    last_snapshot = (
+        select(func.max(NoteRevision.revision))
+        .where(
+            NoteRevision.note_id == note_id,
+            NoteRevision.is_snapshot,
+            NoteRevision.revision <= revision,
+        )
+        .scalar_subquery()
+    )
+    query = (
+        select(NoteRevision)
+        .where(
+            and_(
+                NoteRevision.note_id == note_id,
+                NoteRevision.revision.between(last_snapshot, revision),
+            )
+        )
+        .order_by(NoteRevision.revision)
+    )
+    revisions = (await db_session.scalars(query)).all()
+    if not revisions or revisions[-1].revision != revision:
+        return None
+
+    return rebuild_note_revision(revisions), revisions[-1].created_at
@@ -1,66 +1,223 @@
+from datetime import timedelta
 from typing import Any, Iterable
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload, selectinload
 
+from app.models import Job, Note
 from app.models import Project as ProjectDBModel
+from app.schemas.jobs import JobStatus
 from app.schemas.project import ProjectPayloadSchema
+from app.tracing import traced
 
 
+@traced
 async def get_project_by_id(
     db_session: AsyncSession, project_id: int
 ) -> ProjectDBModel | None:
-    query = select(ProjectDBModel).where(ProjectDBModel.id == project_id)
+    # the notes are not needed, the stats of the project are joined instead
+    query = (
+        select(ProjectDBModel)
+        .where(ProjectDBModel.id == project_id, ProjectDBModel.deleted_at.is_(None))
+        .options(lazyload(ProjectDBModel.notes))
+    )
     query_result = await db_session.scalars(query)
     project = query_result.unique().one_or_none()
 
     return project
 
 
-async def get_project_by_name(
-    project_name: str, db_session: AsyncSession
-) -> ProjectDBModel | None:
-    query = select(ProjectDBModel).where(ProjectDBModel.name == project_name)
-    query_result = await db_session.scalars(query)
-    project = query_result.unique().one_or_none()
+@traced
+async def project_exists(project_id: int, db_session: AsyncSession) -> bool:
+    query = select(
+        exists().where(
+            ProjectDBModel.id == project_id, ProjectDBModel.deleted_at.is_(None)
+        )
+    )
+    result = await db_session.scalar(query)
 
-    return project
+    return bool(result)
 
 
+@traced
 async def post_project(
     payload: ProjectPayloadSchema, db_session: AsyncSession
 ) -> ProjectDBModel:
     new_project = ProjectDBModel(name=payload.name, comment=payload.comment)
     db_session.add(new_project)
-    await db_session.commit()
+    # a taken name, including the name of a project in the trash, raises the
+    # IntegrityError of the 'ix_projects_name' unique index
+    try:
+        await db_session.commit()
+    except IntegrityError:
+        await db_session.rollback()
+        raise
     await db_session.refresh(new_project)
 
     return new_project
 
 
+@traced
 async def get_all_projects(db_session: AsyncSession) -> Iterable[ProjectDBModel] | None:
-    query = select(ProjectDBModel).order_by(ProjectDBModel.id)
+    # a single scan of the projects joined with their stats, however many
+    # notes they have
+    query = (
+        select(ProjectDBModel)
+        .where(ProjectDBModel.deleted_at.is_(None))
+        .order_by(ProjectDBModel.id)
+        .options(lazyload(ProjectDBModel.notes))
+    )
     all_projects = await db_session.scalars(query)
 
     return all_projects.unique()
 
 
+@traced
 async def update_project(
     project_id: int, payload: dict[str, Any], db_session: AsyncSession
-) -> ProjectDBModel:
+) -> ProjectDBModel | None:
+    """
+    Updates the project unless it does not exist or is in the trash, in which
+    case None is returned.
+
+    A name that is already taken raises the IntegrityError of the
+    'ix_projects_name' unique index.
+    """
     query = (
         update(ProjectDBModel)
-        .where(ProjectDBModel.id == project_id)
+        .where(ProjectDBModel.id == project_id, ProjectDBModel.deleted_at.is_(None))
         .values(payload)
         .returning(ProjectDBModel)
+        .options(selectinload(ProjectDBModel.stats))
+    )
+    try:
+        result = await db_session.scalars(query)
+    except IntegrityError:
+        await db_session.rollback()
+        raise
+    project = result.unique().one_or_none()
+    await db_session.commit()
+
+    return project
+
+
+@traced
+async def remove_project(
+    project_id: int, retention: timedelta, db_session: AsyncSession
+) -> Job | None:
+    """
+    Moves the project to the trash and schedules the job purging it once
+    'retention' is over, in a single transaction.
+
+    Returns the purge job, or None if the project does not exist.
+    """
+    query = (
+        update(ProjectDBModel)
+        .where(ProjectDBModel.id == project_id, ProjectDBModel.deleted_at.is_(None))
+        .values(deleted_at=func.now())
+        .returning(ProjectDBModel.id)
+    )
+    result = await db_session.execute(query)
+    if result.scalar_one_or_none() is None:
+        return None
+
+    job = Job(
+        kind="purge_project",
+        status=JobStatus.QUEUED,
+        project_id=project_id,
+        payload={"kind": "purge_project", "project_id": project_id},
+        run_after=func.now() + retention,
+    )
+    db_session.add(job)
+    await db_session.commit()
+
+    return job
+
+
+@traced
+async def get_deleted_projects(db_session: AsyncSession) -> Iterable[ProjectDBModel]:
+    query = (
+        select(ProjectDBModel)
+        .where(ProjectDBModel.deleted_at.is_not(None))
+        .order_by(ProjectDBModel.deleted_at.desc())
+        .options(lazyload(ProjectDBModel.notes))
+    )
+    deleted_projects = await db_session.scalars(query)
+
+    return deleted_projects.unique().all()
+
+
+@traced
+async def restore_project(
+    project_id: int, db_session: AsyncSession
+) -> ProjectDBModel | None:
+    """
+    Takes the project out of the trash and cancels its purge job, in a single
+    transaction.
+
+    Returns None if the project is not in the trash, or if its purge has
+    already started.
+    """
+    # the job row is locked by a worker dequeuing it; waiting for that lock
+    # guarantees the purge either has not started and is cancelled, or has
+    # started and the project is not restored
+    cancel_query = (
+        delete(Job)
+        .where(
+            Job.project_id == project_id,
+            Job.kind == "purge_project",
+            Job.status == JobStatus.QUEUED,
+        )
+        .returning(Job.id)
+    )
+    cancelled = await db_session.execute(cancel_query)
+    if cancelled.scalar_one_or_none() is None:
+        await db_session.rollback()
+        return None
+
+    query = (
+        update(ProjectDBModel)
+        .where(ProjectDBModel.id == project_id, ProjectDBModel.deleted_at.is_not(None))
+        .values(deleted_at=None)
+        .returning(ProjectDBModel)
+        .options(selectinload(ProjectDBModel.stats))
     )
     result = await db_session.scalars(query)
+    project = result.unique().one_or_none()
     await db_session.commit()
 
-    return result.unique().one()
+    return project
 
 
-async def remove_project(project_id: int, db_session: AsyncSession) -> None:
-    query = delete(ProjectDBModel).where(ProjectDBModel.id == project_id)
+@traced
+async def purge_project_notes(
+    project_id: int, batch_size: int, db_session: AsyncSession
+) -> int:
+    """
+    Deletes at most 'batch_size' notes of a project, their notes_tags rows
+    being removed by the ON DELETE CASCADE foreign key, and commits.
+
+    Returns the number of deleted notes.
+    """
+    batch = (
+        select(Note.id)
+        .where(Note.project_id == project_id)
+        .order_by(Note.id)
+        .limit(batch_size)
+    )
+    query = delete(Note).where(Note.id.in_(batch))
+    result = await db_session.execute(query)
+    await db_session.commit()
+
+    return result.rowcount
+
+
+@traced
+async def purge_project(project_id: int, db_session: AsyncSession) -> None:
+    query = delete(ProjectDBModel).where(
+        ProjectDBModel.id == project_id, ProjectDBModel.deleted_at.is_not(None)
+    )
     await db_session.execute(query)
     await db_session.commit()
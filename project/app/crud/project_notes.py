@@ -1,15 +1,45 @@
-from typing import Any, Iterable
-
-from sqlalchemy import Row, and_, delete, select, update
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import (
+    Row,
+    Select,
+    and_,
+    delete,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Note, Project, Tag
-from app.schemas.project_notes import ProjectNotePayloadSchema
-
-
+from app.crud.note_duplicates import save_note_signatures
+from app.crud.note_revisions import (
+    add_first_note_revisions,
+    add_note_revision,
+    add_tags_revisions,
+    last_note_revision,
+    note_tag_names,
+)
+from app.models import Note, NoteTag, Project, Tag, normalized_tag_name
+from app.schemas.project_notes import (
+    ProjectNotePayloadSchema,
+    ProjectNotesSelectionSchema,
+)
+from app.tracing import traced
+
+
+@traced
 async def get_note_by_name_and_project(
     note_name: str, project_id: int, db_session: AsyncSession
 ) -> Row[tuple[str, str]] | None:
+    # notes in the trash are not filtered out, their name stays taken until
+    # they are purged
     query = (
         select(Note.name.label("note_name"), Project.name.label("project_name"))
         .join(Note.project)
@@ -21,19 +51,35 @@ async def get_note_by_name_and_project(
     return note
 
 
+@traced
 async def get_all_notes_for_project(
-    project_id: int, db_session: AsyncSession
+    project_id: int, db_session: AsyncSession, updated_since: datetime | None = None
 ) -> Iterable[Note]:
-    query = select(Note).where(Note.project_id == project_id)
+    query = (
+        select(Note)
+        .where(Note.project_id == project_id, Note.deleted_at.is_(None))
+        .order_by(Note.id)
+    )
+    if updated_since is not None:
+        # found with the 'ix_notes_project_id_updated_at' index
+        query = query.where(Note.updated_at > updated_since)
     all_project_notes = await db_session.scalars(query)
     result = all_project_notes.unique().all()
 
     return result
 
 
+@traced
 async def insert_note(
     payload: ProjectNotePayloadSchema, project_id: int, db_session: AsyncSession
 ) -> Note:
+    """
+    Inserts the note and attaches its tags, inserting the tags that do not
+    exist yet, in a single transaction.
+
+    A note name that is already taken in the project raises the IntegrityError
+    of the 'uq_notes_project_id' constraint.
+    """
     new_note = Note(
         project_id=project_id,
         name=payload.note_name,
@@ -43,93 +89,556 @@ async def insert_note(
         comments=payload.note_comments,
     )
     db_session.add(new_note)
-    await db_session.commit()
-    await db_session.refresh(new_note)
+    try:
+        await db_session.flush()
+    except IntegrityError:
+        await db_session.rollback()
+        raise
+    await save_note_signatures(notes=[new_note], db_session=db_session)
 
     if payload.note_tags:
-        await add_tags_to_note(
-            tags=payload.note_tags, note=new_note, db_session=db_session
+        insert_tags_query = (
+            insert(Tag)
+            .values([{"name": tag} for tag in set(payload.note_tags)])
+            .on_conflict_do_nothing(index_elements=[normalized_tag_name(Tag.name)])
         )
+        await db_session.execute(insert_tags_query)
+
+        add_query = (
+            insert(NoteTag)
+            .from_select(
+                ["note_id", "tag_id"],
+                select(literal(new_note.id), Tag.id).where(
+                    normalized_tag_name(Tag.name).in_(payload.note_tags)
+                ),
+            )
+            .on_conflict_do_nothing()
+        )
+        await db_session.execute(add_query)
+
+    await db_session.commit()
+    await db_session.refresh(new_note)
 
     return new_note
 
 
-async def get_tags_to_be_inserted(
-    tags: Iterable[str], db_session: AsyncSession
-) -> list[str]:
-    query = select(Tag.name).where(Tag.name.in_(tags))
-    result = await db_session.scalars(query)
-    existing_tags_result = result.all()
+@traced
+async def get_note_by_id(note_id: int, db_session: AsyncSession) -> Note | None:
+    query = select(Note).where(Note.id == note_id, Note.deleted_at.is_(None))
+    query_result = await db_session.scalars(query)
+    note = query_result.unique().one_or_none()
 
-    all_tags = set(tags)
-    existing_tags = set(existing_tags_result)
-    missing_tags = all_tags - existing_tags
+    return note
 
-    return list(missing_tags)
 
+@traced
+async def get_notes_for_citation(
+    project_id: int, db_session: AsyncSession, note_id: int | None = None
+) -> Sequence[Row[Any]]:
+    """
+    Returns the live notes of 'project_id', or only 'note_id', with the fields
+    citations are rendered from and the version of the note, its last
+    revision, which citations are cached with. There are none if the project
+    is in the trash.
+    """
+    query = (
+        select(
+            Note.id,
+            Note.name,
+            Note.author,
+            Note.publication_details,
+            Note.publication_year,
+            last_note_revision().label("version"),
+        )
+        .join(Project, Project.id == Note.project_id)
+        .where(
+            Note.project_id == project_id,
+            Note.deleted_at.is_(None),
+            Project.deleted_at.is_(None),
+        )
+        .order_by(Note.id)
+    )
+    if note_id is not None:
+        query = query.where(Note.id == note_id)
+    result = await db_session.execute(query)
+
+    return result.all()
+
+
+@traced
+async def update_note(
+    note_id: int,
+    project_id: int,
+    payload: dict[str, Any],
+    tags: list[str] | None,
+    snapshot_interval: int,
+    db_session: AsyncSession,
+) -> Row[Any] | None:
+    """
+    Updates the note with 'payload' and, unless 'tags' is None, sets its tags to
+    'tags', and records the change as a revision of the note, all in a single
+    transaction. The note is locked before its old state is read, the tag
+    statements only match the note if it is a live note of 'project_id', and
+    the final UPDATE ... RETURNING returns the note with its tags.
+
+    Returns None, after rolling back, if the note is not a live note of the
+    project, or if the project is in the trash. Renaming the note to a name taken in the project raises the
+    IntegrityError of the 'uq_notes_project_id' constraint.
+    """
+    # joined with the project, the notes of a project in the trash cannot be
+    # changed either
+    is_project_note = and_(
+        Note.id == note_id,
+        Note.project_id == project_id,
+        Note.deleted_at.is_(None),
+        Project.id == Note.project_id,
+        Project.deleted_at.is_(None),
+    )
+
+    # the old state is read by a statement of its own once the lock is held:
+    # the subqueries of a SELECT ... FOR UPDATE that waited for the lock still
+    # see the snapshot taken before, without the revision the other writer
+    # added, and the note would get the same revision twice
+    lock_query = select(Note.id).where(is_project_note).with_for_update(of=Note)
+    if (await db_session.execute(lock_query)).one_or_none() is None:
+        await db_session.rollback()
+        return None
+
+    old_note_query = select(
+        Note.name,
+        Note.author,
+        Note.publication_details,
+        Note.publication_year,
+        Note.comments,
+        Note.created_at,
+        note_tag_names().label("tags"),
+        last_note_revision().label("last_revision"),
+    ).where(Note.id == note_id)
+    old_note = (await db_session.execute(old_note_query)).one()
+
+    if tags is not None:
+        remove_query = delete(NoteTag).where(
+            NoteTag.c.note_id.in_(select(Note.id).where(is_project_note)),
+            NoteTag.c.tag_id.not_in(
+                select(Tag.id).where(normalized_tag_name(Tag.name).in_(tags))
+            ),
+        )
+        await db_session.execute(remove_query)
 
-async def insert_tags(tags: list[str], db_session: AsyncSession) -> None:
-    for tag in tags:
-        new_tag = Tag(name=tag)
-        db_session.add(new_tag)
+    if tags:
+        insert_tags_query = (
+            insert(Tag)
+            .values([{"name": tag} for tag in set(tags)])
+            .on_conflict_do_nothing(index_elements=[normalized_tag_name(Tag.name)])
+        )
+        await db_session.execute(insert_tags_query)
+
+        add_query = (
+            insert(NoteTag)
+            .from_select(
+                ["note_id", "tag_id"],
+                select(Note.id, Tag.id)
+                .join(Tag, true())
+                .where(is_project_note, normalized_tag_name(Tag.name).in_(tags)),
+            )
+            .on_conflict_do_nothing()
+        )
+        await db_session.execute(add_query)
 
+    # a tags only update still touches the row
+    query = (
+        update(Note)
+        .where(is_project_note)
+        .values(payload or {"name": Note.name})
+        .returning(
+            Note.id,
+            Note.project_id,
+            Note.name,
+            Note.author,
+            Note.publication_details,
+            Note.publication_year,
+            Note.comments,
+            Note.created_at,
+            Note.updated_at,
+            note_tag_names().label("tags"),
+        )
+    )
+    try:
+        result = await db_session.execute(query)
+    except IntegrityError:
+        await db_session.rollback()
+        raise
+    note = result.one()
+    if "name" in payload or "author" in payload:
+        await save_note_signatures(notes=[note], db_session=db_session)
+    await add_note_revision(
+        old_note=old_note,
+        new_note=note,
+        snapshot_interval=snapshot_interval,
+        db_session=db_session,
+    )
     await db_session.commit()
 
+    return note
 
-async def get_tags_by_name(
-    tags: Iterable[str], db_session: AsyncSession
-) -> Iterable[Tag]:
-    query = select(Tag).where(Tag.name.in_(tags))
-    query_result = await db_session.scalars(query)
-    result = query_result.all()
 
-    return result
+@traced
+async def delete_note(note_id: int, db_session: AsyncSession) -> None:
+    query = update(Note).where(Note.id == note_id).values(deleted_at=func.now())
+    await db_session.execute(query)
+    await db_session.commit()
 
 
-async def get_note_by_id(note_id: int, db_session: AsyncSession) -> Note | None:
-    query = select(Note).where(Note.id == note_id)
-    query_result = await db_session.scalars(query)
-    note = query_result.unique().one_or_none()
+@traced
+async def get_deleted_notes_for_project(
+    project_id: int, db_session: AsyncSession
+) -> Iterable[Note]:
+    query = (
+        select(Note)
+        .where(Note.project_id == project_id, Note.deleted_at.is_not(None))
+        .order_by(Note.deleted_at.desc())
+    )
+    deleted_notes = await db_session.scalars(query)
 
-    return note
+    return deleted_notes.unique().all()
 
 
-async def update_note(
-    payload: dict[str, Any], note_id: int, db_session: AsyncSession
-) -> Note:
-    query = update(Note).where(Note.id == note_id).values(payload).returning(Note)
+@traced
+async def restore_note(
+    note_id: int, project_id: int, db_session: AsyncSession
+) -> Note | None:
+    query = (
+        update(Note)
+        .where(
+            Note.id == note_id,
+            Note.project_id == project_id,
+            Note.deleted_at.is_not(None),
+        )
+        .values(deleted_at=None)
+        .returning(Note)
+    )
     result = await db_session.scalars(query)
+    note = result.unique().one_or_none()
     await db_session.commit()
 
-    return result.unique().one()
+    return note
 
 
-async def add_tags_to_note(
-    tags: Iterable[str], note: Note, db_session: AsyncSession
-) -> None:
-    tags_to_be_added: Iterable[Tag] = await get_tags_by_name(
-        tags=tags, db_session=db_session
+@traced
+async def purge_deleted_notes(
+    retention: timedelta, batch_size: int, db_session: AsyncSession
+) -> int:
+    """
+    Permanently deletes at most 'batch_size' notes that have been in the trash
+    for longer than 'retention', and commits.
+
+    Returns the number of deleted notes.
+    """
+    batch = (
+        select(Note.id)
+        .where(Note.deleted_at < func.now() - retention)
+        .order_by(Note.deleted_at)
+        .limit(batch_size)
     )
-    note.tags.extend(tags_to_be_added)
-
+    query = delete(Note).where(Note.id.in_(batch))
+    result = await db_session.execute(query)
     await db_session.commit()
-    await db_session.refresh(note)
+
+    return result.rowcount
 
 
-async def remove_tags_from_note(
-    tags: Iterable[str], note: Note, db_session: AsyncSession
-) -> None:
-    tags_to_be_removed: Iterable[Tag] = await get_tags_by_name(
-        tags=tags, db_session=db_session
+def select_note_ids(
+    project_id: int, selection: ProjectNotesSelectionSchema
+) -> Select[tuple[int]]:
+    query = select(Note.id).where(
+        Note.project_id == project_id, Note.deleted_at.is_(None)
     )
-    for tag in tags_to_be_removed:
-        note.tags.remove(tag)
 
+    if selection.note_ids is not None:
+        return query.where(Note.id.in_(selection.note_ids))
+
+    filters = selection.filter
+    if filters is None:
+        return query
+    if filters.tag is not None:
+        query = query.where(
+            Note.id.in_(
+                select(NoteTag.c.note_id)
+                .join(Tag, Tag.id == NoteTag.c.tag_id)
+                .where(normalized_tag_name(Tag.name) == filters.tag)
+            )
+        )
+    if filters.publication_year_from is not None:
+        query = query.where(Note.publication_year >= filters.publication_year_from)
+    if filters.publication_year_to is not None:
+        query = query.where(Note.publication_year <= filters.publication_year_to)
+    if filters.created_from is not None:
+        query = query.where(Note.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        query = query.where(Note.created_at <= filters.created_to)
+
+    return query
+
+
+@traced
+async def bulk_update_notes_tags(
+    project_id: int,
+    selection: ProjectNotesSelectionSchema,
+    add_tags: Iterable[str],
+    remove_tags: Iterable[str],
+    snapshot_interval: int,
+    db_session: AsyncSession,
+) -> tuple[int, int]:
+    """
+    Adds and removes tags for all the notes matched by 'selection' using
+    set-based statements on 'notes_tags', and records the new tags of the
+    changed notes as revisions, all in a single transaction.
+
+    Returns the number of added and removed note-tag associations.
+    """
+    note_ids = select_note_ids(project_id=project_id, selection=selection)
+    add_tags = list(add_tags)
+    remove_tags = list(remove_tags)
+    add_tag_ids = select(Tag.id).where(normalized_tag_name(Tag.name).in_(add_tags))
+    remove_tag_ids = select(Tag.id).where(
+        normalized_tag_name(Tag.name).in_(remove_tags)
+    )
+    changed_note_ids: set[int] = set()
+    added = removed = 0
+
+    # the selected notes are locked first, in id order, so that their
+    # revisions are read and added by the statements below while no other
+    # transaction can add any, see update_note
+    lock_query = note_ids.order_by(Note.id).with_for_update()
+    await db_session.execute(lock_query)
+
+    if add_tags:
+        insert_tags_query = (
+            insert(Tag)
+            .values([{"name": tag} for tag in add_tags])
+            .on_conflict_do_nothing(index_elements=[normalized_tag_name(Tag.name)])
+        )
+        await db_session.execute(insert_tags_query)
+
+    # the notes about to change that were never changed keep their current
+    # state as their first revision
+    has_tag = (
+        exists()
+        .where(NoteTag.c.note_id == Note.id, NoteTag.c.tag_id == Tag.id)
+        .correlate_except(NoteTag)
+    )
+    will_change = or_(
+        exists().where(Tag.id.in_(remove_tag_ids), has_tag),
+        exists().where(Tag.id.in_(add_tag_ids), ~has_tag),
+    )
+    await add_first_note_revisions(
+        note_ids=note_ids.where(will_change), db_session=db_session
+    )
+
+    if remove_tags:
+        remove_query = (
+            delete(NoteTag)
+            .where(
+                NoteTag.c.note_id.in_(note_ids),
+                NoteTag.c.tag_id.in_(remove_tag_ids),
+            )
+            .returning(NoteTag.c.note_id)
+        )
+        result = await db_session.scalars(remove_query)
+        removed_note_ids = result.all()
+        changed_note_ids.update(removed_note_ids)
+        removed = len(removed_note_ids)
+
+    if add_tags:
+        add_query = (
+            insert(NoteTag)
+            .from_select(
+                ["note_id", "tag_id"],
+                note_ids.add_columns(Tag.id)
+                .join(Tag, true())
+                .where(Tag.id.in_(add_tag_ids)),
+            )
+            .on_conflict_do_nothing()
+            .returning(NoteTag.c.note_id)
+        )
+        result = await db_session.scalars(add_query)
+        added_note_ids = result.all()
+        changed_note_ids.update(added_note_ids)
+        added = len(added_note_ids)
+
+    if changed_note_ids:
+        await add_tags_revisions(
+            note_ids=changed_note_ids,
+            snapshot_interval=snapshot_interval,
+            db_session=db_session,
+        )
     await db_session.commit()
-    await db_session.refresh(note)
 
+    return added, removed
+
+
+@traced
+async def bulk_delete_notes(
+    project_id: int,
+    selection: ProjectNotesSelectionSchema,
+    batch_size: int,
+    db_session: AsyncSession,
+) -> tuple[int, int]:
+    """
+    Deletes all the notes matched by 'selection' in batches of at most
+    'batch_size' notes, committing after each batch so that no single
+    transaction holds locks on the whole selection. The notes tags
+    associations are removed by the ON DELETE CASCADE foreign key.
+
+    Returns the number of deleted notes and note-tag associations.
+    """
+    deleted_notes = deleted_note_tags = 0
+
+    while True:
+        batch = (
+            select_note_ids(project_id=project_id, selection=selection)
+            .order_by(Note.id)
+            .limit(batch_size)
+        )
+        deleted = (
+            delete(Note).where(Note.id.in_(batch)).returning(Note.id).cte("deleted")
+        )
+        # the CTE's sub-statements all see the same snapshot, so the
+        # associations about to be cascaded are still visible here
+        query = select(
+            select(func.count()).select_from(deleted).scalar_subquery(),
+            select(func.count())
+            .select_from(NoteTag)
+            .where(NoteTag.c.note_id.in_(select(deleted.c.id)))
+            .scalar_subquery(),
+        )
+        result = await db_session.execute(query)
+        notes_count, note_tags_count = result.one()
+        await db_session.commit()
+
+        deleted_notes += notes_count
+        deleted_note_tags += note_tags_count
+        if notes_count < batch_size:
+            break
+
+    return deleted_notes, deleted_note_tags
+
+
+@traced
+async def count_notes_for_project(
+    project_id: int, db_session: AsyncSession, include_deleted: bool = False
+) -> int:
+    query = select(func.count()).select_from(Note).where(Note.project_id == project_id)
+    if not include_deleted:
+        query = query.where(Note.deleted_at.is_(None))
+    return await db_session.scalar(query) or 0
+
+
+@traced
+async def get_notes_page(
+    project_id: int, after_note_id: int, limit: int, db_session: AsyncSession
+) -> list[Row[Any]]:
+    """
+    Returns the next 'limit' notes of a project after 'after_note_id', ordered
+    by id, with their tag names aggregated in a 'tags' column.
+    """
+    query = (
+        select(
+            Note.id,
+            Note.project_id,
+            Note.name,
+            Note.author,
+            Note.publication_details,
+            Note.publication_year,
+            Note.comments,
+            Note.created_at,
+            Note.updated_at,
+            func.array_remove(func.array_agg(Tag.name), None).label("tags"),
+        )
+        .outerjoin(NoteTag, NoteTag.c.note_id == Note.id)
+        .outerjoin(Tag, Tag.id == NoteTag.c.tag_id)
+        .where(
+            Note.project_id == project_id,
+            Note.deleted_at.is_(None),
+            Note.id > after_note_id,
+        )
+        .group_by(Note.id)
+        .order_by(Note.id)
+        .limit(limit)
+    )
+    result = await db_session.execute(query)
+
+    return list(result.all())
+
+
+@traced
+async def import_notes(
+    project_id: int,
+    notes: list[ProjectNotePayloadSchema],
+    db_session: AsyncSession,
+) -> int:
+    """
+    Inserts 'notes' and their tags with a few multi-row statements, in a single
+    transaction. Notes whose name already exists in the project are skipped.
+
+    Returns the number of imported notes.
+    """
+    tags = {tag for note in notes for tag in note.note_tags}
+    if tags:
+        insert_tags_query = (
+            insert(Tag)
+            .values([{"name": tag} for tag in tags])
+            .on_conflict_do_nothing(index_elements=[normalized_tag_name(Tag.name)])
+        )
+        await db_session.execute(insert_tags_query)
+
+    insert_notes_query = (
+        insert(Note)
+        .values(
+            [
+                {
+                    "project_id": project_id,
+                    "name": note.note_name,
+                    "author": note.note_author,
+                    "publication_details": note.note_publication_details,
+                    "publication_year": note.note_publication_year,
+                    "comments": note.note_comments,
+                    "created_at": func.now(),
+                }
+                for note in notes
+            ]
+        )
+        .on_conflict_do_nothing(constraint="uq_notes_project_id")
+        .returning(Note.id, Note.project_id, Note.name, Note.author)
+    )
+    result = await db_session.execute(insert_notes_query)
+    imported_notes = result.all()
+    note_ids = {note.name: note.id for note in imported_notes}
+    await save_note_signatures(notes=imported_notes, db_session=db_session)
+
+    note_tags = {
+        (note_ids[note.note_name], tag)
+        for note in notes
+        if note.note_name in note_ids
+        for tag in note.note_tags
+    }
+    if note_tags:
+        tag_ids_query = select(normalized_tag_name(Tag.name), Tag.id).where(
+            normalized_tag_name(Tag.name).in_(tags)
+        )
+        tag_ids = dict((await db_session.execute(tag_ids_query)).tuples().all())
+        insert_note_tags_query = (
+            insert(NoteTag)
+            .values(
+                [
+                    {"note_id": note_id, "tag_id": tag_ids[tag]}
+                    for note_id, tag in note_tags
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        await db_session.execute(insert_note_tags_query)
 
-async def delete_note(note_id: int, db_session: AsyncSession) -> None:
-    query = delete(Note).where(Note.id == note_id)
-    await db_session.execute(query)
     await db_session.commit()
+
+    return len(note_ids)
@@ -0,0 +1,86 @@
+from sqlalchemy import and_, delete, exists, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload
+
+from app.models import NoteTag, Tag, normalized_tag_name
+from app.tracing import traced
+
+
+@traced
+async def get_tag_by_name(tag_name: str, db_session: AsyncSession) -> Tag | None:
+    # a tag can be attached to a very large number of notes, so they are not
+    # loaded here
+    query = (
+        select(Tag)
+        .where(normalized_tag_name(Tag.name) == tag_name)
+        .options(lazyload(Tag.notes))
+    )
+    query_result = await db_session.scalars(query)
+    tag = query_result.unique().one_or_none()
+
+    return tag
+
+
+@traced
+async def rename_tag(tag_id: int, new_name: str, db_session: AsyncSession) -> Tag:
+    """
+    Renames the tag. A name that is already taken, in its normalised form,
+    raises the IntegrityError of the 'ix_tags_normalized_name' unique index.
+    """
+    query = (
+        update(Tag)
+        .where(Tag.id == tag_id)
+        .values(name=new_name)
+        .returning(Tag)
+        .options(lazyload(Tag.notes))
+    )
+    try:
+        result = await db_session.scalars(query)
+    except IntegrityError:
+        await db_session.rollback()
+        raise
+    await db_session.commit()
+
+    return result.unique().one()
+
+
+@traced
+async def merge_tags(source_id: int, target_id: int, db_session: AsyncSession) -> int:
+    """
+    Merges the 'source_id' tag into the 'target_id' tag in a single transaction.
+
+    The 'notes_tags' associations of the source tag are re-pointed to the target
+    tag, except for the notes that already have the target tag; these are left
+    to be removed, together with the source tag, by the ON DELETE CASCADE
+    foreign key.
+
+    Returns the number of notes that were moved to the target tag.
+    """
+    # lock both tags so a concurrent rename or merge cannot interleave
+    lock_query = (
+        select(Tag.id).where(Tag.id.in_([source_id, target_id])).with_for_update()
+    )
+    await db_session.execute(lock_query)
+
+    other = NoteTag.alias("other")
+    repoint_query = (
+        update(NoteTag)
+        .where(NoteTag.c.tag_id == source_id)
+        .where(
+            ~exists().where(
+                and_(
+                    other.c.note_id == NoteTag.c.note_id,
+                    other.c.tag_id == target_id,
+                )
+            )
+        )
+        .values(tag_id=target_id)
+    )
+    result = await db_session.execute(repoint_query)
+    moved_notes = result.rowcount
+
+    await db_session.execute(delete(Tag).where(Tag.id == source_id))
+    await db_session.commit()
+
+    return moved_notes
@@ -2,6 +2,7 @@ import contextlib
 from typing import Any, AsyncIterator
 
 from sqlalchemy import MetaData
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import (
     AsyncAttrs,
     AsyncEngine,
@@ -12,6 +13,7 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import get_settings
+from app.instrumentation import InstrumentedAsyncAdaptedQueuePool, instrument_engine
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -26,11 +28,25 @@ class Base(AsyncAttrs, DeclarativeBase):
     )
 
 
+def get_violated_constraint(exc: IntegrityError) -> str | None:
+    """
+    Returns the name of the constraint whose violation raised 'exc', if any.
+    """
+    # the asyncpg exception, which has the constraint name, is the cause of
+    # the DBAPI exception wrapped by SQLAlchemy
+    return getattr(exc.orig and exc.orig.__cause__, "constraint_name", None)
+
+
 # from this blog post
 # https://medium.com/@tclaitken/setting-up-a-fastapi-app-with-async-sqlalchemy-2-0-pydantic-v2-e6c540be4308
 class DatabaseSessionManager:
     def __init__(self, host: str, engine_kwargs: dict[str, Any] = {}):
+        engine_kwargs = {
+            "poolclass": InstrumentedAsyncAdaptedQueuePool,
+            **engine_kwargs,
+        }
         self._engine: AsyncEngine | None = create_async_engine(host, **engine_kwargs)
+        instrument_engine(self._engine)
         self._sessionmaker: async_sessionmaker[AsyncSession] | None = (
             async_sessionmaker(
                 autocommit=False, bind=self._engine, expire_on_commit=False
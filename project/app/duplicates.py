@@ -0,0 +1,120 @@
+"""
+Near-duplicate detection of notes with MinHash and locality-sensitive hashing.
+
+Every note has a MinHash signature of the character shingles of its normalised
+name, without subtitle, and author: the share of equal values in the
+signatures of two notes estimates the Jaccard similarity of their shingles.
+The signature is cut into BANDS bands, each hashed to a bucket, and notes
+sharing a bucket are the candidate duplicates whose similarity is estimated,
+so finding the duplicates of a note never compares it with every other note.
+With 16 bands of 4 values, notes 50% similar share a bucket with a 64%
+probability, 80% similar ones with a 99.9% probability.
+
+Signatures are written with the notes. Notes added before, or by other means,
+get theirs with:
+
+    python -m app.duplicates
+"""
+
+import asyncio
+import logging
+import random
+import re
+import struct
+import unicodedata
+import zlib
+from typing import Sequence
+
+from app.database import sessionmanager
+
+log = logging.getLogger("uvicorn")
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+# fixed, signatures stored in the database must stay comparable
+_random = random.Random(1859)
+PERMUTATIONS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+SUBTITLE_SEPARATOR = re.compile(r"\s*(?::|\s-+\s|\s–\s|\s—\s)")
+NOT_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def normalize_reference(name: str, author: str | None) -> str:
+    """
+    Returns the name, without its subtitle, and the author of a note in NFKC
+    form, case folded and with runs of punctuation and spaces replaced by a
+    single space.
+    """
+    title = SUBTITLE_SEPARATOR.split(name, maxsplit=1)[0]
+    reference = f"{title} {author or ''}"
+    reference = unicodedata.normalize("NFKC", reference).casefold()
+    return NOT_ALPHANUMERIC.sub(" ", reference).strip()
+
+
+def shingles(text: str) -> set[str]:
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(name: str, author: str | None) -> list[int]:
+    hashes = [
+        zlib.crc32(shingle.encode())
+        for shingle in shingles(normalize_reference(name, author))
+    ]
+    return [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def lsh_buckets(signature: Sequence[int]) -> list[int]:
+    """
+    Returns the bucket of every band of 'signature', the band number in the
+    high bits so that equal values in different bands do not match.
+    """
+    buckets = []
+    for band in range(BANDS):
+        values = signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND]
+        band_hash = zlib.crc32(struct.pack(f"<{ROWS_PER_BAND}I", *values))
+        buckets.append((band << 32) | band_hash)
+    return buckets
+
+
+async def backfill_signatures() -> int:
+    """
+    Writes the signatures of the notes that have none, in batches.
+    """
+    # imported here, app.crud.note_duplicates imports this module
+    from app.crud.note_duplicates import (
+        get_notes_without_signature,
+        save_note_signatures,
+    )
+
+    backfilled = 0
+    async with sessionmanager.session() as db_session:
+        while True:
+            notes = await get_notes_without_signature(
+                batch_size=BACKFILL_BATCH_SIZE, db_session=db_session
+            )
+            if not notes:
+                break
+            await save_note_signatures(notes=notes, db_session=db_session)
+            await db_session.commit()
+            backfilled += len(notes)
+            log.info(f"Backfilled the signatures of {backfilled} notes")
+    await sessionmanager.close()
+
+    return backfilled
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(backfill_signatures())
@@ -0,0 +1,395 @@
+"""
+Index advisor reporting, for the tables of this schema, the indexes that are
+never used and the access paths that lack one:
+
+    python -m app.index_advisor [--min-rows 10000] [--statements 50]
+
+It reads the statistics of the database at DATABASE_URL, so run it against an
+instance that has served its usual workload for a while, e.g. under
+benchmarks/loadgen.py. The statements recorded by pg_stat_statements are
+planned with EXPLAIN (GENERIC_PLAN), which needs PostgreSQL 16 or later, and
+the ones reading a large table sequentially are reported with the columns an
+index could serve them with. Without the extension, only the number of
+sequential scans of every table is reported.
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterator
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import Base, DatabaseSessionManager, sessionmanager
+
+# statements of pg_stat_statements that EXPLAIN can plan
+EXPLAINABLE_STATEMENT = r"^\s*(select|with|insert|update|delete)\M"
+
+# created in pg_temp, so it only lives as long as the advisor's connection;
+# EXPLAIN (GENERIC_PLAN) must be run without parameters, which a prepared
+# statement cannot do
+CREATE_EXPLAIN_FUNCTION = """
+CREATE FUNCTION pg_temp.explain_generic(query text) RETURNS json
+LANGUAGE plpgsql AS $$
+DECLARE
+    plan json;
+BEGIN
+    EXECUTE 'EXPLAIN (GENERIC_PLAN, FORMAT JSON) ' || query INTO plan;
+    RETURN plan;
+END;
+$$
+"""
+
+
+@dataclass
+class UnusedIndex:
+    table: str
+    index: str
+    size: int
+    definition: str
+
+
+@dataclass
+class UnindexedForeignKey:
+    table: str
+    constraint: str
+    columns: list[str]
+
+
+@dataclass
+class SequentialScans:
+    table: str
+    rows: int
+    seq_scans: int
+    rows_read: int
+    index_scans: int
+
+
+@dataclass
+class StatementStats:
+    query: str
+    calls: int
+    mean_time_ms: float
+
+
+@dataclass
+class MissingIndex:
+    table: str
+    filter: str
+    columns: list[str]
+    statement: StatementStats
+
+
+@dataclass
+class IndexReport:
+    stats_since: datetime | None
+    unused_indexes: list[UnusedIndex]
+    unindexed_foreign_keys: list[UnindexedForeignKey]
+    sequential_scans: list[SequentialScans]
+    # None when pg_stat_statements is not installed
+    missing_indexes: list[MissingIndex] | None = None
+
+
+def get_schema_tables() -> list[str]:
+    return list(Base.metadata.tables)
+
+
+async def get_stats_reset_time(db_session: AsyncSession) -> datetime | None:
+    query = text(
+        "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+    )
+    return await db_session.scalar(query)
+
+
+async def get_unused_indexes(
+    tables: list[str], db_session: AsyncSession
+) -> list[UnusedIndex]:
+    """
+    Returns the indexes of 'tables' that were never scanned since the
+    statistics were reset. Unique and primary key indexes are left out, they
+    enforce a constraint whether or not queries use them.
+    """
+    query = text(
+        "SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid),"
+        " pg_get_indexdef(s.indexrelid)"
+        " FROM pg_stat_user_indexes s JOIN pg_index i ON i.indexrelid = s.indexrelid"
+        " WHERE s.relname = ANY(:tables) AND s.idx_scan = 0"
+        " AND NOT i.indisunique AND NOT i.indisprimary"
+        " ORDER BY pg_relation_size(s.indexrelid) DESC, s.indexrelname"
+    )
+    result = await db_session.execute(query, {"tables": tables})
+    return [UnusedIndex(*row) for row in result]
+
+
+async def get_unindexed_foreign_keys(
+    tables: list[str], db_session: AsyncSession
+) -> list[UnindexedForeignKey]:
+    """
+    Returns the foreign keys of 'tables' whose columns do not start any full
+    (not partial) index, so that deleting or updating a referenced row scans
+    the whole referencing table.
+    """
+    query = text(
+        "SELECT c.conrelid::regclass::text, c.conname,"
+        " array(SELECT a.attname FROM unnest(c.conkey) WITH ORDINALITY k(attnum, n)"
+        " JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum"
+        " ORDER BY k.n)"
+        " FROM pg_constraint c"
+        " WHERE c.contype = 'f' AND c.conrelid::regclass::text = ANY(:tables)"
+        " AND NOT EXISTS ("
+        " SELECT FROM pg_index i"
+        " WHERE i.indrelid = c.conrelid AND i.indpred IS NULL"
+        " AND i.indnkeyatts >= cardinality(c.conkey)"
+        " AND (i.indkey::int2[])[0:cardinality(c.conkey) - 1] @> c.conkey)"
+        " ORDER BY 1, 2"
+    )
+    result = await db_session.execute(query, {"tables": tables})
+    return [UnindexedForeignKey(*row) for row in result]
+
+
+async def get_sequential_scans(
+    tables: list[str], min_rows: int, db_session: AsyncSession
+) -> list[SequentialScans]:
+    """
+    Returns the tables of at least 'min_rows' rows that were read
+    sequentially, the ones whose rows were read the most first.
+    """
+    query = text(
+        "SELECT relname, n_live_tup, seq_scan, seq_tup_read, coalesce(idx_scan, 0)"
+        " FROM pg_stat_user_tables"
+        " WHERE relname = ANY(:tables) AND seq_scan > 0 AND n_live_tup >= :min_rows"
+        " ORDER BY seq_tup_read DESC"
+    )
+    result = await db_session.execute(query, {"tables": tables, "min_rows": min_rows})
+    return [SequentialScans(*row) for row in result]
+
+
+async def get_table_rows(tables: list[str], db_session: AsyncSession) -> dict[str, int]:
+    query = text(
+        "SELECT relname, n_live_tup FROM pg_stat_user_tables"
+        " WHERE relname = ANY(:tables)"
+    )
+    result = await db_session.execute(query, {"tables": tables})
+    return {table: rows for table, rows in result}
+
+
+async def get_top_statements(
+    limit: int, db_session: AsyncSession
+) -> list[StatementStats] | None:
+    """
+    Returns the 'limit' statements of pg_stat_statements the database spent
+    the most time on, or None if the extension is not installed.
+    """
+    installed = await db_session.scalar(
+        text("SELECT EXISTS (SELECT FROM pg_extension WHERE extname = :name)"),
+        {"name": "pg_stat_statements"},
+    )
+    if not installed:
+        return None
+
+    query = text(
+        "SELECT query, calls, mean_exec_time FROM pg_stat_statements"
+        " WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())"
+        " AND query ~* :explainable"
+        " ORDER BY total_exec_time DESC LIMIT :limit"
+    )
+    result = await db_session.execute(
+        query, {"explainable": EXPLAINABLE_STATEMENT, "limit": limit}
+    )
+    return [StatementStats(*row) for row in result]
+
+
+def find_sequential_scans(plan: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    if plan["Node Type"] == "Seq Scan":
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from find_sequential_scans(child)
+
+
+def get_filter_columns(table: str, scan_filter: str) -> list[str]:
+    """
+    Returns the columns of 'table' used in the filter of a plan node, the ones
+    compared for equality first as they should lead an index, in the order
+    they appear.
+    """
+    columns = Base.metadata.tables[table].columns
+    names = re.findall(r"\b[a-z_][a-z0-9_]*\b", scan_filter)
+    filter_columns = list(dict.fromkeys(name for name in names if name in columns))
+
+    def is_equality(column: str) -> bool:
+        # e.g. "(name)::text = $2" or "project_id = $1"
+        pattern = rf"\b{column}\b\)*(::[a-z ]+)?\s*=\s"
+        return re.search(pattern, scan_filter) is not None
+
+    return sorted(filter_columns, key=lambda column: not is_equality(column))
+
+
+async def get_missing_indexes(
+    statements: list[StatementStats],
+    table_rows: dict[str, int],
+    min_rows: int,
+    db_session: AsyncSession,
+) -> list[MissingIndex]:
+    """
+    Plans 'statements' and returns their sequential scans filtering a table
+    of 'table_rows' having at least 'min_rows' rows.
+    """
+    await db_session.execute(text(CREATE_EXPLAIN_FUNCTION))
+
+    missing_indexes = []
+    for statement in statements:
+        try:
+            # a savepoint, the statements that cannot be planned on their own
+            # (e.g. referring to temporary tables) are skipped
+            async with db_session.begin_nested():
+                plan = await db_session.scalar(
+                    text("SELECT pg_temp.explain_generic(:query)"),
+                    {"query": statement.query},
+                )
+        except DBAPIError:
+            continue
+
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        for scan in find_sequential_scans(plan[0]["Plan"]):
+            table = scan.get("Relation Name")
+            if table not in table_rows or "Filter" not in scan:
+                continue
+            if table_rows[table] < min_rows:
+                continue
+            missing_indexes.append(
+                MissingIndex(
+                    table=table,
+                    filter=scan["Filter"],
+                    columns=get_filter_columns(table, scan["Filter"]),
+                    statement=statement,
+                )
+            )
+
+    return missing_indexes
+
+
+async def get_index_report(
+    min_rows: int, statements: int, db_session: AsyncSession
+) -> IndexReport:
+    tables = get_schema_tables()
+    report = IndexReport(
+        stats_since=await get_stats_reset_time(db_session),
+        unused_indexes=await get_unused_indexes(tables, db_session),
+        unindexed_foreign_keys=await get_unindexed_foreign_keys(tables, db_session),
+        sequential_scans=await get_sequential_scans(tables, min_rows, db_session),
+    )
+
+    top_statements = await get_top_statements(statements, db_session)
+    if top_statements is not None:
+        report.missing_indexes = await get_missing_indexes(
+            top_statements,
+            await get_table_rows(tables, db_session),
+            min_rows,
+            db_session,
+        )
+    # nothing is kept, the advisor only reads
+    await db_session.rollback()
+
+    return report
+
+
+def format_report(report: IndexReport) -> str:
+    since = report.stats_since.isoformat() if report.stats_since else "ever"
+    lines = [f"Index usage statistics since {since}", ""]
+
+    lines.append("Unused indexes:")
+    for index in report.unused_indexes:
+        lines.append(
+            f"  {index.table}.{index.index} ({index.size / 1024:.0f} kB):"
+            f" {index.definition}"
+        )
+    if not report.unused_indexes:
+        lines.append("  none")
+
+    lines.append("Foreign keys without an index:")
+    for foreign_key in report.unindexed_foreign_keys:
+        columns = ", ".join(foreign_key.columns)
+        lines.append(
+            f"  {foreign_key.table}.{foreign_key.constraint}:"
+            f" CREATE INDEX ON {foreign_key.table} ({columns})"
+        )
+    if not report.unindexed_foreign_keys:
+        lines.append("  none")
+
+    lines.append("Tables read sequentially:")
+    for scans in report.sequential_scans:
+        lines.append(
+            f"  {scans.table} ({scans.rows} rows): {scans.seq_scans} sequential"
+            f" scans reading {scans.rows_read} rows, {scans.index_scans} index scans"
+        )
+    if not report.sequential_scans:
+        lines.append("  none")
+
+    lines.append("Statements reading large tables sequentially:")
+    if report.missing_indexes is None:
+        lines.append(
+            "  pg_stat_statements is not installed, add it to"
+            " shared_preload_libraries and run CREATE EXTENSION pg_stat_statements"
+        )
+    for missing_index in report.missing_indexes or []:
+        statement = missing_index.statement
+        columns = ", ".join(missing_index.columns)
+        lines.append(
+            f"  {missing_index.table} filtered on {missing_index.filter}"
+            f" ({statement.calls} calls, {statement.mean_time_ms:.1f} ms on average)"
+        )
+        if columns:
+            lines.append(f"    CREATE INDEX ON {missing_index.table} ({columns})")
+        lines.append(f"    {' '.join(statement.query.split())}")
+    if report.missing_indexes == []:
+        lines.append("  none")
+
+    return "\n".join(lines)
+
+
+async def run_advisor(
+    sessionmanager: DatabaseSessionManager, min_rows: int, statements: int
+) -> str:
+    async with sessionmanager.session() as db_session:
+        report = await get_index_report(
+            min_rows=min_rows, statements=statements, db_session=db_session
+        )
+    await sessionmanager.close()
+
+    return format_report(report)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--min-rows",
+        type=int,
+        default=10_000,
+        help="ignore sequential scans of tables smaller than this,"
+        " they are cheaper than an index (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--statements",
+        type=int,
+        default=50,
+        help="number of pg_stat_statements statements to plan, the most"
+        " time consuming first (default: %(default)s)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    print(asyncio.run(run_advisor(sessionmanager, args.min_rows, args.statements)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
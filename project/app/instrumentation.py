@@ -0,0 +1,295 @@
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExceptionContext, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    PoolProxiedConnection,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT,
+    DB_STATEMENTS,
+    DB_STATEMENTS_DURATION,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+)
+from app.slow_queries import EXPLAIN_EXECUTION_OPTION, SlowQueryLogger
+from app.tracing import (
+    SPAN_KIND_CLIENT,
+    SPAN_KIND_SERVER,
+    STATUS_ERROR,
+    current_span,
+    tracer,
+)
+
+log = logging.getLogger("uvicorn")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass
+class RequestStats:
+    """
+    Database activity of a single HTTP request.
+    """
+
+    scope: Scope | None = None
+    statements: int = 0
+    rows: int = 0
+    db_time: float = 0.0
+    statement_counts: Counter[str] = field(default_factory=Counter)
+
+    def repeated_statements(self, threshold: int) -> dict[str, int]:
+        """
+        Returns the statements executed at least 'threshold' times; the same
+        SQL sent over and over in one request is the signature of an N+1
+        loading pattern.
+        """
+        return {
+            statement: count
+            for statement, count in self.statement_counts.items()
+            if count >= threshold
+        }
+
+    @property
+    def route(self) -> str | None:
+        if self.scope is None:
+            return None
+        return get_route_name(self.scope)
+
+    def headers(self, threshold: int) -> list[tuple[bytes, bytes]]:
+        headers = [
+            (b"x-db-statements", str(self.statements).encode()),
+            (b"x-db-rows", str(self.rows).encode()),
+            (b"x-db-time-ms", f"{self.db_time * 1000:.2f}".encode()),
+        ]
+        repeated = self.repeated_statements(threshold)
+        if repeated:
+            headers.append(
+                (b"x-db-repeated-statements", str(max(repeated.values())).encode())
+            )
+        return headers
+
+
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def get_route_name(scope: Scope) -> str:
+    """
+    Returns the path template of the route that handled the request, so that
+    '/projects/1/' and '/projects/2/' are reported under the same label.
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+    return str(getattr(route, "path", UNMATCHED_ROUTE))
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that records how long callers wait to get a connection.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Registers the engine event listeners that feed the database metrics, the
+    slow statements log and the SQL statements spans.
+    """
+    sync_engine = engine.sync_engine
+    settings = get_settings()
+    slow_query_logger = None
+    if settings.slow_query_threshold_ms is not None:
+        slow_query_logger = SlowQueryLogger(
+            engine=engine,
+            threshold_ms=settings.slow_query_threshold_ms,
+            explain=settings.slow_query_explain,
+            max_per_minute=settings.slow_query_log_max_per_minute,
+            explain_timeout_ms=settings.slow_query_explain_timeout_ms,
+        )
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext,
+        executemany: bool,
+    ) -> None:
+        context._query_start_time = perf_counter()  # type: ignore[attr-defined]
+        if tracer.enabled and current_span.get() is not None:
+            context._span = tracer.start_span(  # type: ignore[attr-defined]
+                "SQL " + statement.lstrip().split(None, 1)[0].upper(),
+                kind=SPAN_KIND_CLIENT,
+                attributes={"db.system": "postgresql", "db.statement": statement},
+            )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: ExecutionContext,
+        executemany: bool,
+    ) -> None:
+        duration = perf_counter() - context._query_start_time  # type: ignore[attr-defined]
+        stats = request_stats.get()
+
+        span = getattr(context, "_span", None)
+        if span is not None:
+            span.attributes["db.rows"] = max(cursor.rowcount, 0)
+            tracer.end_span(span)
+
+        if slow_query_logger is not None and not context.execution_options.get(
+            EXPLAIN_EXECUTION_OPTION
+        ):
+            slow_query_logger.check(
+                statement=statement,
+                parameters=parameters,
+                duration=duration,
+                executemany=executemany,
+                route=stats.route if stats is not None else None,
+            )
+
+        if stats is None:
+            return
+        stats.statements += 1
+        stats.rows += max(cursor.rowcount, 0)
+        stats.statement_counts[statement] += 1
+        stats.db_time += duration
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context: ExceptionContext) -> None:
+        span = getattr(exception_context.execution_context, "_span", None)
+        if span is not None:
+            span.status = STATUS_ERROR
+            span.attributes["exception.type"] = type(
+                exception_context.original_exception
+            ).__name__
+            tracer.end_span(span)
+
+    @event.listens_for(sync_engine, "checkout")
+    def checkout(
+        dbapi_connection: Any,
+        connection_record: ConnectionPoolEntry,
+        connection_proxy: PoolProxiedConnection,
+    ) -> None:
+        DB_POOL_CHECKED_OUT.inc()
+        DB_POOL_OVERFLOW.set(max(sync_engine.pool.overflow(), 0))  # type: ignore[attr-defined]
+
+    @event.listens_for(sync_engine, "checkin")
+    def checkin(dbapi_connection: Any, connection_record: ConnectionPoolEntry) -> None:
+        DB_POOL_CHECKED_OUT.dec()
+        DB_POOL_OVERFLOW.set(max(sync_engine.pool.overflow(), 0))  # type: ignore[attr-defined]
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware that records the request count, latency and database
+    activity of every HTTP request, labeled by route.
+
+    Requests repeating the same statement at least 'n_plus_one_threshold' times
+    are logged as possible N+1 patterns. With 'expose_headers' set, the database
+    activity is also sent back in 'X-DB-*' response headers.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        expose_headers: bool = False,
+        n_plus_one_threshold: int = 5,
+    ) -> None:
+        self.app = app
+        self.expose_headers = expose_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestStats(scope=scope)
+        token = request_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.expose_headers:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        *stats.headers(self.n_plus_one_threshold),
+                    ]
+            await send(message)
+
+        span = None
+        if tracer.enabled:
+            span = tracer.start_span(
+                f"{method} {scope['path']}",
+                kind=SPAN_KIND_SERVER,
+                attributes={"http.method": method, "http.target": scope["path"]},
+            )
+            span_token = current_span.set(span)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = perf_counter() - start
+            in_progress.dec()
+            request_stats.reset(token)
+
+            route = get_route_name(scope)
+            if span is not None:
+                current_span.reset(span_token)
+                span.name = f"{method} {route}"
+                span.attributes["http.route"] = route
+                span.attributes["http.status_code"] = status_code
+                span.attributes["db.statements"] = stats.statements
+                if status_code >= 500:
+                    span.status = STATUS_ERROR
+                tracer.end_span(span)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route).observe(duration)
+            if stats.statements:
+                DB_STATEMENTS.labels(route).inc(stats.statements)
+                DB_STATEMENTS_DURATION.labels(route).inc(stats.db_time)
+            for statement, count in stats.repeated_statements(
+                self.n_plus_one_threshold
+            ).items():
+                log.warning(
+                    "Possible N+1 query pattern on %s %s: statement executed %d"
+                    " times: %s",
+                    method,
+                    route,
+                    count,
+                    statement,
+                )
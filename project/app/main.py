@@ -1,11 +1,26 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import Any, AsyncIterator
 
 from fastapi import FastAPI
 
-from app.api.routers import ping, project_notes, projects
+from app.api.routers import (
+    analytics,
+    jobs,
+    metrics,
+    ping,
+    project_notes,
+    projects,
+    tags,
+)
+from app.compression import CompressionMiddleware
+from app.config import get_settings
 from app.database import sessionmanager
+from app.instrumentation import InstrumentationMiddleware
+from app.metrics import mark_process_dead
+from app.tracing import configure_tracing, tracer
+from app.worker import Worker
 
 log = logging.getLogger("uvicorn")
 
@@ -16,22 +31,55 @@ async def lifespan(app: FastAPI) -> AsyncIterator[Any]:
     Function that handles startup and shutdown events.
     """
     log.info("Starting up...")
+    settings = get_settings()
+    configure_tracing(
+        enabled=settings.tracing_enabled,
+        export_path=settings.tracing_export_path,
+        otlp_endpoint=settings.tracing_otlp_endpoint,
+    )
+    stop_worker = asyncio.Event()
+    if settings.job_worker_enabled:
+        worker = asyncio.create_task(Worker(sessionmanager, settings).run(stop_worker))
     yield
+    if settings.job_worker_enabled:
+        stop_worker.set()
+        await worker
     if sessionmanager._engine is not None:
         # Close the DB connection
         await sessionmanager.close()
+    mark_process_dead()
+    tracer.shutdown()
     log.info("Shutting down...")
 
 
 def create_application() -> FastAPI:
+    settings = get_settings()
+
     application = FastAPI(lifespan=lifespan)
+    # added first so that the request durations include the compression
+    application.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        level=settings.compression_level,
+        route_levels=settings.compression_route_levels,
+        cache_size=settings.compression_cache_size,
+    )
+    application.add_middleware(
+        InstrumentationMiddleware,
+        expose_headers=settings.environment == "dev" or settings.testing,
+        n_plus_one_threshold=settings.n_plus_one_threshold,
+    )
     application.include_router(ping.ping_router)
+    application.include_router(metrics.metrics_router)
+    application.include_router(analytics.router, prefix="/projects", tags=["analytics"])
     application.include_router(projects.router, prefix="/projects", tags=["projects"])
     application.include_router(
         project_notes.router,
         prefix="/projects/{project_id}/notes",
         tags=["project_notes"],
     )
+    application.include_router(tags.router, prefix="/tags", tags=["tags"])
+    application.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 
     return application
 
@@ -0,0 +1,83 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# When the app runs with several worker processes, PROMETHEUS_MULTIPROC_DIR must
+# point to an empty directory shared by the workers; every process then writes
+# its samples there and a scrape of any worker returns the aggregated values.
+MULTIPROCESS_MODE = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Number of HTTP requests.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency in seconds.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Number of HTTP requests being processed.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_STATEMENTS = Counter(
+    "db_statements_total",
+    "Number of SQL statements executed, per route.",
+    ["route"],
+)
+DB_STATEMENTS_DURATION = Counter(
+    "db_statements_duration_seconds_total",
+    "Time spent executing SQL statements in seconds, per route.",
+    ["route"],
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Number of connections checked out from the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Number of overflow connections currently opened by the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool in seconds.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+
+def generate_metrics() -> bytes:
+    """
+    Renders all the metrics in Prometheus text format.
+    """
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """
+    Removes the live gauges samples of the current worker process.
+    """
+    if MULTIPROCESS_MODE:
+        multiprocess.mark_process_dead(os.getpid())
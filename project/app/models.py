@@ -1,16 +1,25 @@
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime
+from typing import Any, Optional
 
 from sqlalchemy import (
     TIMESTAMP,
+    BigInteger,
     Column,
+    FetchedValue,
     ForeignKey,
+    Index,
+    Integer,
+    Sequence,
     String,
     Table,
     Text,
     UniqueConstraint,
+    func,
+    literal_column,
 )
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.database import Base
 
@@ -28,10 +37,30 @@ NoteTag = Table(
         ForeignKey("tags.id", ondelete="CASCADE"),
         primary_key=True,
         nullable=False,
+        index=True,
+    ),
+)
+
+# number of live notes of every project having each tag, from which
+# project_stats.tag_count is maintained; there is no foreign key to 'tags' as
+# rows are removed by the triggers once their notes_tags rows are deleted
+ProjectTagCount = Table(
+    "project_tag_counts",
+    Base.metadata,
+    Column(
+        "project_id",
+        ForeignKey("projects.id", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
     ),
+    Column("tag_id", Integer, primary_key=True, nullable=False),
+    Column("note_count", Integer, nullable=False),
 )
 
 
+PROJECT_VERSIONS = Sequence("project_versions", metadata=Base.metadata)
+
+
 class Project(Base):
     __tablename__ = "projects"
 
@@ -39,9 +68,25 @@ class Project(Base):
     name: Mapped[str] = mapped_column(index=True, unique=True, nullable=False)
     comment: Mapped[Optional[str]] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+    # set by the 'set_updated_at' trigger on every change to the row
+    updated_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
         nullable=False,
-        default=datetime.now(timezone.utc),
+        server_default=func.clock_timestamp(),
+        server_onupdate=FetchedValue(),
+    )
+    # set when the project is moved to the trash, it is purged in the
+    # background once the trash retention period is over
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+
+    __table_args__ = (
+        Index(
+            "ix_projects_deleted_at",
+            "deleted_at",
+            postgresql_where=deleted_at.is_not(None),
+        ),
     )
 
     notes: Mapped[list["Note"]] = relationship(
@@ -50,29 +95,72 @@ class Project(Base):
         cascade="all, delete-orphan",
         passive_deletes=True,
     )
+    stats: Mapped[Optional["ProjectStats"]] = relationship(lazy="joined", viewonly=True)
 
     def __repr__(self) -> str:
         return f"Project({self.id}, '{self.name}')"
 
 
+class ProjectStats(Base):
+    """
+    Figures about the live notes of a project, kept up to date in the same
+    transaction as the changes to 'projects', 'notes' and 'notes_tags' by the
+    triggers created in the migration adding this table.
+    """
+
+    __tablename__ = "project_stats"
+
+    project_id: Mapped[int] = mapped_column(
+        ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True
+    )
+    note_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    tag_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    latest_note_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    min_publication_year: Mapped[Optional[int]]
+    max_publication_year: Mapped[Optional[int]]
+    # set from the 'project_versions' sequence by every statement changing the
+    # project's notes, their tags or the names of these tags, so that results
+    # computed from them can be cached against it
+    version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default=PROJECT_VERSIONS.next_value()
+    )
+    # set by the 'set_updated_at' trigger on every change to the row, so also
+    # with every new version
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.clock_timestamp(),
+        server_onupdate=FetchedValue(),
+    )
+
+    def __repr__(self) -> str:
+        return f"ProjectStats({self.project_id}, {self.note_count})"
+
+
 class Note(Base):
     __tablename__ = "notes"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     project_id: Mapped[int] = mapped_column(
         ForeignKey("projects.id", ondelete="CASCADE"),
-        index=True,
     )
-    name: Mapped[str] = mapped_column(index=True, nullable=False)
+    name: Mapped[str] = mapped_column(nullable=False)
     author: Mapped[Optional[str]]
     publication_details: Mapped[Optional[str]]
     publication_year: Mapped[Optional[int]]
     comments: Mapped[Optional[str]]
     created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+    # set by the 'set_updated_at' trigger on every change to the row, and to
+    # the note's tags or their names
+    updated_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
         nullable=False,
-        default=datetime.now(timezone.utc),
+        server_default=func.clock_timestamp(),
+        server_onupdate=FetchedValue(),
     )
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
 
     project: Mapped["Project"] = relationship(
         lazy="joined", innerjoin=True, back_populates="notes"
@@ -86,15 +174,112 @@ class Note(Base):
 
     UniqueConstraint(project_id, name)
 
+    # live-row queries only ever look at notes that are not in the trash, and
+    # the trash queries only at the ones that are. Names are looked up within
+    # a project, through the unique constraint above.
+    __table_args__ = (
+        # listings and exports paginate a project's notes by id, the included
+        # columns let the bulk selection filters and the project_stats
+        # triggers work from the index alone
+        Index(
+            "ix_notes_project_id_id",
+            "project_id",
+            "id",
+            postgresql_include=["publication_year", "created_at"],
+            postgresql_where=deleted_at.is_(None),
+        ),
+        Index(
+            "ix_notes_project_id_publication_year",
+            "project_id",
+            "publication_year",
+            postgresql_where=deleted_at.is_(None),
+        ),
+        # changes since a given time, of the live notes and of those moved to
+        # the trash alike
+        Index("ix_notes_project_id_updated_at", "project_id", "updated_at"),
+        Index(
+            "ix_notes_deleted_at",
+            "deleted_at",
+            postgresql_where=deleted_at.is_not(None),
+        ),
+    )
+
     def __repr__(self) -> str:
         return f"Note({self.id}, '{self.name}')"
 
 
+class NoteRevision(Base):
+    """
+    A revision of a note, written in the same transaction as the change that
+    made it. Most revisions only hold the fields that changed ('data' maps
+    them to their new value, or to the edited span of a long text), every
+    few revisions hold a full snapshot, so that rebuilding any revision reads
+    a bounded number of rows: app.crud.note_revisions has the details.
+    """
+
+    __tablename__ = "note_revisions"
+
+    note_id: Mapped[int] = mapped_column(
+        ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True
+    )
+    revision: Mapped[int] = mapped_column(primary_key=True)
+    is_snapshot: Mapped[bool] = mapped_column(nullable=False)
+    changed_fields: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False)
+    data: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"NoteRevision({self.note_id}, {self.revision})"
+
+
+class NoteSignature(Base):
+    """
+    The MinHash signature of a note and its LSH buckets, see app.duplicates.
+    'project_id' is copied from the note so that the buckets of a project are
+    found without joining 'notes'.
+    """
+
+    __tablename__ = "note_signatures"
+    __table_args__ = (
+        Index("ix_note_signatures_buckets", "buckets", postgresql_using="gin"),
+    )
+
+    note_id: Mapped[int] = mapped_column(
+        ForeignKey("notes.id", ondelete="CASCADE"), primary_key=True
+    )
+    project_id: Mapped[int] = mapped_column(nullable=False, index=True)
+    signature: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+    buckets: Mapped[list[int]] = mapped_column(ARRAY(BigInteger), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"NoteSignature({self.note_id})"
+
+
+def normalized_tag_name(name: Mapped[str]) -> ColumnElement[str]:
+    """
+    The normalised form of a tag name in SQL, the same as
+    app.schemas.tags.normalize_tag_name computes in Python. Tags are unique on
+    it, and looked up with it so that the unique index is used.
+    """
+    # literals, not bound parameters, or the expression would not match the
+    # one of the index
+    normalized = func.normalize(name, literal_column("NFKC"))
+    return func.lower(func.btrim(normalized, literal_column(r"E' \t\n\r\f'")))
+
+
 class Tag(Base):
     __tablename__ = "tags"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    name: Mapped[str] = mapped_column(String(32), index=True, unique=True)
+    # stored normalised, the unique index on the normalised form also keeps out
+    # the variants written without going through the API
+    name: Mapped[str] = mapped_column(String(32), nullable=False)
+
+    __table_args__ = (
+        Index("ix_tags_normalized_name", normalized_tag_name(name), unique=True),
+    )
 
     notes: Mapped[list["Note"]] = relationship(
         lazy="selectin", secondary=NoteTag, back_populates="tags", passive_deletes=True
@@ -102,3 +287,36 @@ class Tag(Base):
 
     def __repr__(self) -> str:
         return f"Tag({self.id}, '{self.name}')"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), index=True, nullable=False)
+    project_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("projects.id", ondelete="SET NULL"),
+        index=True,
+    )
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    progress: Mapped[int] = mapped_column(default=0, nullable=False)
+    total: Mapped[Optional[int]]
+    # the result can be a large artifact (e.g. an export), only load it when
+    # it is explicitly requested
+    result: Mapped[Optional[Any]] = mapped_column(JSONB, deferred=True)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
+    # queued jobs are not run before this time
+    run_after: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"Job({self.id}, '{self.kind}', '{self.status}')"
@@ -0,0 +1,46 @@
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+
+class TagCooccurrenceOrder(StrEnum):
+    COUNT = "count"
+    LIFT = "lift"
+    PMI = "pmi"
+
+
+class TagPairSchema(BaseModel):
+    tag: str
+    other_tag: str
+    note_count: int
+    lift: float
+    pmi: float
+
+
+class TagCooccurrenceResponseSchema(BaseModel):
+    project_id: int | None = None
+    note_count: int
+    pairs: list[TagPairSchema]
+
+
+class YearCountSchema(BaseModel):
+    year: int | None = None
+    note_count: int
+
+
+class AuthorCountSchema(BaseModel):
+    author: str
+    note_count: int
+
+
+class TagCountSchema(BaseModel):
+    tag: str
+    note_count: int
+
+
+class ProjectAnalyticsResponseSchema(BaseModel):
+    project_id: int
+    note_count: int
+    publication_years: list[YearCountSchema]
+    top_authors: list[AuthorCountSchema]
+    tags: list[TagCountSchema]
@@ -0,0 +1,62 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+from app.schemas.project_notes import (
+    ProjectNotePayloadSchema,
+    ProjectNotesBulkTagsPayloadSchema,
+)
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class ExportJobPayloadSchema(BaseModel, extra="forbid"):
+    kind: Literal["export"]
+    project_id: int = Field(gt=0)
+
+
+class ImportJobPayloadSchema(BaseModel, extra="forbid"):
+    kind: Literal["import"]
+    project_id: int = Field(gt=0)
+    notes: list[ProjectNotePayloadSchema] = Field(min_length=1)
+
+
+class BulkTagsJobPayloadSchema(ProjectNotesBulkTagsPayloadSchema):
+    kind: Literal["bulk_tags"]
+    project_id: int = Field(gt=0)
+
+
+class PurgeProjectJobPayloadSchema(BaseModel, extra="forbid"):
+    """
+    Enqueued when a project is deleted, it cannot be submitted through the API.
+    """
+
+    kind: Literal["purge_project"]
+    project_id: int
+
+
+JobPayloadSchema = Annotated[
+    ExportJobPayloadSchema | ImportJobPayloadSchema | BulkTagsJobPayloadSchema,
+    Field(discriminator="kind"),
+]
+
+
+class JobResponseSchema(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    project_id: int | None = None
+    progress: int
+    total: int | None = None
+    error: str | None = None
+    attempts: int
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
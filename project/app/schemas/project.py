@@ -5,11 +5,25 @@ from pydantic import BaseModel
 from app.schemas.base import CustomCheckAtLeastOnePairValidator
 
 
+class ProjectStatsSchema(BaseModel):
+    note_count: int
+    tag_count: int
+    latest_note_at: datetime | None = None
+    min_publication_year: int | None = None
+    max_publication_year: int | None = None
+
+
 class ProjectResponseSchema(BaseModel):
     id: int
     name: str
     comment: str | None = None
     created_at: datetime
+    updated_at: datetime
+    stats: ProjectStatsSchema | None = None
+
+
+class ProjectTrashResponseSchema(ProjectResponseSchema):
+    deleted_at: datetime
 
 
 class ProjectPayloadSchema(BaseModel, extra="forbid"):
@@ -26,3 +40,4 @@ class ProjectUpdatePayloadSchema(
 
 class ProjectDeleteSchema(BaseModel):
     message: str
+    job_id: int
@@ -1,8 +1,11 @@
 from datetime import datetime
+from enum import StrEnum
+from typing import Self
 
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from app.schemas.base import CustomCheckAtLeastOnePairValidator
+from app.schemas.tags import TagName, TagNames
 
 
 class ProjectNotePayloadSchema(BaseModel, extra="forbid"):
@@ -11,7 +14,7 @@ class ProjectNotePayloadSchema(BaseModel, extra="forbid"):
     note_publication_details: str | None = None
     note_publication_year: int | None = None
     note_comments: str | None = None
-    note_tags: list[str] = []
+    note_tags: TagNames = []
 
 
 class ProjectNoteResponseSchema(BaseModel):
@@ -23,9 +26,56 @@ class ProjectNoteResponseSchema(BaseModel):
     note_publication_year: int | None = None
     note_comments: str | None = None
     created_at: datetime
+    updated_at: datetime
     note_tags: list[str] = []
 
 
+class ProjectNoteTrashResponseSchema(ProjectNoteResponseSchema):
+    deleted_at: datetime
+
+
+class ProjectNoteRevisionSchema(BaseModel):
+    revision: int
+    created_at: datetime
+    changed_fields: list[str]
+
+
+class ProjectNoteRevisionResponseSchema(ProjectNoteResponseSchema):
+    revision: int
+    revised_at: datetime
+
+
+class ProjectNoteDuplicateSchema(BaseModel):
+    note_id: int
+    duplicate_note_id: int
+    similarity: float
+
+
+class ProjectNoteDuplicateCheckPayloadSchema(BaseModel, extra="forbid"):
+    note_name: str
+    note_author: str | None = None
+
+
+class ProjectNoteDuplicateCandidateSchema(BaseModel):
+    note_id: int
+    note_name: str
+    note_author: str | None = None
+    similarity: float
+
+
+class CitationStyle(StrEnum):
+    APA = "apa"
+    MLA = "mla"
+    CHICAGO = "chicago"
+    BIBTEX = "bibtex"
+
+
+class ProjectNoteCitationResponseSchema(BaseModel):
+    note_id: int
+    style: CitationStyle
+    citation: str
+
+
 class ProjectNoteUpdateSchema(
     BaseModel, CustomCheckAtLeastOnePairValidator, extra="forbid"
 ):
@@ -34,8 +84,50 @@ class ProjectNoteUpdateSchema(
     publication_details: str | None = None
     publication_year: int | None = None
     comments: str | None = None
-    tags: list[str] = []
+    tags: TagNames = []
 
 
 class ProjectNoteDeleteResponseSchema(BaseModel):
     message: str
+
+
+class ProjectNotesFilterSchema(BaseModel, extra="forbid"):
+    tag: TagName | None = None
+    publication_year_from: int | None = None
+    publication_year_to: int | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+
+
+class ProjectNotesSelectionSchema(BaseModel, extra="forbid"):
+    note_ids: list[int] | None = None
+    filter: ProjectNotesFilterSchema | None = None
+
+    @model_validator(mode="after")
+    def check_exactly_one_selection_is_received(self) -> Self:
+        if (self.note_ids is None) == (self.filter is None):
+            raise ValueError("Exactly one of 'note_ids' or 'filter' is expected")
+        return self
+
+
+class ProjectNotesBulkTagsPayloadSchema(ProjectNotesSelectionSchema):
+    add_tags: TagNames = []
+    remove_tags: TagNames = []
+
+    @model_validator(mode="after")
+    def check_tags_to_add_or_remove_are_received(self) -> Self:
+        if not self.add_tags and not self.remove_tags:
+            raise ValueError("At least one of 'add_tags' or 'remove_tags' is expected")
+        if set(self.add_tags) & set(self.remove_tags):
+            raise ValueError("A tag cannot be both added and removed")
+        return self
+
+
+class ProjectNotesBulkTagsResponseSchema(BaseModel):
+    added: int
+    removed: int
+
+
+class ProjectNotesBulkDeleteResponseSchema(BaseModel):
+    deleted_notes: int
+    deleted_note_tags: int
@@ -0,0 +1,62 @@
+import unicodedata
+from typing import Annotated, Self
+
+from pydantic import AfterValidator, BaseModel, model_validator
+
+# the characters trimmed by normalized_tag_name in app.models
+TAG_NAME_WHITESPACE = " \t\n\r\f"
+# the length of tags.name
+TAG_NAME_MAX_LENGTH = 32
+
+
+def normalize_tag_name(name: str) -> str:
+    """
+    Returns the form tag names are stored and looked up in: NFKC normalised,
+    trimmed and lower case, so that e.g. "NLP", "nlp " and "ＮＬＰ" are the
+    same tag. The length is checked on the normalised name, which NFKC can
+    make longer than the name received.
+    """
+    normalized = unicodedata.normalize("NFKC", name).strip(TAG_NAME_WHITESPACE)
+    if not normalized:
+        raise ValueError("A tag name cannot be empty")
+    normalized = normalized.lower()
+    if len(normalized) > TAG_NAME_MAX_LENGTH:
+        raise ValueError(
+            f"A tag name cannot be longer than {TAG_NAME_MAX_LENGTH} characters"
+        )
+    return normalized
+
+
+def unique_tag_names(names: list[str]) -> list[str]:
+    return list(dict.fromkeys(names))
+
+
+TagName = Annotated[str, AfterValidator(normalize_tag_name)]
+TagNames = Annotated[list[TagName], AfterValidator(unique_tag_names)]
+
+
+class TagResponseSchema(BaseModel):
+    id: int
+    name: str
+
+
+class TagRenamePayloadSchema(BaseModel, extra="forbid"):
+    name: TagName
+    new_name: TagName
+
+
+class TagMergePayloadSchema(BaseModel, extra="forbid"):
+    source: TagName
+    target: TagName
+
+    @model_validator(mode="after")
+    def check_source_and_target_are_different(self) -> Self:
+        if self.source == self.target:
+            raise ValueError("A tag cannot be merged into itself")
+        return self
+
+
+class TagMergeResponseSchema(BaseModel):
+    id: int
+    name: str
+    moved_notes: int
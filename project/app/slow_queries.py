@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import re
+import sys
+from time import monotonic
+from types import FrameType
+from typing import Any
+
+from greenlet import getcurrent  # type: ignore[import-untyped]
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+log = logging.getLogger("uvicorn")
+
+# execution option set on the connections running EXPLAIN, so their own
+# statements are never reported as slow
+EXPLAIN_EXECUTION_OPTION = "skip_slow_query_log"
+
+# FOR UPDATE, FOR NO KEY UPDATE, FOR SHARE and FOR KEY SHARE, with which a
+# SELECT takes row locks
+LOCKING_CLAUSE = re.compile(
+    r"\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.I
+)
+
+
+class RateLimiter:
+    """
+    Token bucket allowing at most 'max_per_minute' events per minute.
+    """
+
+    def __init__(self, max_per_minute: int):
+        self.capacity = float(max_per_minute)
+        self.tokens = float(max_per_minute)
+        self.refill_rate = max_per_minute / 60
+        self.last_refill = monotonic()
+
+    def allow(self) -> bool:
+        now = monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate
+        )
+        self.last_refill = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def find_caller(module_prefix: str = "app.crud") -> str | None:
+    """
+    Returns the name of the innermost function of 'module_prefix' that led to
+    the current statement being executed.
+
+    SQLAlchemy runs the statements of an AsyncSession in a child greenlet, so
+    the calling coroutines are found on the frames of the parent greenlet.
+    """
+    frames: list[FrameType | None] = [sys._getframe()]
+    parent = getcurrent().parent
+    if parent is not None:
+        frames.append(parent.gr_frame)
+
+    for frame in frames:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith(module_prefix):
+                return f"{module}.{frame.f_code.co_name}"
+            frame = frame.f_back
+    return None
+
+
+def format_parameters(parameters: Any, max_length: int = 500) -> str:
+    formatted = repr(parameters)
+    if len(formatted) > max_length:
+        return formatted[:max_length] + "..."
+    return formatted
+
+
+class SlowQueryLogger:
+    """
+    Logs the SQL statements slower than 'threshold_ms', together with their
+    bound parameters, the route being served and the crud function that sent
+    them.
+
+    With 'explain' set, the statement plan is also captured on a separate
+    connection in a background task: SELECT statements are run with
+    EXPLAIN (ANALYZE, BUFFERS) and the others, which must not be executed a
+    second time, with a plain EXPLAIN. So are the SELECT statements locking
+    rows, e.g. the job dequeue, which would otherwise keep these rows from
+    the other transactions for as long as the EXPLAIN runs. EXPLAIN is given
+    at most 'explain_timeout_ms'. At most 'max_per_minute' statements are
+    reported per minute and a single EXPLAIN runs at a time, so that a burst
+    of slow statements cannot turn the logging itself into a source of load.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        threshold_ms: float,
+        explain: bool = False,
+        max_per_minute: int = 10,
+        explain_timeout_ms: int = 5000,
+    ):
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_timeout_ms = explain_timeout_ms
+        self.rate_limiter = RateLimiter(max_per_minute)
+        self.explain_task: asyncio.Task[None] | None = None
+
+    def check(
+        self,
+        statement: str,
+        parameters: Any,
+        duration: float,
+        executemany: bool,
+        route: str | None,
+    ) -> None:
+        if duration < self.threshold or not self.rate_limiter.allow():
+            return
+
+        caller = find_caller()
+        log.warning(
+            "Slow SQL statement (%.1f ms) on route %s from %s: %s; parameters: %s",
+            duration * 1000,
+            route,
+            caller,
+            statement,
+            format_parameters(parameters),
+        )
+
+        if self.explain and not executemany and not self.explain_running():
+            self.explain_task = asyncio.get_running_loop().create_task(
+                self.log_plan(statement, parameters, caller)
+            )
+
+    def explain_running(self) -> bool:
+        return self.explain_task is not None and not self.explain_task.done()
+
+    async def log_plan(
+        self, statement: str, parameters: Any, caller: str | None
+    ) -> None:
+        if statement.lstrip()[:6].upper() == "SELECT" and not LOCKING_CLAUSE.search(
+            statement
+        ):
+            explain = "EXPLAIN (ANALYZE, BUFFERS) "
+        else:
+            explain = "EXPLAIN "
+
+        try:
+            async with self.engine.connect() as conn:
+                conn = await conn.execution_options(**{EXPLAIN_EXECUTION_OPTION: True})
+                await conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {int(self.explain_timeout_ms)}"
+                )
+                result = await conn.exec_driver_sql(explain + statement, parameters)
+                plan = "\n".join(row[0] for row in result)
+                # nothing executed by EXPLAIN ANALYZE is ever kept
+                await conn.rollback()
+        except Exception:
+            log.exception("Could not capture the plan of a slow SQL statement")
+            return
+
+        log.warning("Plan of slow SQL statement from %s:\n%s", caller, plan)
@@ -0,0 +1,275 @@
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, ParamSpec, Protocol, TypeVar
+
+import httpx
+
+log = logging.getLogger("uvicorn")
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+SERVICE_NAME = "scholarnotes"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None = None
+    kind: int = SPAN_KIND_INTERNAL
+    start_time: int = field(default_factory=time.time_ns)
+    end_time: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_UNSET
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time),
+            "endTimeUnixNano": str(self.end_time),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status},
+        }
+        if self.parent_span_id is not None:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_request(spans: Iterable[Span]) -> dict[str, Any]:
+    """
+    Wraps spans in the body of an OTLP/JSON 'ExportTraceServiceRequest'.
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": otlp_value(SERVICE_NAME)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[Span]) -> None: ...
+
+
+class FileSpanExporter:
+    """
+    Appends every batch of spans to 'path' as one OTLP/JSON line, which a
+    collector's file receiver (or 'jq') can read back.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[Span]) -> None:
+        with open(self.path, "a") as file:
+            file.write(json.dumps(to_otlp_request(spans)) + "\n")
+
+
+class OTLPHttpSpanExporter:
+    """
+    Sends every batch of spans to an OTLP/HTTP collector using JSON encoding.
+    """
+
+    def __init__(self, endpoint: str):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.client = httpx.Client(timeout=5)
+
+    def export(self, spans: list[Span]) -> None:
+        self.client.post(self.url, json=to_otlp_request(spans))
+
+
+class BatchSpanProcessor:
+    """
+    Hands the finished spans to the exporter from a background thread, in
+    batches, so that exporting never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_batch_size: int = 512,
+        flush_interval: float = 1.0,
+    ):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.SimpleQueue[Span | None] = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def on_end(self, span: Span) -> None:
+        self.queue.put(span)
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: list[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    span = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self.export(batch)
+
+    def export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception:
+            log.exception("Could not export %d spans", len(batch))
+
+    def shutdown(self) -> None:
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Minimal tracer: spans are linked to the span active in the current context
+    and handed to the span processor when they end. While no processor is
+    configured tracing is disabled and starting spans costs a single check.
+    """
+
+    def __init__(self) -> None:
+        self.processor: BatchSpanProcessor | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        parent: Span | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> Span:
+        if parent is None:
+            parent = current_span.get()
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes=attributes or {},
+        )
+
+    def end_span(self, span: Span) -> None:
+        span.end_time = time.time_ns()
+        if self.processor is not None:
+            self.processor.on_end(span)
+
+    def configure(self, processor: BatchSpanProcessor | None) -> None:
+        self.shutdown()
+        self.processor = processor
+
+    def shutdown(self) -> None:
+        if self.processor is not None:
+            self.processor.shutdown()
+            self.processor = None
+
+
+tracer = Tracer()
+
+
+def configure_tracing(
+    enabled: bool, export_path: str, otlp_endpoint: str | None = None
+) -> None:
+    """
+    Enables tracing, exporting the spans to an OTLP/HTTP collector when
+    'otlp_endpoint' is set and to the 'export_path' file otherwise.
+    """
+    if not enabled:
+        tracer.configure(None)
+        return
+    exporter: SpanExporter
+    if otlp_endpoint:
+        exporter = OTLPHttpSpanExporter(otlp_endpoint)
+    else:
+        exporter = FileSpanExporter(export_path)
+    tracer.configure(BatchSpanProcessor(exporter))
+
+
+def traced(
+    function: Callable[P, Awaitable[R]],
+) -> Callable[P, Awaitable[R]]:
+    """
+    Runs the decorated coroutine function in a span named after it.
+    """
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if not tracer.enabled:
+            return await function(*args, **kwargs)
+
+        span = tracer.start_span(name)
+        token = current_span.set(span)
+        try:
+            return await function(*args, **kwargs)
+        except Exception as error:
+            span.status = STATUS_ERROR
+            span.attributes["exception.type"] = type(error).__name__
+            raise
+        finally:
+            current_span.reset(token)
+            tracer.end_span(span)
+
+    return wrapper
@@ -0,0 +1,360 @@
+"""
+Background job worker.
+
+Jobs are rows of the 'jobs' table, submitted through the /jobs endpoints and
+claimed with FOR UPDATE SKIP LOCKED, so any number of workers can run next to
+each other. A worker runs inside the app when JOB_WORKER_ENABLED is set, or as
+a separate process:
+
+    python -m app.worker
+
+Workers also enqueue the job purging the trash every TRASH_PURGE_INTERVAL
+seconds. Purge jobs only start, and only delete their next batch, while the
+database runs at most PURGE_MAX_ACTIVE_QUERIES queries for other clients.
+"""
+
+import asyncio
+import logging
+import signal
+from datetime import timedelta
+from time import monotonic
+from typing import Any, Awaitable, Callable
+
+from app.config import Settings, get_settings
+from app.crud.jobs import (
+    count_active_queries,
+    dequeue_job,
+    enqueue_job_once,
+    fail_job,
+    finish_job,
+    touch_job,
+    update_job_progress,
+)
+from app.crud.project import purge_project, purge_project_notes
+from app.crud.project_notes import (
+    bulk_update_notes_tags,
+    count_notes_for_project,
+    get_notes_page,
+    import_notes,
+    purge_deleted_notes,
+)
+from app.database import DatabaseSessionManager, sessionmanager
+from app.models import Job
+from app.schemas.jobs import (
+    BulkTagsJobPayloadSchema,
+    ExportJobPayloadSchema,
+    ImportJobPayloadSchema,
+    PurgeProjectJobPayloadSchema,
+)
+from app.schemas.project_notes import ProjectNoteResponseSchema
+
+log = logging.getLogger("uvicorn")
+
+# jobs only run while the database is not busy serving requests
+MAINTENANCE_JOB_KINDS = ("purge_project", "purge_trash")
+
+
+class JobLost(Exception):
+    """
+    Raised when the job was claimed again by another worker, this worker having
+    stopped sending heartbeats for too long: its attempt is over.
+    """
+
+
+class JobContext:
+    """
+    What a job handler needs besides its payload: the session manager to open
+    database sessions with, the settings, and a way to report its progress.
+    """
+
+    def __init__(
+        self, job: Job, sessionmanager: DatabaseSessionManager, settings: Settings
+    ) -> None:
+        self.job = job
+        self.sessionmanager = sessionmanager
+        self.settings = settings
+
+    async def progress(self, done: int, total: int | None) -> None:
+        # a separate session, the handler may be in the middle of a transaction
+        async with self.sessionmanager.session() as db_session:
+            updated = await update_job_progress(
+                job_id=self.job.id,
+                attempt=self.job.attempts,
+                progress=done,
+                total=total,
+                db_session=db_session,
+            )
+        if not updated:
+            raise JobLost()
+
+    async def wait_for_low_load(self) -> None:
+        while await database_is_busy(self.sessionmanager, self.settings):
+            await asyncio.sleep(self.settings.job_poll_interval)
+
+
+async def database_is_busy(
+    sessionmanager: DatabaseSessionManager, settings: Settings
+) -> bool:
+    async with sessionmanager.session() as db_session:
+        active_queries = await count_active_queries(db_session=db_session)
+    return active_queries > settings.purge_max_active_queries
+
+
+JobHandler = Callable[[JobContext], Awaitable[Any]]
+
+
+async def export_notes(ctx: JobContext) -> dict[str, Any]:
+    payload = ExportJobPayloadSchema.model_validate(ctx.job.payload)
+    batch_size = ctx.settings.job_batch_size
+    notes: list[dict[str, Any]] = []
+
+    async with ctx.sessionmanager.session() as db_session:
+        total = await count_notes_for_project(
+            project_id=payload.project_id, db_session=db_session
+        )
+        await ctx.progress(0, total)
+        after_note_id = 0
+        while True:
+            page = await get_notes_page(
+                project_id=payload.project_id,
+                after_note_id=after_note_id,
+                limit=batch_size,
+                db_session=db_session,
+            )
+            notes.extend(
+                ProjectNoteResponseSchema(
+                    note_id=note.id,
+                    project_id=note.project_id,
+                    note_name=note.name,
+                    note_author=note.author,
+                    note_publication_details=note.publication_details,
+                    note_publication_year=note.publication_year,
+                    note_comments=note.comments,
+                    created_at=note.created_at,
+                    updated_at=note.updated_at,
+                    note_tags=note.tags,
+                ).model_dump(mode="json")
+                for note in page
+            )
+            await ctx.progress(len(notes), max(total, len(notes)))
+            if len(page) < batch_size:
+                break
+            after_note_id = page[-1].id
+
+    return {"project_id": payload.project_id, "notes": notes}
+
+
+async def import_project_notes(ctx: JobContext) -> dict[str, int]:
+    payload = ImportJobPayloadSchema.model_validate(ctx.job.payload)
+    batch_size = ctx.settings.job_batch_size
+    total = len(payload.notes)
+    imported = 0
+
+    await ctx.progress(0, total)
+    async with ctx.sessionmanager.session() as db_session:
+        # every batch is committed, a failed import keeps the batches before it
+        for start in range(0, total, batch_size):
+            imported += await import_notes(
+                project_id=payload.project_id,
+                notes=payload.notes[start : start + batch_size],
+                db_session=db_session,
+            )
+            await ctx.progress(min(start + batch_size, total), total)
+
+    return {"imported": imported, "skipped": total - imported}
+
+
+async def bulk_update_tags(ctx: JobContext) -> dict[str, int]:
+    payload = BulkTagsJobPayloadSchema.model_validate(ctx.job.payload)
+
+    await ctx.progress(0, 1)
+    async with ctx.sessionmanager.session() as db_session:
+        added, removed = await bulk_update_notes_tags(
+            project_id=payload.project_id,
+            selection=payload,
+            add_tags=payload.add_tags,
+            remove_tags=payload.remove_tags,
+            snapshot_interval=ctx.settings.note_revision_snapshot_interval,
+            db_session=db_session,
+        )
+    await ctx.progress(1, 1)
+
+    return {"added": added, "removed": removed}
+
+
+async def purge_deleted_project(ctx: JobContext) -> dict[str, int]:
+    payload = PurgeProjectJobPayloadSchema.model_validate(ctx.job.payload)
+    batch_size = ctx.settings.bulk_delete_batch_size
+    deleted_notes = 0
+
+    async with ctx.sessionmanager.session() as db_session:
+        total = await count_notes_for_project(
+            project_id=payload.project_id, db_session=db_session, include_deleted=True
+        )
+        await ctx.progress(0, total)
+        # one transaction per batch, so that locks and WAL stay bounded however
+        # large the project is
+        while True:
+            await ctx.wait_for_low_load()
+            deleted = await purge_project_notes(
+                project_id=payload.project_id,
+                batch_size=batch_size,
+                db_session=db_session,
+            )
+            deleted_notes += deleted
+            await ctx.progress(deleted_notes, max(total, deleted_notes))
+            if deleted < batch_size:
+                break
+        await purge_project(project_id=payload.project_id, db_session=db_session)
+
+    return {"deleted_notes": deleted_notes}
+
+
+async def purge_trash(ctx: JobContext) -> dict[str, int]:
+    retention = timedelta(days=ctx.settings.trash_retention_days)
+    batch_size = ctx.settings.bulk_delete_batch_size
+    deleted_notes = 0
+
+    async with ctx.sessionmanager.session() as db_session:
+        while True:
+            await ctx.wait_for_low_load()
+            deleted = await purge_deleted_notes(
+                retention=retention, batch_size=batch_size, db_session=db_session
+            )
+            deleted_notes += deleted
+            await ctx.progress(deleted_notes, None)
+            if deleted < batch_size:
+                break
+
+    return {"deleted_notes": deleted_notes}
+
+
+JOB_HANDLERS: dict[str, JobHandler] = {
+    "export": export_notes,
+    "import": import_project_notes,
+    "bulk_tags": bulk_update_tags,
+    "purge_project": purge_deleted_project,
+    "purge_trash": purge_trash,
+}
+
+
+class Worker:
+    def __init__(
+        self, sessionmanager: DatabaseSessionManager, settings: Settings
+    ) -> None:
+        self.sessionmanager = sessionmanager
+        self.settings = settings
+        self.next_trash_purge = monotonic()
+
+    async def run_once(self) -> bool:
+        """
+        Runs the next job, if any. Returns whether a job was run.
+        """
+        busy = await database_is_busy(self.sessionmanager, self.settings)
+        async with self.sessionmanager.session() as db_session:
+            job = await dequeue_job(
+                stale_after=self.settings.job_stale_after,
+                max_attempts=self.settings.job_max_attempts,
+                db_session=db_session,
+                exclude_kinds=MAINTENANCE_JOB_KINDS if busy else (),
+            )
+        if job is None:
+            return False
+
+        log.info(f"Running job {job.id} ({job.kind}), attempt {job.attempts}")
+        run = asyncio.create_task(self.run_job(job))
+        # stops once the job was claimed again, the attempt is cancelled then
+        heartbeat = asyncio.create_task(self.heartbeat(job))
+        try:
+            await asyncio.wait({run, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            run.cancel()
+            heartbeat.cancel()
+            await asyncio.gather(run, heartbeat, return_exceptions=True)
+
+        if run.cancelled() or isinstance(run.exception(), JobLost):
+            log.warning(f"Job {job.id} ({job.kind}) was claimed again, attempt ended")
+            return True
+
+        exc = run.exception()
+        async with self.sessionmanager.session() as db_session:
+            if exc is not None:
+                log.error(f"Job {job.id} ({job.kind}) failed", exc_info=exc)
+                await fail_job(
+                    job_id=job.id,
+                    attempt=job.attempts,
+                    error=repr(exc),
+                    db_session=db_session,
+                )
+            else:
+                await finish_job(
+                    job_id=job.id,
+                    attempt=job.attempts,
+                    result=run.result(),
+                    db_session=db_session,
+                )
+
+        return True
+
+    async def run_job(self, job: Job) -> Any:
+        handler = JOB_HANDLERS[job.kind]
+        return await handler(JobContext(job, self.sessionmanager, self.settings))
+
+    async def heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.settings.job_heartbeat_interval)
+            try:
+                async with self.sessionmanager.session() as db_session:
+                    claimed = await touch_job(
+                        job_id=job.id, attempt=job.attempts, db_session=db_session
+                    )
+            except Exception:
+                # the next heartbeat may get through, before the job is stale
+                log.exception(f"Job {job.id} ({job.kind}) heartbeat failed")
+                continue
+            if not claimed:
+                return
+
+    async def schedule_trash_purge(self) -> None:
+        """
+        Enqueues the job purging the trash every TRASH_PURGE_INTERVAL seconds.
+        """
+        if monotonic() < self.next_trash_purge:
+            return
+        async with self.sessionmanager.session() as db_session:
+            await enqueue_job_once(
+                kind="purge_trash",
+                payload={"kind": "purge_trash"},
+                db_session=db_session,
+            )
+        self.next_trash_purge = monotonic() + self.settings.trash_purge_interval
+
+    async def run(self, stop: asyncio.Event) -> None:
+        log.info("Job worker started")
+        while not stop.is_set():
+            try:
+                await self.schedule_trash_purge()
+                if await self.run_once():
+                    continue
+            except Exception:
+                log.exception("Job worker could not dequeue a job")
+            try:
+                await asyncio.wait_for(stop.wait(), self.settings.job_poll_interval)
+            except TimeoutError:
+                pass
+        log.info("Job worker stopped")
+
+
+async def run_worker() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    await Worker(sessionmanager, get_settings()).run(stop)
+    await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker())
@@ -0,0 +1,87 @@
+"""
+Synthetic datasets for the benchmark suite, generated with set-based SQL so
+that even the largest sizes are seeded in seconds.
+"""
+
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+@dataclass
+class Dataset:
+    project_id: int
+    notes: int
+
+
+async def reset_database(conn: AsyncConnection) -> None:
+    await conn.execute(
+        text("TRUNCATE projects, notes, tags, notes_tags RESTART IDENTITY CASCADE")
+    )
+
+
+async def seed_tags(conn: AsyncConnection, tags: int) -> None:
+    await conn.execute(
+        text(
+            "INSERT INTO tags (name) SELECT 'tag_' || g FROM generate_series(1, :tags) g"
+        ),
+        {"tags": tags},
+    )
+
+
+async def seed_project(
+    conn: AsyncConnection,
+    name: str,
+    notes: int,
+    tags: int,
+    tags_per_note: int,
+    skew: float,
+) -> Dataset:
+    """
+    Inserts a project with 'notes' notes, each attached to up to
+    'tags_per_note' of the first 'tags' tags.
+
+    Tag popularity is skewed: tag ids are drawn as tags * random() ^ skew, so
+    with skew > 1 the lowest tag ids are attached to most of the notes, like
+    the handful of tags every reading list uses.
+    """
+    result = await conn.execute(
+        text(
+            "INSERT INTO projects (name, comment, created_at)"
+            " VALUES (:name, 'benchmark project', now()) RETURNING id"
+        ),
+        {"name": name},
+    )
+    project_id = result.scalar_one()
+
+    await conn.execute(
+        text(
+            "INSERT INTO notes (project_id, name, author, publication_details,"
+            " publication_year, comments, created_at)"
+            " SELECT :project_id, 'note_' || g, 'author_' || (g % 500),"
+            " 'publisher_' || (g % 50) || ', vol. ' || (g % 20),"
+            " 1900 + (g % 125), repeat('comment ', 20),"
+            " now() - make_interval(mins => g)"
+            " FROM generate_series(1, :notes) g"
+        ),
+        {"project_id": project_id, "notes": notes},
+    )
+    await conn.execute(
+        text(
+            "INSERT INTO notes_tags (note_id, tag_id)"
+            " SELECT n.id, 1 + floor(:tags * power(random(), :skew))::int"
+            " FROM notes n CROSS JOIN generate_series(1, :tags_per_note)"
+            " WHERE n.project_id = :project_id"
+            " ON CONFLICT DO NOTHING"
+        ),
+        {
+            "project_id": project_id,
+            "tags": tags,
+            "tags_per_note": tags_per_note,
+            "skew": skew,
+        },
+    )
+    await conn.execute(text("ANALYZE"))
+
+    return Dataset(project_id=project_id, notes=notes)
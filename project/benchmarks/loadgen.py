@@ -0,0 +1,396 @@
+"""
+Load generator for a running instance of the app.
+
+Drives the API with a weighted mix of scenarios from concurrent asyncio
+clients and reports latency, throughput, error rates and database pool
+saturation scraped from /metrics:
+
+    python -m benchmarks.loadgen --base-url http://localhost:8004 \\
+        --mix browse_projects=20,list_notes=40,create_note=20,patch_tags=15,delete_note=5 \\
+        --arrival closed --concurrency 32 --duration 60
+
+With the closed arrival model, --concurrency clients each send their next
+request as soon as the previous one completes. With the open model, requests
+arrive following a Poisson process of --rate requests per second whatever the
+response times, and latencies are measured from the scheduled arrival time so
+that a slow server is not hidden by fewer requests being sent.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from benchmarks.run import percentile
+
+
+@dataclass
+class LoadContext:
+    client: httpx.AsyncClient
+    project_id: int
+    tags: list[str]
+    rng: random.Random
+    note_ids: list[int] = field(default_factory=list)
+
+
+Scenario = Callable[[LoadContext], Awaitable[httpx.Response]]
+
+
+async def browse_projects(ctx: LoadContext) -> httpx.Response:
+    return await ctx.client.get(f"/projects/{ctx.project_id}/")
+
+
+async def list_notes(ctx: LoadContext) -> httpx.Response:
+    return await ctx.client.get(f"/projects/{ctx.project_id}/notes/")
+
+
+async def create_note(ctx: LoadContext) -> httpx.Response:
+    response = await ctx.client.post(
+        f"/projects/{ctx.project_id}/notes/",
+        json={
+            "note_name": f"loadgen_{os.urandom(8).hex()}",
+            "note_author": "loadgen",
+            "note_publication_year": ctx.rng.randint(1900, 2024),
+            "note_tags": ctx.rng.sample(ctx.tags, k=3),
+        },
+    )
+    if response.is_success:
+        ctx.note_ids.append(response.json()["note_id"])
+    return response
+
+
+async def patch_tags(ctx: LoadContext) -> httpx.Response:
+    if not ctx.note_ids:
+        return await create_note(ctx)
+    note_id = ctx.rng.choice(ctx.note_ids)
+    return await ctx.client.patch(
+        f"/projects/{ctx.project_id}/notes/{note_id}/",
+        json={"tags": ctx.rng.sample(ctx.tags, k=ctx.rng.randint(1, 4))},
+    )
+
+
+async def delete_note(ctx: LoadContext) -> httpx.Response:
+    # keep a few notes around for the patch_tags scenario
+    if len(ctx.note_ids) <= 10:
+        return await create_note(ctx)
+    note_id = ctx.note_ids.pop(ctx.rng.randrange(len(ctx.note_ids)))
+    return await ctx.client.delete(f"/projects/{ctx.project_id}/notes/{note_id}/")
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "browse_projects": browse_projects,
+    "list_notes": list_notes,
+    "create_note": create_note,
+    "patch_tags": patch_tags,
+    "delete_note": delete_note,
+}
+
+
+@dataclass
+class ScenarioStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, latency: float, status: str) -> None:
+        self.latencies.append(latency)
+        self.statuses[status] += 1
+        if not status.startswith(("2", "3")):
+            self.errors += 1
+
+    def summary(self, duration: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "throughput_rps": count / duration,
+            "p50_ms": percentile(latencies, 0.50) * 1000 if count else None,
+            "p95_ms": percentile(latencies, 0.95) * 1000 if count else None,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if count else None,
+            "max_ms": latencies[-1] * 1000 if count else None,
+            "statuses": dict(self.statuses),
+        }
+
+
+class PoolMonitor:
+    """
+    Samples the database pool gauges of /metrics while the load runs, and
+    compares the pool wait histogram before and after.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, interval: float) -> None:
+        self.client = client
+        self.interval = interval
+        self.checked_out: list[float] = []
+        self.overflow: list[float] = []
+        self.in_progress: list[float] = []
+        self.start_wait: dict[str, float] = {}
+        self.end_wait: dict[str, float] = {}
+
+    async def scrape(self) -> dict[str, float]:
+        response = await self.client.get("/metrics")
+        response.raise_for_status()
+        samples: dict[str, float] = defaultdict(float)
+        for family in text_string_to_metric_families(response.text):
+            for sample in family.samples:
+                if sample.name == "db_pool_wait_seconds_bucket":
+                    samples[f"wait_le_{sample.labels['le']}"] += sample.value
+                else:
+                    samples[sample.name] += sample.value
+        return samples
+
+    async def run(self, stop: asyncio.Event) -> None:
+        self.start_wait = await self.scrape()
+        while not stop.is_set():
+            samples = await self.scrape()
+            self.checked_out.append(samples["db_pool_checked_out_connections"])
+            self.overflow.append(samples["db_pool_overflow_connections"])
+            self.in_progress.append(samples["http_requests_in_progress"])
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except TimeoutError:
+                pass
+        self.end_wait = await self.scrape()
+
+    def summary(self) -> dict[str, Any]:
+        def delta(name: str) -> float:
+            return self.end_wait.get(name, 0.0) - self.start_wait.get(name, 0.0)
+
+        checkouts = delta("db_pool_wait_seconds_count")
+        return {
+            "checked_out_max": max(self.checked_out, default=0),
+            "checked_out_mean": statistics.fmean(self.checked_out or [0]),
+            "overflow_max": max(self.overflow, default=0),
+            "requests_in_progress_max": max(self.in_progress, default=0),
+            "checkouts": checkouts,
+            "wait_mean_ms": (
+                delta("db_pool_wait_seconds_sum") / checkouts * 1000 if checkouts else 0
+            ),
+            # share of the checkouts that had to wait for a connection
+            "waited_over_10ms": (
+                1 - delta("wait_le_0.01") / checkouts if checkouts else 0
+            ),
+        }
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(
+                f"unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}"
+            )
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class LoadGenerator:
+    def __init__(self, ctx: LoadContext, mix: dict[str, float]) -> None:
+        self.ctx = ctx
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.stats: dict[str, ScenarioStats] = defaultdict(ScenarioStats)
+        self.dropped = 0
+
+    async def execute(self, name: str, started: float) -> None:
+        try:
+            response = await SCENARIOS[name](self.ctx)
+            status = str(response.status_code)
+        except httpx.HTTPError as exc:
+            status = type(exc).__name__
+        self.stats[name].record(perf_counter() - started, status)
+
+    def choose(self) -> str:
+        return self.ctx.rng.choices(self.names, self.weights)[0]
+
+    async def closed_loop(self, concurrency: int, deadline: float) -> None:
+        async def client() -> None:
+            while perf_counter() < deadline:
+                await self.execute(self.choose(), perf_counter())
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    async def open_loop(self, rate: float, max_in_flight: int, deadline: float) -> None:
+        in_flight: set[asyncio.Task[None]] = set()
+        arrival = perf_counter()
+        while True:
+            arrival += self.ctx.rng.expovariate(rate)
+            if arrival >= deadline:
+                break
+            await asyncio.sleep(max(0.0, arrival - perf_counter()))
+            if len(in_flight) >= max_in_flight:
+                self.dropped += 1
+                continue
+            task = asyncio.create_task(self.execute(self.choose(), arrival))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        await asyncio.gather(*in_flight)
+
+
+async def setup_project(ctx: LoadContext, notes: int) -> None:
+    response = await ctx.client.post(
+        "/projects/", json={"name": f"loadgen_{os.urandom(4).hex()}"}
+    )
+    response.raise_for_status()
+    ctx.project_id = response.json()["id"]
+    for _ in range(notes):
+        (await create_note(ctx)).raise_for_status()
+
+
+async def run_load(args: argparse.Namespace) -> dict[str, Any]:
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        ctx = LoadContext(
+            client=client,
+            project_id=0,
+            tags=[f"loadgen_tag_{n}" for n in range(args.tags)],
+            rng=random.Random(args.seed),
+        )
+        print(f"Creating a project with {args.seed_notes} notes...")
+        await setup_project(ctx, args.seed_notes)
+
+        generator = LoadGenerator(ctx, args.mix)
+        # a connection of its own, the scrapes must not queue behind the load
+        # when the pool saturates, which is when their samples matter most
+        async with httpx.AsyncClient(
+            base_url=args.base_url,
+            limits=httpx.Limits(max_connections=1),
+            timeout=args.timeout,
+        ) as metrics_client:
+            monitor = PoolMonitor(metrics_client, args.metrics_interval)
+            stop = asyncio.Event()
+            monitor_task = asyncio.create_task(monitor.run(stop))
+
+            print(f"Running a {args.arrival} loop load for {args.duration}s...")
+            start = perf_counter()
+            deadline = start + args.duration
+            if args.arrival == "closed":
+                await generator.closed_loop(args.concurrency, deadline)
+            else:
+                await generator.open_loop(args.rate, args.concurrency, deadline)
+            elapsed = perf_counter() - start
+            stop.set()
+            await monitor_task
+
+        if not args.keep_data:
+            await client.delete(f"/projects/{ctx.project_id}/")
+
+    total = ScenarioStats()
+    for stats in generator.stats.values():
+        total.latencies.extend(stats.latencies)
+        total.errors += stats.errors
+        for status, count in stats.statuses.items():
+            total.statuses[status] += count
+    return {
+        "arrival": args.arrival,
+        "concurrency": args.concurrency,
+        "rate": args.rate if args.arrival == "open" else None,
+        "duration_s": elapsed,
+        "dropped": generator.dropped,
+        "total": total.summary(elapsed),
+        "scenarios": {
+            name: stats.summary(elapsed) for name, stats in generator.stats.items()
+        },
+        "pool": monitor.summary(),
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\n{'scenario':<16}{'requests':>10}{'errors':>8}{'err %':>8}{'req/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    )
+    rows = {**report["scenarios"], "total": report["total"]}
+    for name, row in rows.items():
+        if not row["requests"]:
+            continue
+        print(
+            f"{name:<16}{row['requests']:>10}{row['errors']:>8}"
+            f"{row['error_rate'] * 100:>8.2f}{row['throughput_rps']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            f"{row['max_ms']:>9.1f}"
+        )
+    for name, row in report["scenarios"].items():
+        failed = {
+            status: count
+            for status, count in row["statuses"].items()
+            if not status.startswith(("2", "3"))
+        }
+        if failed:
+            print(f"{name} errors: {failed}")
+    if report["dropped"]:
+        print(f"\n{report['dropped']} arrivals dropped, concurrency limit reached")
+    pool = report["pool"]
+    print(
+        f"\nDB pool: {pool['checked_out_max']:.0f} connections checked out at most"
+        f" ({pool['checked_out_mean']:.1f} on average), {pool['overflow_max']:.0f}"
+        f" overflow connections at most, {pool['checkouts']:.0f} checkouts waiting"
+        f" {pool['wait_mean_ms']:.2f} ms on average,"
+        f" {pool['waited_over_10ms'] * 100:.1f}% waiting over 10 ms"
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--base-url", default="http://localhost:8004")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="browse_projects=20,list_notes=40,create_note=20,"
+        "patch_tags=15,delete_note=5",
+        help="comma separated scenario=weight pairs (default: %(default)s)",
+    )
+    parser.add_argument("--arrival", choices=["closed", "open"], default="closed")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="clients of the closed loop, or maximum requests in flight of the"
+        " open loop (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=50.0,
+        help="open loop arrivals per second (default: %(default)s)",
+    )
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed-notes", type=int, default=50)
+    parser.add_argument("--tags", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--metrics-interval", type=float, default=1.0)
+    parser.add_argument("--keep-data", action="store_true")
+    parser.add_argument("--json", type=Path, help="also write the report there")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+    return 1 if report["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+"""
+Endpoint benchmark suite.
+
+Seeds one project per dataset size into a dedicated database, measures the
+latency percentiles, throughput, SQL statements and peak memory of every
+route in app/api/routers/projects.py and app/api/routers/project_notes.py,
+and compares them with a stored baseline:
+
+    python -m benchmarks.run --database-url postgresql+asyncpg://.../web_bench
+    python -m benchmarks.run --database-url ... --update-baseline
+
+The exit status is 1 when a measurement exceeds its baseline threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from alembic import command, config
+from benchmarks.datasets import Dataset, reset_database, seed_project, seed_tags
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = PROJECT_DIR / "benchmarks" / "baseline.json"
+
+
+@dataclass
+class BenchmarkContext:
+    engine: AsyncEngine
+    dataset: Dataset
+    note_id: int
+    args: argparse.Namespace
+    run_id: str
+
+
+@dataclass
+class CaseResult:
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput_rps: float
+    queries: int
+    peak_memory_kb: float
+    errors: int
+
+
+Request = tuple[str, str, dict[str, Any] | None]
+Prepare = Callable[[BenchmarkContext, int], Awaitable[Request]]
+
+
+async def insert_note(ctx: BenchmarkContext, name: str, year: int = 2000) -> int:
+    async with ctx.engine.begin() as conn:
+        result = await conn.execute(
+            text(
+                "INSERT INTO notes (project_id, name, publication_year, created_at)"
+                " VALUES (:project_id, :name, :year, now()) RETURNING id"
+            ),
+            {"project_id": ctx.dataset.project_id, "name": name, "year": year},
+        )
+        return int(result.scalar_one())
+
+
+async def get_projects(ctx: BenchmarkContext, i: int) -> Request:
+    return "GET", "/projects/", None
+
+
+async def get_project(ctx: BenchmarkContext, i: int) -> Request:
+    return "GET", f"/projects/{ctx.dataset.project_id}/", None
+
+
+async def post_project(ctx: BenchmarkContext, i: int) -> Request:
+    payload = {"name": f"bench_{ctx.run_id}_{ctx.dataset.notes}_{i}"}
+    return "POST", "/projects/", payload
+
+
+async def patch_project(ctx: BenchmarkContext, i: int) -> Request:
+    payload = {"comment": f"benchmark project {i}"}
+    return "PATCH", f"/projects/{ctx.dataset.project_id}/", payload
+
+
+async def delete_project(ctx: BenchmarkContext, i: int) -> Request:
+    async with ctx.engine.begin() as conn:
+        dataset = await seed_project(
+            conn,
+            name=f"bench_delete_{ctx.run_id}_{ctx.dataset.notes}_{i}",
+            notes=ctx.dataset.notes,
+            tags=ctx.args.tags,
+            tags_per_note=ctx.args.tags_per_note,
+            skew=ctx.args.skew,
+        )
+    return "DELETE", f"/projects/{dataset.project_id}/", None
+
+
+async def get_project_notes(ctx: BenchmarkContext, i: int) -> Request:
+    return "GET", f"/projects/{ctx.dataset.project_id}/notes/", None
+
+
+async def get_project_note(ctx: BenchmarkContext, i: int) -> Request:
+    return "GET", f"/projects/{ctx.dataset.project_id}/notes/{ctx.note_id}/", None
+
+
+async def post_project_note(ctx: BenchmarkContext, i: int) -> Request:
+    payload = {
+        "note_name": f"bench_note_{ctx.run_id}_{i}",
+        "note_author": "benchmark author",
+        "note_publication_year": 2000,
+        "note_tags": ["tag_1", f"tag_{i % ctx.args.tags + 1}", f"bench_tag_{i}"],
+    }
+    return "POST", f"/projects/{ctx.dataset.project_id}/notes/", payload
+
+
+async def patch_project_note(ctx: BenchmarkContext, i: int) -> Request:
+    payload = {
+        "comments": f"patched {i}",
+        "tags": ["tag_1", f"tag_{i % ctx.args.tags + 1}"],
+    }
+    return (
+        "PATCH",
+        f"/projects/{ctx.dataset.project_id}/notes/{ctx.note_id}/",
+        payload,
+    )
+
+
+async def delete_project_note(ctx: BenchmarkContext, i: int) -> Request:
+    note_id = await insert_note(ctx, name=f"bench_delete_{ctx.run_id}_{i}")
+    return "DELETE", f"/projects/{ctx.dataset.project_id}/notes/{note_id}/", None
+
+
+async def bulk_update_project_notes_tags(ctx: BenchmarkContext, i: int) -> Request:
+    # alternately attach and detach a tag on a tenth of the publication years
+    tag = f"bench_bulk_tag_{ctx.run_id}"
+    payload: dict[str, Any] = {
+        "filter": {"publication_year_from": 1900, "publication_year_to": 1912},
+        "add_tags" if i % 2 == 0 else "remove_tags": [tag],
+    }
+    return "PATCH", f"/projects/{ctx.dataset.project_id}/notes/bulk/tags/", payload
+
+
+async def bulk_delete_project_notes(ctx: BenchmarkContext, i: int) -> Request:
+    note_ids = [
+        await insert_note(ctx, name=f"bench_bulk_delete_{ctx.run_id}_{i}_{n}")
+        for n in range(10)
+    ]
+    payload = {"note_ids": note_ids}
+    return "POST", f"/projects/{ctx.dataset.project_id}/notes/bulk/delete/", payload
+
+
+CASES: dict[str, Prepare] = {
+    "GET /projects/": get_projects,
+    "GET /projects/{project_id}/": get_project,
+    "POST /projects/": post_project,
+    "PATCH /projects/{project_id}/": patch_project,
+    "DELETE /projects/{project_id}/": delete_project,
+    "GET /projects/{project_id}/notes/": get_project_notes,
+    "GET /projects/{project_id}/notes/{note_id}/": get_project_note,
+    "POST /projects/{project_id}/notes/": post_project_note,
+    "PATCH /projects/{project_id}/notes/{note_id}/": patch_project_note,
+    "DELETE /projects/{project_id}/notes/{note_id}/": delete_project_note,
+    "PATCH /projects/{project_id}/notes/bulk/tags/": bulk_update_project_notes_tags,
+    "POST /projects/{project_id}/notes/bulk/delete/": bulk_delete_project_notes,
+}
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+async def send(client: httpx.AsyncClient, request: Request) -> httpx.Response:
+    method, path, payload = request
+    return await client.request(method, path, json=payload)
+
+
+async def run_case(
+    client: httpx.AsyncClient, prepare: Prepare, ctx: BenchmarkContext
+) -> CaseResult:
+    args = ctx.args
+    iteration = 0
+    for _ in range(args.warmup):
+        await send(client, await prepare(ctx, iteration))
+        iteration += 1
+
+    latencies = []
+    queries = errors = 0
+    for _ in range(args.iterations):
+        request = await prepare(ctx, iteration)
+        iteration += 1
+        start = perf_counter()
+        response = await send(client, request)
+        latencies.append(perf_counter() - start)
+        if response.status_code >= 400:
+            errors += 1
+        queries = max(queries, int(response.headers.get("x-db-statements", 0)))
+
+    # memory is measured in a separate pass, tracemalloc slowing down every
+    # allocation would distort the latencies
+    tracemalloc.start()
+    peak_memory = 0
+    for _ in range(args.memory_iterations):
+        request = await prepare(ctx, iteration)
+        iteration += 1
+        tracemalloc.reset_peak()
+        baseline_memory = tracemalloc.get_traced_memory()[0]
+        await send(client, request)
+        peak_memory = max(
+            peak_memory, tracemalloc.get_traced_memory()[1] - baseline_memory
+        )
+    tracemalloc.stop()
+
+    latencies.sort()
+    return CaseResult(
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p95_ms=percentile(latencies, 0.95) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        mean_ms=statistics.fmean(latencies) * 1000,
+        throughput_rps=len(latencies) / sum(latencies),
+        queries=queries,
+        peak_memory_kb=peak_memory / 1024,
+        errors=errors,
+    )
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict[str, CaseResult]:
+    # imported here so that the app is configured by the environment set in main
+    from app.database import sessionmanager
+    from app.main import create_application
+
+    engine = create_async_engine(args.database_url)
+    run_id = os.urandom(4).hex()
+    results: dict[str, CaseResult] = {}
+
+    datasets = []
+    async with engine.begin() as conn:
+        if not args.skip_seed:
+            print(f"Seeding {args.tags} tags and projects of {args.sizes} notes...")
+            await reset_database(conn)
+            await seed_tags(conn, args.tags)
+        for size in args.sizes:
+            project_id = await conn.scalar(
+                text("SELECT id FROM projects WHERE name = :name"),
+                {"name": f"bench_{size}"},
+            )
+            if project_id is None:
+                dataset = await seed_project(
+                    conn,
+                    name=f"bench_{size}",
+                    notes=size,
+                    tags=args.tags,
+                    tags_per_note=args.tags_per_note,
+                    skew=args.skew,
+                )
+            else:
+                dataset = Dataset(project_id=project_id, notes=size)
+            note_id = await conn.scalar(
+                text("SELECT min(id) FROM notes WHERE project_id = :project_id"),
+                {"project_id": dataset.project_id},
+            )
+            datasets.append((dataset, note_id))
+
+    app = create_application()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark"
+    ) as client:
+        for dataset, note_id in datasets:
+            ctx = BenchmarkContext(
+                engine=engine,
+                dataset=dataset,
+                note_id=note_id,
+                args=args,
+                run_id=run_id,
+            )
+            for name, prepare in CASES.items():
+                if args.cases and not any(case in name for case in args.cases):
+                    continue
+                result = await run_case(client, prepare, ctx)
+                results[f"{dataset.notes} notes | {name}"] = result
+                print_result(f"{dataset.notes} notes | {name}", result)
+
+    await engine.dispose()
+    await sessionmanager.close()
+    return results
+
+
+def print_result(key: str, result: CaseResult) -> None:
+    print(
+        f"{key:<70} p50 {result.p50_ms:8.2f} ms  p95 {result.p95_ms:8.2f} ms"
+        f"  p99 {result.p99_ms:8.2f} ms  {result.throughput_rps:8.1f} req/s"
+        f"  {result.queries:3d} queries  {result.peak_memory_kb:10.1f} KiB"
+        f"  {result.errors} errors"
+    )
+
+
+def compare_with_baseline(
+    results: dict[str, CaseResult],
+    baseline: dict[str, Any],
+    latency_threshold: float,
+    memory_threshold: float,
+) -> list[str]:
+    """
+    Returns a description of every measurement exceeding its baseline by more
+    than the allowed threshold. Any additional SQL statement is a failure.
+    """
+    failures = []
+    for key, result in results.items():
+        if result.errors:
+            failures.append(f"{key}: {result.errors} requests failed")
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        if result.p95_ms > expected["p95_ms"] * (1 + latency_threshold):
+            failures.append(
+                f"{key}: p95 {result.p95_ms:.2f} ms, baseline"
+                f" {expected['p95_ms']:.2f} ms"
+            )
+        if result.queries > expected["queries"]:
+            failures.append(
+                f"{key}: {result.queries} queries, baseline {expected['queries']}"
+            )
+        if result.peak_memory_kb > expected["peak_memory_kb"] * (1 + memory_threshold):
+            failures.append(
+                f"{key}: peak memory {result.peak_memory_kb:.1f} KiB, baseline"
+                f" {expected['peak_memory_kb']:.1f} KiB"
+            )
+    return failures
+
+
+def run_migrations(database_url: str) -> None:
+    # alembic/env.py takes its URL from DATABASE_URL, unless it is given a
+    # connection, like tests/conftest.py does
+    cfg = config.Config(str(PROJECT_DIR / "alembic.ini"))
+    cfg.set_main_option("script_location", str(PROJECT_DIR / "alembic"))
+
+    def upgrade(connection: Any) -> None:
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, "head")
+
+    async def run_upgrade() -> None:
+        engine = create_async_engine(database_url)
+        async with engine.begin() as conn:
+            await conn.run_sync(upgrade)
+        await engine.dispose()
+
+    asyncio.run(run_upgrade())
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("BENCHMARK_DATABASE_URL"),
+        help="dedicated benchmark database, its tables are truncated"
+        " (default: $BENCHMARK_DATABASE_URL)",
+    )
+    parser.add_argument(
+        "--sizes",
+        default="10,1000,100000",
+        type=lambda value: [int(size) for size in value.split(",")],
+        help="comma separated numbers of notes per project (default: %(default)s)",
+    )
+    parser.add_argument("--tags", type=int, default=10_000)
+    parser.add_argument("--tags-per-note", type=int, default=3)
+    parser.add_argument(
+        "--skew",
+        type=float,
+        default=3.0,
+        help="tag popularity skew, 1 is uniform (default: %(default)s)",
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-iterations", type=int, default=2)
+    parser.add_argument(
+        "--cases", nargs="*", help="only run the cases containing these strings"
+    )
+    parser.add_argument(
+        "--skip-seed",
+        action="store_true",
+        help="reuse the data seeded by a previous run",
+    )
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--latency-threshold", type=float, default=0.25)
+    parser.add_argument("--memory-threshold", type=float, default=0.5)
+    parser.add_argument("--force", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        print("A benchmark database URL is required (--database-url).")
+        return 2
+    if "bench" not in (make_url(args.database_url).database or "") and not args.force:
+        print(
+            "The benchmark truncates every table of its database; use a database"
+            " whose name contains 'bench' or pass --force."
+        )
+        return 2
+
+    # the app reads its configuration from the environment when imported
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["TESTING"] = "1"
+    run_migrations(args.database_url)
+
+    results = asyncio.run(run_benchmarks(args))
+
+    if args.update_baseline:
+        args.baseline.write_text(
+            json.dumps(
+                {key: asdict(result) for key, result in results.items()}, indent=2
+            )
+            + "\n"
+        )
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline found at {args.baseline}, run with --update-baseline.")
+        return 0
+
+    failures = compare_with_baseline(
+        results,
+        json.loads(args.baseline.read_text()),
+        latency_threshold=args.latency_threshold,
+        memory_threshold=args.memory_threshold,
+    )
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
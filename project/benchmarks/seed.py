@@ -0,0 +1,293 @@
+"""
+Synthetic data seeder loading projects, notes, tags and notes_tags with COPY.
+
+Rows are generated by a pool of worker processes in batches of consecutive
+note ids and loaded in parallel over several connections with asyncpg
+copy_records_to_table, which is orders of magnitude faster than inserting
+them through the ORM:
+
+    python -m benchmarks.seed --database-url postgresql+asyncpg://.../web_bench \\
+        --projects 1000 --notes 3000000 --tags 50000 --tags-per-note 2.5
+
+Note counts per project and tag popularity follow Zipf distributions whose
+exponents are set by --project-skew and --tag-skew (0 is uniform), the number
+of tags of a note follows a Poisson distribution of mean --tags-per-note.
+
+The connections load the rows with session_replication_role set to 'replica',
+so that neither the foreign keys nor the triggers maintaining project_stats
+run for every batch, and the statistics are computed once at the end. This
+requires a superuser, which a benchmark database is loaded by anyway.
+"""
+
+import argparse
+import asyncio
+import itertools
+import math
+import os
+import random
+import sys
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Any
+
+import asyncpg  # type: ignore[import-untyped]
+from sqlalchemy.engine import make_url
+
+NOTE_COLUMNS = [
+    "id",
+    "project_id",
+    "name",
+    "author",
+    "publication_details",
+    "publication_year",
+    "comments",
+    "created_at",
+]
+
+# cumulative tag weights of the worker processes, set by init_worker
+_tag_cum_weights: list[float] = []
+
+
+@dataclass
+class NotesBatch:
+    first_note_id: int
+    last_note_id: int
+    # first note id of every project, and the project ids, in the same order
+    project_starts: list[int]
+    project_ids: list[int]
+    first_tag_id: int
+    tags_per_note: float
+    prefix: str
+    seed: int
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    return [1 / (rank**skew) for rank in range(1, count + 1)]
+
+
+def init_worker(tags: int, tag_skew: float) -> None:
+    global _tag_cum_weights
+    _tag_cum_weights = list(itertools.accumulate(zipf_weights(tags, tag_skew)))
+
+
+def poisson(rng: random.Random, mean: float) -> int:
+    limit, k, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        k += 1
+        product *= rng.random()
+    return k
+
+
+def generate_notes(
+    batch: NotesBatch,
+) -> tuple[list[tuple[Any, ...]], list[tuple[int, int]]]:
+    rng = random.Random(batch.seed)
+    tags = range(batch.first_tag_id, batch.first_tag_id + len(_tag_cum_weights))
+    now = datetime.now(timezone.utc)
+    notes: list[tuple[Any, ...]] = []
+    notes_tags: list[tuple[int, int]] = []
+    for note_id in range(batch.first_note_id, batch.last_note_id + 1):
+        project_id = batch.project_ids[bisect_right(batch.project_starts, note_id) - 1]
+        notes.append(
+            (
+                note_id,
+                project_id,
+                f"{batch.prefix}_note_{note_id}",
+                f"author_{rng.randrange(10_000)}",
+                f"publisher_{rng.randrange(500)}, vol. {rng.randrange(1, 40)}",
+                rng.randint(1800, 2024),
+                "comment " * rng.randrange(40),
+                now - timedelta(seconds=rng.randrange(10 * 365 * 86400)),
+            )
+        )
+        k = min(poisson(rng, batch.tags_per_note), len(tags))
+        note_tags = set(rng.choices(tags, cum_weights=_tag_cum_weights, k=k))
+        notes_tags.extend((note_id, tag_id) for tag_id in note_tags)
+    return notes, notes_tags
+
+
+def split_notes(
+    notes: int, projects: int, skew: float, rng: random.Random
+) -> list[int]:
+    """
+    Returns the number of notes of every project, in random order.
+    """
+    weights = zipf_weights(projects, skew)
+    total = sum(weights)
+    counts = [math.floor(notes * weight / total) for weight in weights]
+    for index in range(notes - sum(counts)):
+        counts[index % projects] += 1
+    rng.shuffle(counts)
+    return counts
+
+
+async def next_id(conn: asyncpg.Connection, table: str) -> int:
+    return await conn.fetchval(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")
+
+
+async def copy_notes(
+    pool: asyncpg.Pool,
+    executor: ProcessPoolExecutor,
+    batch: NotesBatch,
+    semaphore: asyncio.Semaphore,
+) -> tuple[int, int]:
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        notes, notes_tags = await loop.run_in_executor(executor, generate_notes, batch)
+        async with pool.acquire() as conn, conn.transaction():
+            await conn.copy_records_to_table(
+                "notes", records=notes, columns=NOTE_COLUMNS
+            )
+            await conn.copy_records_to_table(
+                "notes_tags", records=notes_tags, columns=["note_id", "tag_id"]
+            )
+    return len(notes), len(notes_tags)
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    await conn.execute("SET session_replication_role = replica")
+
+
+async def seed(args: argparse.Namespace) -> None:
+    url = make_url(args.database_url).set(drivername="postgresql")
+    rng = random.Random(args.seed)
+    started = perf_counter()
+
+    async with asyncpg.create_pool(
+        url.render_as_string(hide_password=False),
+        min_size=args.workers,
+        max_size=args.workers,
+        init=init_connection,
+    ) as pool:
+        async with pool.acquire() as conn:
+            if args.truncate:
+                await conn.execute(
+                    "TRUNCATE projects, notes, tags, notes_tags"
+                    " RESTART IDENTITY CASCADE"
+                )
+            first_project_id = await next_id(conn, "projects")
+            first_note_id = await next_id(conn, "notes")
+            first_tag_id = await next_id(conn, "tags")
+
+            now = datetime.now(timezone.utc)
+            project_ids = list(
+                range(first_project_id, first_project_id + args.projects)
+            )
+            await conn.copy_records_to_table(
+                "projects",
+                records=[
+                    (project_id, f"{args.prefix}_project_{project_id}", now)
+                    for project_id in project_ids
+                ],
+                columns=["id", "name", "created_at"],
+            )
+            await conn.copy_records_to_table(
+                "tags",
+                records=[
+                    (tag_id, f"{args.prefix}_tag_{tag_id}")
+                    for tag_id in range(first_tag_id, first_tag_id + args.tags)
+                ],
+                columns=["id", "name"],
+            )
+        print(f"{args.projects} projects and {args.tags} tags loaded")
+
+        counts = split_notes(args.notes, args.projects, args.project_skew, rng)
+        project_starts = list(itertools.accumulate(counts[:-1], initial=first_note_id))
+        batches = [
+            NotesBatch(
+                first_note_id=start,
+                last_note_id=min(start + args.batch_size, first_note_id + args.notes)
+                - 1,
+                project_starts=project_starts,
+                project_ids=project_ids,
+                first_tag_id=first_tag_id,
+                tags_per_note=args.tags_per_note,
+                prefix=args.prefix,
+                seed=rng.getrandbits(64),
+            )
+            for start in range(
+                first_note_id, first_note_id + args.notes, args.batch_size
+            )
+        ]
+
+        semaphore = asyncio.Semaphore(args.workers)
+        loaded_notes = loaded_notes_tags = 0
+        with ProcessPoolExecutor(
+            args.workers, initializer=init_worker, initargs=(args.tags, args.tag_skew)
+        ) as executor:
+            tasks = [
+                asyncio.create_task(copy_notes(pool, executor, batch, semaphore))
+                for batch in batches
+            ]
+            for task in asyncio.as_completed(tasks):
+                notes, notes_tags = await task
+                loaded_notes += notes
+                loaded_notes_tags += notes_tags
+                print(
+                    f"{loaded_notes} notes and {loaded_notes_tags} notes_tags loaded"
+                    f" in {perf_counter() - started:.1f}s"
+                )
+
+        async with pool.acquire() as conn:
+            # ids were set explicitly, move the sequences past them
+            for table in ("projects", "notes", "tags"):
+                await conn.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'),"
+                    f" (SELECT coalesce(max(id), 1) FROM {table}))"
+                )
+            await conn.execute("SELECT project_stats_refresh()")
+            await conn.execute("ANALYZE projects, notes, tags, notes_tags")
+
+    print(f"Done in {perf_counter() - started:.1f}s")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("BENCHMARK_DATABASE_URL"),
+        help="database to load, migrated to the latest revision"
+        " (default: $BENCHMARK_DATABASE_URL)",
+    )
+    parser.add_argument("--projects", type=int, default=100)
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=10_000)
+    parser.add_argument("--tags-per-note", type=float, default=3.0)
+    parser.add_argument("--project-skew", type=float, default=1.0)
+    parser.add_argument("--tag-skew", type=float, default=1.0)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument(
+        "--prefix",
+        default="seed",
+        help="prefix of the generated names, change it to load more data in an"
+        " already seeded database (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--truncate", action="store_true", help="empty all the tables first"
+    )
+    parser.add_argument("--force", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if not args.database_url:
+        print("A database URL is required (--database-url).")
+        return 2
+    if "bench" not in (make_url(args.database_url).database or "") and not args.force:
+        print(
+            "Refusing to load synthetic data into a database whose name does not"
+            " contain 'bench', pass --force to do it anyway."
+        )
+        return 2
+    asyncio.run(seed(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
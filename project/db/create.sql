@@ -1,2 +1,8 @@
 CREATE DATABASE web_dev;
-CREATE DATABASE web_test;
\ No newline at end of file
+CREATE DATABASE web_test;
+CREATE DATABASE web_bench;
+
+\c web_dev
+CREATE EXTENSION pg_stat_statements;
+\c web_bench
+CREATE EXTENSION pg_stat_statements;
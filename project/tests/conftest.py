@@ -1,24 +1,43 @@
 import asyncio
 import os
+from contextlib import contextmanager
 from datetime import datetime
 from unittest.mock import AsyncMock
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import delete, insert, text
+from sqlalchemy import Engine, delete, event, insert, text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from alembic import command, config
 from app.config import Settings, get_settings
 from app.database import DatabaseSessionManager, get_db_session
 from app.main import create_application
-from app.models import Note, Project, Tag
+from app.models import Job, Note, Project, Tag
+from app.worker import Worker
 
 
 def get_settings_override():
     return Settings(testing=1, database_url=os.environ.get("DATABASE_TEST_URL"))
 
 
+def unique_violation(constraint_name: str) -> IntegrityError:
+    """
+    Returns the IntegrityError SQLAlchemy raises with asyncpg when the unique
+    constraint 'constraint_name' is violated.
+    """
+
+    class UniqueViolationError(Exception):
+        pass
+
+    cause = UniqueViolationError()
+    cause.constraint_name = constraint_name  # type: ignore[attr-defined]
+    orig = Exception()
+    orig.__cause__ = cause
+    return IntegrityError("INSERT", {}, orig)
+
+
 def run_latest_migration():
     # from Alembic docs:
     # https://alembic.sqlalchemy.org/en/latest/cookbook.html#programmatic-api-use-connection-sharing-with-asyncio
@@ -233,3 +252,88 @@ async def delete_tags_data(get_session):
     session = get_session
     await session.execute(delete(Tag))
     await session.commit()
+
+
+@pytest.fixture(scope="function")
+async def delete_jobs_data(get_session):
+    yield
+    session = get_session
+    await session.execute(delete(Job))
+    await session.commit()
+
+
+@pytest.fixture(scope="function")
+def override_settings(test_app):
+    """
+    Returns a function making the app use the given settings for the rest of
+    the test:
+
+        settings = get_settings_override()
+        settings.trash_retention_days = 0
+        override_settings(settings)
+    """
+
+    def _override_settings(settings: Settings) -> None:
+        test_app.app.dependency_overrides[get_settings] = lambda: settings
+
+    yield _override_settings
+    test_app.app.dependency_overrides[get_settings] = get_settings_override
+
+
+@pytest.fixture(scope="function")
+def run_job_worker():
+    """
+    Returns a function running the queued jobs of the test database with the
+    job worker, until there is none left:
+
+        run_job_worker()
+    """
+
+    def _run_job_worker(settings: Settings | None = None) -> int:
+        async def run() -> int:
+            sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+            worker = Worker(sessionmanager, settings or get_settings_override())
+            jobs = 0
+            try:
+                while await worker.run_once():
+                    jobs += 1
+            finally:
+                await sessionmanager.close()
+            return jobs
+
+        return asyncio.run(run())
+
+    return _run_job_worker
+
+
+@pytest.fixture(scope="function")
+def assert_max_queries():
+    """
+    Returns a context manager that fails the test if more than 'max_queries'
+    SQL statements are executed inside it, listing the statements that were
+    sent so that loading regressions (N+1 patterns, eager loading fan-out)
+    are easy to spot:
+
+        with assert_max_queries(2):
+            test_app.get("/projects/1/")
+    """
+
+    @contextmanager
+    def _assert_max_queries(max_queries: int):
+        statements = []
+
+        def count_statement(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", count_statement)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", count_statement)
+
+        assert len(statements) <= max_queries, (
+            f"Expected at most {max_queries} SQL statements, {len(statements)}"
+            " were executed:\n" + "\n".join(statements)
+        )
+
+    return _assert_max_queries
@@ -0,0 +1,297 @@
+import json
+
+import pytest
+
+from app import analytics
+
+
+@pytest.fixture(autouse=True)
+def clear_analytics_cache():
+    analytics.analytics_cache.clear()
+    yield
+    analytics.analytics_cache.clear()
+
+
+class TestGetProjectTagCooccurrence:
+    def test_get_project_tag_cooccurrence_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+
+        # tag_1 and tag_2 are both only on note 1, one of the 2 notes
+        assert response.status_code == 200
+        assert response.json() == {
+            "project_id": 1,
+            "note_count": 2,
+            "pairs": [
+                {
+                    "tag": "tag_1",
+                    "other_tag": "tag_2",
+                    "note_count": 1,
+                    "lift": 2.0,
+                    "pmi": pytest.approx(1.0),
+                }
+            ],
+        }
+
+    def test_get_project_tag_cooccurrence_min_count(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/analytics/tag-cooccurrence/?min_count=2")
+
+        assert response.status_code == 200
+        assert response.json() == {"project_id": 1, "note_count": 2, "pairs": []}
+
+    def test_get_project_tag_cooccurrence_orders_pairs(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        payload = {"note_ids": [1, 2], "add_tags": ["tag_3"], "remove_tags": []}
+        test_app.patch("/projects/1/notes/bulk/tags/", data=json.dumps(payload))
+
+        by_count = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+        by_lift = test_app.get("/projects/1/analytics/tag-cooccurrence/?order_by=lift")
+
+        count_pairs = [
+            (pair["tag"], pair["other_tag"], pair["note_count"])
+            for pair in by_count.json()["pairs"]
+        ]
+        lift_pairs = [
+            (pair["tag"], pair["other_tag"], pair["lift"])
+            for pair in by_lift.json()["pairs"]
+        ]
+        assert count_pairs[0] == ("tag_1", "tag_2", 1)
+        assert sorted(count_pairs) == [
+            ("tag_1", "tag_2", 1),
+            ("tag_1", "tag_3", 1),
+            ("tag_2", "tag_3", 1),
+        ]
+        assert lift_pairs == [
+            ("tag_1", "tag_2", 2.0),
+            ("tag_1", "tag_3", 1.0),
+            ("tag_2", "tag_3", 1.0),
+        ]
+
+    def test_get_project_tag_cooccurrence_follows_tag_changes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        first = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+        test_app.post(
+            "/tags/rename/",
+            data=json.dumps({"name": "tag_2", "new_name": "renamed_tag"}),
+        )
+        second = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+        test_app.delete("/projects/1/notes/1/")
+        third = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+
+        assert first.json()["pairs"][0]["other_tag"] == "tag_2"
+        assert second.json()["pairs"][0]["other_tag"] == "renamed_tag"
+        assert third.json() == {"project_id": 1, "note_count": 1, "pairs": []}
+
+    def test_get_project_tag_cooccurrence_incorrect_project_id(self, test_app):
+        response = test_app.get("/projects/999/analytics/tag-cooccurrence/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
+
+class TestGetProjectsTagCooccurrence:
+    def test_get_projects_tag_cooccurrence_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/analytics/tag-cooccurrence/")
+
+        assert response.status_code == 200
+        assert response.json()["project_id"] is None
+        assert response.json()["note_count"] == 2
+        assert [
+            (pair["tag"], pair["other_tag"]) for pair in response.json()["pairs"]
+        ] == [("tag_1", "tag_2")]
+
+    def test_get_projects_tag_cooccurrence_follows_project_deletion(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        first = test_app.get("/projects/analytics/tag-cooccurrence/")
+        test_app.delete("/projects/1/")
+        second = test_app.get("/projects/analytics/tag-cooccurrence/")
+
+        assert len(first.json()["pairs"]) == 1
+        assert second.json() == {"project_id": None, "note_count": 0, "pairs": []}
+
+    def test_get_projects_tag_cooccurrence_follows_project_trash_and_restore(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+    ):
+        test_app.delete("/projects/1/")
+        test_app.post("/projects/", data=json.dumps({"name": "project_3"}))
+        test_app.post("/projects/3/notes/", data=json.dumps({"note_name": "note_3"}))
+        first = test_app.get("/projects/analytics/tag-cooccurrence/")
+        # the same number of live projects, and project_3 still has the
+        # greatest version of the notes changes
+        test_app.delete("/projects/2/")
+        test_app.post("/projects/1/restore/")
+        second = test_app.get("/projects/analytics/tag-cooccurrence/")
+
+        assert first.json() == {"project_id": None, "note_count": 1, "pairs": []}
+        assert second.json()["note_count"] == 3
+        assert len(second.json()["pairs"]) == 1
+
+
+class TestGetProjectAnalytics:
+    def test_get_project_analytics_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/analytics/")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "project_id": 1,
+            "note_count": 2,
+            "publication_years": [
+                {"year": 1889, "note_count": 1},
+                {"year": 1989, "note_count": 1},
+            ],
+            "top_authors": [
+                {"author": "test_author", "note_count": 1},
+                {"author": "test_author_2", "note_count": 1},
+            ],
+            "tags": [
+                {"tag": "tag_1", "note_count": 1},
+                {"tag": "tag_2", "note_count": 1},
+            ],
+        }
+
+    def test_get_project_analytics_groups_years_and_ranks_authors(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        notes = [
+            {
+                "note_name": "note_3",
+                "note_author": "test_author_2",
+                "note_publication_year": 1980,
+            },
+            {"note_name": "note_4"},
+        ]
+        for note in notes:
+            test_app.post("/projects/1/notes/", data=json.dumps(note))
+
+        response = test_app.get("/projects/1/analytics/?year_bucket=100&top_authors=1")
+
+        assert response.status_code == 200
+        assert response.json()["note_count"] == 4
+        assert response.json()["publication_years"] == [
+            {"year": 1800, "note_count": 1},
+            {"year": 1900, "note_count": 2},
+            {"year": None, "note_count": 1},
+        ]
+        assert response.json()["top_authors"] == [
+            {"author": "test_author_2", "note_count": 2}
+        ]
+
+    def test_get_project_analytics_follows_note_changes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        first = test_app.get("/projects/1/analytics/")
+        test_app.patch(
+            "/projects/1/notes/2/", data=json.dumps({"author": "test_author"})
+        )
+        second = test_app.get("/projects/1/analytics/")
+
+        assert len(first.json()["top_authors"]) == 2
+        assert second.json()["top_authors"] == [
+            {"author": "test_author", "note_count": 2}
+        ]
+
+    def test_get_project_analytics_project_without_notes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/2/analytics/")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "project_id": 2,
+            "note_count": 0,
+            "publication_years": [],
+            "top_authors": [],
+            "tags": [],
+        }
+
+    def test_get_project_analytics_incorrect_project_id(self, test_app):
+        response = test_app.get("/projects/999/analytics/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
+
+class TestGetProjectsAnalytics:
+    def test_get_projects_analytics_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        single = test_app.get("/projects/1/analytics/")
+        response = test_app.get("/projects/analytics/")
+
+        assert response.status_code == 200
+        assert [project["project_id"] for project in response.json()] == [1, 2]
+        assert response.json()[0] == single.json()
+        assert response.json()[1]["note_count"] == 0
+
+    def test_get_projects_analytics_follows_project_changes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.get("/projects/analytics/")
+        test_app.post("/projects/2/notes/", data=json.dumps({"note_name": "note_3"}))
+        response = test_app.get("/projects/analytics/")
+
+        assert response.json()[0]["note_count"] == 2
+        assert response.json()[1]["note_count"] == 1
@@ -0,0 +1,90 @@
+from sqlalchemy import text
+
+from app.index_advisor import (
+    StatementStats,
+    format_report,
+    get_index_report,
+    get_missing_indexes,
+    get_schema_tables,
+    get_unindexed_foreign_keys,
+    get_unused_indexes,
+)
+
+
+async def test_get_unused_indexes_reports_never_scanned_indexes(get_session):
+    await get_session.execute(text("CREATE INDEX ix_notes_author ON notes (author)"))
+
+    unused_indexes = await get_unused_indexes(["notes"], get_session)
+    await get_session.rollback()
+
+    unused = {index.index: index for index in unused_indexes}
+    assert unused["ix_notes_author"].table == "notes"
+    assert unused["ix_notes_author"].definition.endswith("btree (author)")
+    # the unique constraint enforces the names, scanned or not
+    assert "uq_notes_project_id" not in unused
+
+
+async def test_every_foreign_key_is_indexed(get_session):
+    assert await get_unindexed_foreign_keys(get_schema_tables(), get_session) == []
+
+
+async def test_get_unindexed_foreign_keys_ignores_partial_indexes(get_session):
+    await get_session.execute(text("DROP INDEX ix_jobs_project_id"))
+    await get_session.execute(
+        text(
+            "CREATE INDEX ix_jobs_project_id ON jobs (project_id)"
+            " WHERE project_id IS NOT NULL"
+        )
+    )
+
+    foreign_keys = await get_unindexed_foreign_keys(["jobs"], get_session)
+    await get_session.rollback()
+
+    assert [(fk.table, fk.columns) for fk in foreign_keys] == [("jobs", ["project_id"])]
+
+
+async def test_get_missing_indexes_reports_filtered_sequential_scans(get_session):
+    statements = [
+        StatementStats(
+            query="SELECT id FROM notes WHERE author = $1 AND publication_year > $2",
+            calls=10,
+            mean_time_ms=12.5,
+        ),
+        StatementStats(query="SELECT count(*) FROM notes", calls=1, mean_time_ms=1),
+        StatementStats(query="SELECT * FROM not_a_table", calls=1, mean_time_ms=1),
+    ]
+
+    missing_indexes = await get_missing_indexes(
+        statements, {"notes": 0}, min_rows=0, db_session=get_session
+    )
+    await get_session.rollback()
+
+    assert len(missing_indexes) == 1
+    assert missing_indexes[0].table == "notes"
+    assert missing_indexes[0].columns == ["author", "publication_year"]
+    assert missing_indexes[0].statement == statements[0]
+
+
+async def test_get_missing_indexes_ignores_small_tables(get_session):
+    statements = [
+        StatementStats(
+            query="SELECT id FROM notes WHERE author = $1", calls=1, mean_time_ms=1
+        )
+    ]
+
+    missing_indexes = await get_missing_indexes(
+        statements, {"notes": 100}, min_rows=10_000, db_session=get_session
+    )
+    await get_session.rollback()
+
+    assert missing_indexes == []
+
+
+async def test_format_report(get_session):
+    report = await get_index_report(min_rows=0, statements=10, db_session=get_session)
+
+    formatted = format_report(report)
+
+    assert "Unused indexes:" in formatted
+    assert "Foreign keys without an index:\n  none" in formatted
+    assert "Statements reading large tables sequentially:" in formatted
@@ -0,0 +1,376 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, update
+
+from app.database import DatabaseSessionManager
+from app.models import Job, Note
+from app.worker import JOB_HANDLERS, Worker
+from tests.conftest import get_settings_override
+
+
+class TestExportJob:
+    def test_export_job_exports_project_notes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        test_request_payload = {"kind": "export", "project_id": 1}
+
+        response = test_app.post("/jobs/", data=json.dumps(test_request_payload))
+        job_id = response.json()["id"]
+        result_before_run = test_app.get(f"/jobs/{job_id}/result/")
+        jobs_run = run_job_worker()
+        job = test_app.get(f"/jobs/{job_id}/")
+        result = test_app.get(f"/jobs/{job_id}/result/")
+
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+        assert result_before_run.status_code == 409
+        assert jobs_run == 1
+        assert job.json()["status"] == "succeeded"
+        assert job.json()["progress"] == 2
+        assert job.json()["total"] == 2
+        assert job.json()["attempts"] == 1
+        assert result.status_code == 200
+        assert result.json()["project_id"] == 1
+        assert [note["note_name"] for note in result.json()["notes"]] == [
+            "note_1",
+            "note_2",
+        ]
+        assert sorted(result.json()["notes"][0]["note_tags"]) == ["tag_1", "tag_2"]
+        assert result.json()["notes"][1]["note_tags"] == []
+
+    def test_export_job_exports_in_batches(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        test_request_payload = {"kind": "export", "project_id": 1}
+        settings = get_settings_override()
+        settings.job_batch_size = 1
+
+        response = test_app.post("/jobs/", data=json.dumps(test_request_payload))
+        run_job_worker(settings)
+        result = test_app.get(f"/jobs/{response.json()['id']}/result/")
+
+        assert len(result.json()["notes"]) == 2
+
+    def test_submit_job_cannot_submit_for_inexistent_project(self, test_app):
+        test_request_payload = {"kind": "export", "project_id": 999}
+
+        response = test_app.post("/jobs/", data=json.dumps(test_request_payload))
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
+
+class TestImportJob:
+    def test_import_job_imports_notes_and_skips_existing_names(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        test_request_payload = {
+            "kind": "import",
+            "project_id": 1,
+            "notes": [
+                {"note_name": "note_1", "note_tags": ["tag_3"]},
+                {"note_name": "note_3", "note_tags": ["tag_1", "tag_3"]},
+                {"note_name": "note_4", "note_publication_year": 2001},
+            ],
+        }
+        settings = get_settings_override()
+        settings.job_batch_size = 2
+
+        response = test_app.post("/jobs/", data=json.dumps(test_request_payload))
+        run_job_worker(settings)
+        job = test_app.get(f"/jobs/{response.json()['id']}/")
+        result = test_app.get(f"/jobs/{response.json()['id']}/result/")
+        notes = test_app.get("/projects/1/notes/")
+
+        assert job.json()["status"] == "succeeded"
+        assert job.json()["progress"] == 3
+        assert result.json() == {"imported": 2, "skipped": 1}
+        notes_tags = {note["note_name"]: note["note_tags"] for note in notes.json()}
+        assert sorted(notes_tags["note_1"]) == ["tag_1", "tag_2"]
+        assert sorted(notes_tags["note_3"]) == ["tag_1", "tag_3"]
+        assert notes_tags["note_4"] == []
+
+    def test_import_job_failure_is_reported(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        # publication years are 4-byte integers in the database
+        test_request_payload = {
+            "kind": "import",
+            "project_id": 1,
+            "notes": [{"note_name": "note_3", "note_publication_year": 2**40}],
+        }
+
+        response = test_app.post("/jobs/", data=json.dumps(test_request_payload))
+        run_job_worker()
+        job = test_app.get(f"/jobs/{response.json()['id']}/")
+        result = test_app.get(f"/jobs/{response.json()['id']}/result/")
+
+        assert job.json()["status"] == "failed"
+        assert "value out of int32 range" in job.json()["error"]
+        assert result.status_code == 409
+
+
+class TestBulkTagsJob:
+    def test_bulk_tags_job_updates_notes_tags(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        test_request_payload = {
+            "kind": "bulk_tags",
+            "project_id": 1,
+            "filter": {"publication_year_from": 1900},
+            "add_tags": ["tag_3"],
+            "remove_tags": ["tag_1"],
+        }
+
+        response = test_app.post("/jobs/", data=json.dumps(test_request_payload))
+        run_job_worker()
+        result = test_app.get(f"/jobs/{response.json()['id']}/result/")
+        note = test_app.get("/projects/1/notes/2/")
+
+        assert result.json() == {"added": 1, "removed": 0}
+        assert note.json()["note_tags"] == ["tag_3"]
+
+
+class TestWorker:
+    async def test_worker_runs_jobs_of_stale_workers_again(
+        self,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        get_session,
+    ):
+        stale = datetime.now(timezone.utc) - timedelta(minutes=10)
+        session = get_session
+        await session.execute(
+            insert(Job).values(
+                [
+                    {
+                        "id": 1,
+                        "kind": "export",
+                        "status": "running",
+                        "project_id": 1,
+                        "payload": {"kind": "export", "project_id": 1},
+                        "attempts": 1,
+                        "heartbeat_at": stale,
+                    },
+                    {
+                        "id": 2,
+                        "kind": "export",
+                        "status": "running",
+                        "project_id": 1,
+                        "payload": {"kind": "export", "project_id": 1},
+                        "attempts": 3,
+                        "heartbeat_at": stale,
+                    },
+                ]
+            )
+        )
+        await session.commit()
+
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+        worker = Worker(sessionmanager, get_settings_override())
+        jobs_run = 0
+        while await worker.run_once():
+            jobs_run += 1
+        await sessionmanager.close()
+
+        result = await session.execute(
+            select(Job.id, Job.status, Job.attempts)
+            .order_by(Job.id)
+            .execution_options(populate_existing=True)
+        )
+        assert jobs_run == 1
+        assert result.all() == [(1, "succeeded", 2), (2, "failed", 3)]
+
+    async def test_worker_leaves_jobs_claimed_again_alone(
+        self,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        get_session,
+        monkeypatch,
+    ):
+        async def claimed_again(ctx):
+            # as if the job went stale and another worker claimed it
+            async with ctx.sessionmanager.session() as db_session:
+                await db_session.execute(
+                    update(Job).where(Job.id == ctx.job.id).values(attempts=2)
+                )
+                await db_session.commit()
+            await ctx.progress(1, 1)
+            return {"done": True}
+
+        monkeypatch.setitem(JOB_HANDLERS, "export", claimed_again)
+        session = get_session
+        await session.execute(
+            insert(Job).values(
+                id=1,
+                kind="export",
+                status="queued",
+                project_id=1,
+                payload={"kind": "export", "project_id": 1},
+            )
+        )
+        await session.commit()
+
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+        job_run = await Worker(sessionmanager, get_settings_override()).run_once()
+        await sessionmanager.close()
+
+        result = await session.execute(
+            select(
+                Job.status, Job.attempts, Job.progress, Job.result
+            ).execution_options(populate_existing=True)
+        )
+        assert job_run is True
+        assert result.all() == [("running", 2, 0, None)]
+
+    async def test_heartbeat_stops_jobs_claimed_again(
+        self,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        get_session,
+        monkeypatch,
+    ):
+        async def claimed_again(ctx):
+            async with ctx.sessionmanager.session() as db_session:
+                await db_session.execute(
+                    update(Job).where(Job.id == ctx.job.id).values(attempts=2)
+                )
+                await db_session.commit()
+            await asyncio.sleep(10)
+            return {"done": True}
+
+        monkeypatch.setitem(JOB_HANDLERS, "export", claimed_again)
+        session = get_session
+        await session.execute(
+            insert(Job).values(
+                id=1,
+                kind="export",
+                status="queued",
+                project_id=1,
+                payload={"kind": "export", "project_id": 1},
+            )
+        )
+        await session.commit()
+        settings = get_settings_override()
+        settings.job_heartbeat_interval = 0.01
+
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+        job_run = await asyncio.wait_for(
+            Worker(sessionmanager, settings).run_once(), timeout=5
+        )
+        await sessionmanager.close()
+
+        result = await session.execute(
+            select(Job.status, Job.attempts, Job.result).execution_options(
+                populate_existing=True
+            )
+        )
+        assert job_run is True
+        assert result.all() == [("running", 2, None)]
+
+
+class TestPurgeTrashJob:
+    async def test_purge_trash_job_purges_expired_notes(
+        self,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        get_session,
+    ):
+        session = get_session
+        now = datetime.now(timezone.utc)
+        await session.execute(
+            update(Note).where(Note.id == 1).values(deleted_at=now - timedelta(days=40))
+        )
+        await session.execute(
+            update(Note).where(Note.id == 2).values(deleted_at=now - timedelta(days=1))
+        )
+        await session.commit()
+        settings = get_settings_override()
+        settings.bulk_delete_batch_size = 1
+
+        # the worker enqueues the purge itself, only once per interval
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+        worker = Worker(sessionmanager, settings)
+        jobs_run = 0
+        for _ in range(2):
+            await worker.schedule_trash_purge()
+            while await worker.run_once():
+                jobs_run += 1
+        await sessionmanager.close()
+
+        jobs = await session.execute(
+            select(Job.kind, Job.status, Job.result).execution_options(
+                populate_existing=True
+            )
+        )
+        notes = await session.scalars(
+            select(Note.id).execution_options(populate_existing=True)
+        )
+        assert jobs_run == 1
+        assert jobs.all() == [("purge_trash", "succeeded", {"deleted_notes": 1})]
+        assert notes.all() == [2]
+
+    async def test_maintenance_jobs_wait_while_database_is_busy(
+        self, delete_jobs_data, get_session
+    ):
+        session = get_session
+        await session.execute(
+            insert(Job).values(
+                kind="purge_trash", status="queued", payload={"kind": "purge_trash"}
+            )
+        )
+        await session.commit()
+        settings = get_settings_override()
+        # any number of active queries is too many
+        settings.purge_max_active_queries = -1
+
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+        job_run = await Worker(sessionmanager, settings).run_once()
+        await sessionmanager.close()
+
+        status = await session.scalar(
+            select(Job.status).execution_options(populate_existing=True)
+        )
+        assert job_run is False
+        assert status == "queued"
@@ -1,4 +1,17 @@
+import asyncio
 import json
+import os
+from unittest.mock import ANY
+
+from sqlalchemy import select, update
+
+from app.config import Settings, get_settings
+from app.crud.note_duplicates import get_notes_without_signature, save_note_signatures
+from app.crud.project_notes import bulk_update_notes_tags, update_note
+from app.database import DatabaseSessionManager
+from app.models import Note, NoteRevision, NoteSignature, ProjectStats
+from app.schemas.project_notes import ProjectNotesSelectionSchema
+from tests.conftest import get_settings_override
 
 
 class TestPostProjectNotes:
@@ -171,6 +184,7 @@ class TestGetAllProjectNotes:
                 "note_publication_year": 1889,
                 "note_comments": "test_comments",
                 "created_at": "2024-12-01T00:00:00Z",
+                "updated_at": ANY,
                 "note_tags": ["tag_1", "tag_2"],
             },
             {
@@ -182,6 +196,7 @@ class TestGetAllProjectNotes:
                 "note_publication_year": 1989,
                 "note_comments": "test_comments",
                 "created_at": "2024-12-01T00:00:00Z",
+                "updated_at": ANY,
                 "note_tags": [],
             },
         ]
@@ -223,6 +238,7 @@ class TestGetProjectNote:
             "note_publication_year": 1889,
             "note_comments": "test_comments",
             "created_at": "2024-12-01T00:00:00Z",
+            "updated_at": ANY,
             "note_tags": ["tag_1", "tag_2"],
         }
 
@@ -384,6 +400,62 @@ class TestPatchProjectNote:
             "try again."
         )
 
+    def test_patch_note_does_not_change_tags_if_name_already_exists(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"name": "note_2", "tags": ["tag_3"]}
+
+        response = test_app.patch(
+            "/projects/1/notes/1", data=json.dumps(test_request_payload)
+        )
+        note_response = test_app.get("/projects/1/notes/1")
+
+        assert response.status_code == 400
+        assert note_response.json()["note_name"] == "note_1"
+        assert sorted(note_response.json()["note_tags"]) == ["tag_1", "tag_2"]
+
+    def test_patch_note_not_patching_if_note_is_in_trash(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.delete("/projects/1/notes/1")
+
+        response = test_app.patch(
+            "/projects/1/notes/1", data=json.dumps({"tags": ["tag_3"]})
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Note id not found"
+
+    def test_patch_project_note_cannot_patch_note_of_trashed_project(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+    ):
+        test_app.delete("/projects/1/")
+
+        response = test_app.patch(
+            "/projects/1/notes/1/", data=json.dumps({"comments": "new_comments"})
+        )
+        test_app.post("/projects/1/restore/")
+        note = test_app.get("/projects/1/notes/1/")
+        revisions = test_app.get("/projects/1/notes/1/revisions/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+        assert note.json()["note_comments"] == "test_comments"
+        assert [revision["revision"] for revision in revisions.json()] == [1]
+
 
 class TestDeleteProjectNote:
     def test_delete_project_note_happy_path(
@@ -439,3 +511,781 @@ class TestDeleteProjectNote:
         assert (
             response.json()["detail"] == "The note id cannot be found for this project."
         )
+
+
+class TestProjectNotesTrash:
+    def test_deleted_note_is_listed_in_trash(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.delete("/projects/1/notes/1")
+        trash_response = test_app.get("/projects/1/notes/trash/")
+        notes_response = test_app.get("/projects/1/notes/")
+
+        assert trash_response.status_code == 200
+        assert len(trash_response.json()) == 1
+        assert trash_response.json()[0]["note_id"] == 1
+        assert trash_response.json()[0]["note_tags"] == ["tag_1", "tag_2"]
+        assert trash_response.json()[0]["deleted_at"]
+        assert [note["note_id"] for note in notes_response.json()] == [2]
+
+    def test_get_trash_does_not_get_if_project_does_not_exist(self, test_app):
+        response = test_app.get("/projects/999/notes/trash/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+    def test_restore_note_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.delete("/projects/1/notes/1")
+        restore_response = test_app.post("/projects/1/notes/1/restore/")
+        get_note_response = test_app.get("/projects/1/notes/1/")
+        trash_response = test_app.get("/projects/1/notes/trash/")
+
+        assert restore_response.status_code == 200
+        assert restore_response.json()["note_name"] == "note_1"
+        assert restore_response.json()["note_tags"] == ["tag_1", "tag_2"]
+        assert get_note_response.status_code == 200
+        assert trash_response.json() == []
+
+    def test_restore_note_does_not_restore_note_not_in_trash(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        live_note_response = test_app.post("/projects/1/notes/1/restore/")
+        test_app.delete("/projects/1/notes/1")
+        other_project_response = test_app.post("/projects/2/notes/1/restore/")
+
+        assert live_note_response.status_code == 404
+        assert live_note_response.json()["detail"] == (
+            "The note id cannot be found in the trash."
+        )
+        assert other_project_response.status_code == 404
+
+    def test_restore_note_does_not_restore_if_project_does_not_exist(self, test_app):
+        response = test_app.post("/projects/999/notes/1/restore/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+    def test_deleted_note_name_cannot_be_reused_while_in_trash(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.delete("/projects/1/notes/1")
+        response = test_app.post(
+            "/projects/1/notes/", data=json.dumps({"note_name": "note_1"})
+        )
+
+        assert response.status_code == 400
+
+
+class TestBulkUpdateProjectNotesTags:
+    def test_bulk_update_project_notes_tags_by_note_ids(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {
+            "note_ids": [1, 2],
+            "add_tags": ["tag_1", "new_tag"],
+            "remove_tags": ["tag_2"],
+        }
+
+        response = test_app.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+        note_1 = test_app.get("/projects/1/notes/1/")
+        note_2 = test_app.get("/projects/1/notes/2/")
+
+        # note_1 only gets 'new_tag' and loses 'tag_2'; note_2 gets both tags
+        assert response.status_code == 200
+        assert response.json() == {"added": 3, "removed": 1}
+        assert sorted(note_1.json()["note_tags"]) == ["new_tag", "tag_1"]
+        assert sorted(note_2.json()["note_tags"]) == ["new_tag", "tag_1"]
+
+    def test_bulk_update_project_notes_tags_by_filter(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {
+            "filter": {"publication_year_from": 1900},
+            "add_tags": ["tag_3"],
+        }
+
+        response = test_app.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+        note_1 = test_app.get("/projects/1/notes/1/")
+        note_2 = test_app.get("/projects/1/notes/2/")
+
+        assert response.status_code == 200
+        assert response.json() == {"added": 1, "removed": 0}
+        assert "tag_3" not in note_1.json()["note_tags"]
+        assert note_2.json()["note_tags"] == ["tag_3"]
+
+    def test_bulk_update_project_notes_tags_ignores_notes_of_other_projects(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"note_ids": [1, 2], "remove_tags": ["tag_1"]}
+
+        response = test_app.patch(
+            "/projects/2/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+        note_1 = test_app.get("/projects/1/notes/1/")
+
+        assert response.status_code == 200
+        assert response.json() == {"added": 0, "removed": 0}
+        assert "tag_1" in note_1.json()["note_tags"]
+
+    def test_bulk_update_project_notes_tags_cannot_update_for_inexistent_project(
+        self, test_app
+    ):
+        test_request_payload = {"note_ids": [1], "add_tags": ["tag_1"]}
+
+        response = test_app.patch(
+            "/projects/999/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+
+class TestProjectNoteRevisions:
+    def test_note_never_changed_is_its_only_revision(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        revisions = test_app.get("/projects/1/notes/1/revisions/")
+        revision_1 = test_app.get("/projects/1/notes/1/revisions/1/")
+        revision_2 = test_app.get("/projects/1/notes/1/revisions/2/")
+
+        assert revisions.status_code == 200
+        assert [revision["revision"] for revision in revisions.json()] == [1]
+        assert revisions.json()[0]["changed_fields"] == []
+        assert revision_1.status_code == 200
+        assert revision_1.json()["note_name"] == "note_1"
+        assert revision_1.json()["note_tags"] == ["tag_1", "tag_2"]
+        assert revision_2.status_code == 404
+        assert (
+            revision_2.json()["detail"] == "The revision cannot be found for this note."
+        )
+
+    def test_note_changes_are_listed_as_revisions(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.patch("/projects/1/notes/1/", data=json.dumps({"name": "note_1b"}))
+        test_app.patch(
+            "/projects/1/notes/1/",
+            data=json.dumps({"publication_year": 1890, "tags": ["tag_3"]}),
+        )
+        # an update not changing anything is not a revision
+        test_app.patch("/projects/1/notes/1/", data=json.dumps({"name": "note_1b"}))
+
+        response = test_app.get("/projects/1/notes/1/revisions/")
+
+        assert response.status_code == 200
+        assert [
+            (revision["revision"], revision["changed_fields"])
+            for revision in response.json()
+        ] == [(1, []), (2, ["name"]), (3, ["publication_year", "tags"])]
+
+    def test_get_note_revision_rebuilds_the_note_as_it_was(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.app.dependency_overrides[get_settings] = lambda: Settings(
+            note_revision_snapshot_interval=2
+        )
+        try:
+            for year in range(1890, 1895):
+                test_app.patch(
+                    "/projects/1/notes/1/",
+                    data=json.dumps({"publication_year": year}),
+                )
+        finally:
+            test_app.app.dependency_overrides[get_settings] = get_settings_override
+
+        revisions = [
+            test_app.get(f"/projects/1/notes/1/revisions/{revision}/").json()
+            for revision in range(1, 7)
+        ]
+
+        assert [revision["note_publication_year"] for revision in revisions] == [
+            1889,
+            1890,
+            1891,
+            1892,
+            1893,
+            1894,
+        ]
+        assert all(revision["note_name"] == "note_1" for revision in revisions)
+        assert all(
+            revision["note_tags"] == ["tag_1", "tag_2"] for revision in revisions
+        )
+
+    def test_get_note_revisions_cannot_get_for_note_of_other_project(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        revisions = test_app.get("/projects/2/notes/1/revisions/")
+        revision = test_app.get("/projects/2/notes/1/revisions/1/")
+
+        assert revisions.status_code == 404
+        assert revision.status_code == 404
+        assert revisions.json()["detail"] == (
+            "The note id cannot be found for this project."
+        )
+
+    def test_bulk_update_tags_adds_revisions_of_changed_notes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"note_ids": [1, 2], "add_tags": ["tag_1"]}
+
+        test_app.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+        note_1_revisions = test_app.get("/projects/1/notes/1/revisions/")
+        note_2_revisions = test_app.get("/projects/1/notes/2/revisions/")
+        note_2_revision_1 = test_app.get("/projects/1/notes/2/revisions/1/")
+        note_2_revision_2 = test_app.get("/projects/1/notes/2/revisions/2/")
+
+        # note_1 already has 'tag_1'
+        assert [revision["revision"] for revision in note_1_revisions.json()] == [1]
+        assert [
+            (revision["revision"], revision["changed_fields"])
+            for revision in note_2_revisions.json()
+        ] == [(1, []), (2, ["tags"])]
+        assert note_2_revision_1.json()["note_tags"] == []
+        assert note_2_revision_2.json()["note_tags"] == ["tag_1"]
+
+    async def test_long_comments_store_only_the_edited_span(
+        self,
+        get_session,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        comments = "a" * 300
+        for new_comments in (comments, comments[:100] + "b" + comments[100:]):
+            await update_note(
+                note_id=1,
+                project_id=1,
+                payload={"comments": new_comments},
+                tags=None,
+                snapshot_interval=10,
+                db_session=get_session,
+            )
+
+        query = (
+            select(NoteRevision.data)
+            .where(NoteRevision.note_id == 1)
+            .order_by(NoteRevision.revision)
+        )
+        revisions = (await get_session.scalars(query)).all()
+
+        assert revisions[1] == {"comments": comments}
+        assert revisions[2] == {"comments": {"start": 100, "end": 100, "text": "b"}}
+
+    async def test_concurrent_changes_add_one_revision_each(
+        self,
+        get_session,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+
+        async def update(publication_year):
+            async with sessionmanager.session() as session:
+                await update_note(
+                    note_id=1,
+                    project_id=1,
+                    payload={"publication_year": publication_year},
+                    tags=None,
+                    snapshot_interval=10,
+                    db_session=session,
+                )
+
+        async def update_tags():
+            async with sessionmanager.session() as session:
+                await bulk_update_notes_tags(
+                    project_id=1,
+                    selection=ProjectNotesSelectionSchema(note_ids=[1, 2]),
+                    add_tags=["tag_3"],
+                    remove_tags=[],
+                    snapshot_interval=10,
+                    db_session=session,
+                )
+
+        try:
+            await asyncio.gather(
+                *(update(2000 + i) for i in range(8)), update_tags(), update_tags()
+            )
+        finally:
+            await sessionmanager.close()
+
+        query = (
+            select(NoteRevision.revision)
+            .where(NoteRevision.note_id == 1)
+            .order_by(NoteRevision.revision)
+        )
+        revisions = (await get_session.scalars(query)).all()
+
+        # the first revision is the note as it was, the second bulk update
+        # changes nothing
+        assert revisions == list(range(1, 11))
+
+
+def add_reading_list(test_app):
+    notes = [
+        ("Deep Learning: Adaptive Computation and Machine Learning", "Goodfellow, I."),
+        ("Deep learning.", "Goodfellow I"),
+        ("The Structure of Scientific Revolutions", "Kuhn, T."),
+    ]
+    for name, author in notes:
+        payload = {"note_name": name, "note_author": author}
+        response = test_app.post("/projects/2/notes/", data=json.dumps(payload))
+        assert response.status_code == 200
+
+    notes = test_app.get("/projects/2/notes/").json()
+    return [note["note_id"] for note in notes]
+
+
+class TestProjectNoteDuplicates:
+    def test_get_duplicates_finds_near_duplicate_notes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        deep_learning, deep_learning_2, _ = add_reading_list(test_app)
+
+        response = test_app.get("/projects/2/notes/duplicates/")
+
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+        assert response.json()[0]["note_id"] == deep_learning
+        assert response.json()[0]["duplicate_note_id"] == deep_learning_2
+        assert response.json()[0]["similarity"] > 0.8
+
+    def test_get_duplicates_ignores_deleted_notes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        _, deep_learning_2, _ = add_reading_list(test_app)
+        test_app.delete(f"/projects/2/notes/{deep_learning_2}/")
+
+        response = test_app.get("/projects/2/notes/duplicates/")
+
+        assert response.status_code == 200
+        assert response.json() == []
+
+    def test_check_duplicates_finds_likely_duplicates_of_a_new_note(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        deep_learning, deep_learning_2, _ = add_reading_list(test_app)
+        payload = {"note_name": "DEEP LEARNING", "note_author": "I. Goodfellow"}
+
+        response = test_app.post(
+            "/projects/2/notes/duplicates/check/", data=json.dumps(payload)
+        )
+
+        assert response.status_code == 200
+        assert {duplicate["note_id"] for duplicate in response.json()} == {
+            deep_learning,
+            deep_learning_2,
+        }
+
+    def test_post_note_checking_duplicates_does_not_add_likely_duplicates(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        add_reading_list(test_app)
+        duplicate = {"note_name": "Deep Learning", "note_author": "Goodfellow, I."}
+        other = {"note_name": "Thinking, Fast and Slow", "note_author": "Kahneman"}
+
+        duplicate_response = test_app.post(
+            "/projects/2/notes/?check_duplicates=true", data=json.dumps(duplicate)
+        )
+        other_response = test_app.post(
+            "/projects/2/notes/?check_duplicates=true", data=json.dumps(other)
+        )
+
+        assert duplicate_response.status_code == 400
+        assert (
+            "is likely a duplicate of the notes"
+            in (duplicate_response.json()["detail"])
+        )
+        assert other_response.status_code == 200
+
+    async def test_notes_without_signature_are_backfilled(
+        self,
+        get_session,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        notes = await get_notes_without_signature(batch_size=10, db_session=get_session)
+        await save_note_signatures(notes=notes, db_session=get_session)
+        await get_session.commit()
+
+        signatures = await get_session.scalars(
+            select(NoteSignature.note_id).order_by(NoteSignature.note_id)
+        )
+        assert [note.id for note in notes] == [1, 2]
+        assert signatures.all() == [1, 2]
+
+
+class TestProjectNoteCitations:
+    def test_get_note_citation_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/notes/1/citation/?style=apa")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "note_id": 1,
+            "style": "apa",
+            "citation": "test_author. (1889). note_1. test_publication_details.",
+        }
+
+    def test_get_note_citation_follows_note_updates(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.get("/projects/1/notes/1/citation/?style=mla")
+        test_app.patch("/projects/1/notes/1/", data=json.dumps({"name": "note_1b"}))
+
+        response = test_app.get("/projects/1/notes/1/citation/?style=mla")
+
+        assert response.json()["citation"] == (
+            "test_author. note_1b. test_publication_details, 1889."
+        )
+
+    def test_get_note_citation_cannot_get_for_trashed_project(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+    ):
+        test_app.delete("/projects/1/")
+
+        response = test_app.get("/projects/1/notes/1/citation/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+    def test_get_note_citation_cannot_get_for_note_of_other_project(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/2/notes/1/citation/")
+
+        assert response.status_code == 404
+        assert (
+            response.json()["detail"] == "The note id cannot be found for this project."
+        )
+
+    def test_get_project_notes_citations_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/notes/citations/?style=bibtex")
+
+        assert response.status_code == 200
+        assert [citation["note_id"] for citation in response.json()] == [1, 2]
+        assert response.json()[1]["citation"].startswith("@misc{note2,\n")
+
+    def test_get_project_notes_citations_cannot_get_if_project_does_not_exist(
+        self, test_app
+    ):
+        response = test_app.get("/projects/999/notes/citations/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+
+class TestBulkDeleteProjectNotes:
+    def test_bulk_delete_project_notes_by_note_ids(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"note_ids": [1, 2]}
+
+        response = test_app.post(
+            "/projects/1/notes/bulk/delete/", data=json.dumps(test_request_payload)
+        )
+        remaining_notes = test_app.get("/projects/1/notes/")
+
+        assert response.status_code == 200
+        assert response.json() == {"deleted_notes": 2, "deleted_note_tags": 2}
+        assert remaining_notes.json() == []
+
+    def test_bulk_delete_project_notes_by_filter(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"filter": {"tag": "tag_1"}}
+
+        response = test_app.post(
+            "/projects/1/notes/bulk/delete/", data=json.dumps(test_request_payload)
+        )
+        remaining_notes = test_app.get("/projects/1/notes/")
+
+        assert response.status_code == 200
+        assert response.json() == {"deleted_notes": 1, "deleted_note_tags": 2}
+        assert [note["note_id"] for note in remaining_notes.json()] == [2]
+
+    def test_bulk_delete_project_notes_deletes_in_batches(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"filter": {"publication_year_to": 2000}}
+        test_app.app.dependency_overrides[get_settings] = lambda: Settings(
+            bulk_delete_batch_size=1
+        )
+
+        try:
+            response = test_app.post(
+                "/projects/1/notes/bulk/delete/",
+                data=json.dumps(test_request_payload),
+            )
+        finally:
+            test_app.app.dependency_overrides[get_settings] = get_settings_override
+
+        assert response.status_code == 200
+        assert response.json() == {"deleted_notes": 2, "deleted_note_tags": 2}
+
+    def test_bulk_delete_project_notes_cannot_delete_for_inexistent_project(
+        self, test_app
+    ):
+        test_request_payload = {"note_ids": [1]}
+
+        response = test_app.post(
+            "/projects/999/notes/bulk/delete/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+
+class TestProjectNotesUpdatedAt:
+    def test_notes_are_created_at_insertion_time(
+        self, test_app, add_project_data, delete_project_table_data
+    ):
+        first = test_app.post("/projects/1/notes/", data=json.dumps({"note_name": "a"}))
+        second = test_app.post(
+            "/projects/1/notes/", data=json.dumps({"note_name": "b"})
+        )
+
+        assert first.json()["created_at"] < second.json()["created_at"]
+        # created_at is the start of the transaction, updated_at the time the
+        # row was written
+        assert first.json()["created_at"] <= first.json()["updated_at"]
+
+    def test_note_changes_update_updated_at(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        def updated_at():
+            return test_app.get("/projects/1/notes/1/").json()["updated_at"]
+
+        initial = updated_at()
+        patched = test_app.patch(
+            "/projects/1/notes/1/", data=json.dumps({"comments": "new_comments"})
+        ).json()["updated_at"]
+        test_app.patch(
+            "/projects/1/notes/bulk/tags/",
+            data=json.dumps({"note_ids": [1], "add_tags": ["tag_3"]}),
+        )
+        tagged = updated_at()
+        test_app.post(
+            "/tags/rename/", data=json.dumps({"name": "tag_3", "new_name": "tag_4"})
+        )
+        renamed = updated_at()
+
+        assert initial < patched < tagged < renamed
+        # the other note has none of these tags
+        assert test_app.get("/projects/1/notes/2/").json()["updated_at"] < patched
+
+    async def test_updated_at_never_goes_back(
+        self,
+        get_session,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        sessionmanager = DatabaseSessionManager(os.environ["DATABASE_TEST_URL"])
+        updated_at = select(Note.updated_at).where(Note.id == 1)
+        stats_updated_at = select(ProjectStats.updated_at).where(
+            ProjectStats.project_id == 1
+        )
+        try:
+            async with (
+                sessionmanager.session() as long_session,
+                sessionmanager.session() as short_session,
+            ):
+                # the long transaction starts first and writes last
+                await long_session.execute(select(1))
+                await short_session.execute(
+                    update(Note).where(Note.id == 1).values(comments="short")
+                )
+                await short_session.commit()
+                read_updated_at = await get_session.scalar(updated_at)
+                read_stats_updated_at = await get_session.scalar(stats_updated_at)
+                await get_session.commit()
+
+                await long_session.execute(
+                    update(Note).where(Note.id == 1).values(comments="long")
+                )
+                await long_session.commit()
+        finally:
+            await sessionmanager.close()
+
+        assert await get_session.scalar(updated_at) > read_updated_at
+        assert await get_session.scalar(stats_updated_at) > read_stats_updated_at
+
+    def test_get_project_note_last_modified(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/notes/1/")
+        last_modified = response.headers["last-modified"]
+
+        not_modified = test_app.get(
+            "/projects/1/notes/1/", headers={"If-Modified-Since": last_modified}
+        )
+        modified = test_app.get(
+            "/projects/1/notes/1/",
+            headers={"If-Modified-Since": "Sun, 01 Dec 2024 00:00:00 GMT"},
+        )
+
+        assert last_modified.endswith(" GMT")
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["last-modified"] == last_modified
+        assert modified.status_code == 200
+        assert modified.json()["note_id"] == 1
+
+    def test_get_all_project_notes_last_modified(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/notes/")
+        not_modified = test_app.get(
+            "/projects/1/notes/",
+            headers={"If-Modified-Since": response.headers["last-modified"]},
+        )
+        modified = test_app.get(
+            "/projects/1/notes/",
+            headers={"If-Modified-Since": "Sun, 01 Dec 2024 00:00:00 GMT"},
+        )
+
+        assert not_modified.status_code == 304
+        assert modified.status_code == 200
+        assert len(modified.json()) == 2
+
+    def test_get_all_project_notes_updated_since(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        patched = test_app.patch(
+            "/projects/1/notes/2/", data=json.dumps({"comments": "new_comments"})
+        ).json()
+        note_1 = test_app.get("/projects/1/notes/1/").json()
+
+        response = test_app.get(
+            "/projects/1/notes/", params={"updated_since": note_1["updated_at"]}
+        )
+
+        assert response.status_code == 200
+        assert [note["note_id"] for note in response.json()] == [2]
+        assert response.json()[0]["updated_at"] == patched["updated_at"]
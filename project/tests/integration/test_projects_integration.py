@@ -1,5 +1,10 @@
 import json
 
+from sqlalchemy import delete, func, insert, select
+
+from app.models import NoteTag, Project, ProjectStats, ProjectTagCount
+from tests.conftest import get_settings_override
+
 
 class TestPostProject:
     def test_add_new_project_creates_project(self, test_app, delete_project_table_data):
@@ -58,6 +63,51 @@ class TestGetProject:
         assert response.json()["comment"] == "test_comment"
         assert response.json()["created_at"]
 
+    def test_get_project_last_modified(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/")
+        last_modified = response.headers["last-modified"]
+        not_modified = test_app.get(
+            "/projects/1/", headers={"If-Modified-Since": last_modified}
+        )
+        modified = test_app.get(
+            "/projects/1/",
+            headers={
+                "If-Modified-Since": "Sun, 01 Dec 2024 00:00:00 GMT",
+            },
+        )
+        ignored = test_app.get(
+            "/projects/1/",
+            headers={"If-Modified-Since": "not a date"},
+        )
+
+        assert response.json()["updated_at"]
+        assert not_modified.status_code == 304
+        assert modified.status_code == 200
+        assert ignored.status_code == 200
+
+    def test_get_project_last_modified_follows_its_notes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        project = test_app.get("/projects/1/").json()
+        note = test_app.patch(
+            "/projects/1/notes/1/", data=json.dumps({"comments": "new_comments"})
+        ).json()
+        updated_project = test_app.get("/projects/1/").json()
+
+        # the project row itself did not change, its stats did
+        assert updated_project["updated_at"] == project["updated_at"]
+        assert note["updated_at"] > project["updated_at"]
+
     def test_get_not_existent_project(self, test_app):
         test_project_id = 1
 
@@ -87,6 +137,50 @@ class TestPatchProject:
         assert response.json()["comment"] == payload_request_data["comment"]
         assert response.json()["created_at"]
 
+    def test_patch_project_cannot_update_name_to_an_already_existing_one(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.patch(
+            "/projects/1/", data=json.dumps({"name": "project_2"})
+        )
+        get_project_response = test_app.get("/projects/1/")
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            "Project name 'project_2' already exists. Please select a unique"
+            " project name and try again."
+        )
+        assert get_project_response.json()["name"] == "project_1"
+
+    def test_patch_project_keeps_its_own_name(
+        self, test_app, add_project_data, delete_project_table_data
+    ):
+        response = test_app.patch(
+            "/projects/1/", data=json.dumps({"name": "test_name", "comment": "new"})
+        )
+
+        assert response.status_code == 200
+        assert response.json()["comment"] == "new"
+
+    def test_patch_project_cannot_update_project_in_trash(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+    ):
+        test_app.delete("/projects/1/")
+
+        response = test_app.patch("/projects/1/", data=json.dumps({"comment": "new"}))
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
 
 class TestDeleteProject:
     def test_delete_project_deletes_project(
@@ -95,18 +189,235 @@ class TestDeleteProject:
         add_project_notes_data,
         delete_project_notes_data,
         delete_tags_data,
+        delete_jobs_data,
     ):
         delete_project_response = test_app.delete("/projects/1/")
         get_deleted_project_response = test_app.get("/projects/1/")
+        get_deleted_project_notes_response = test_app.get("/projects/1/notes/")
+        get_projects_response = test_app.get("/projects/")
+        delete_again_response = test_app.delete("/projects/1/")
 
-        assert delete_project_response.status_code == 200
+        assert delete_project_response.status_code == 202
         assert delete_project_response.json()["message"] == "Project deleted"
 
         assert get_deleted_project_response.status_code == 404
         assert get_deleted_project_response.json()["detail"] == "Project id not found."
+        assert get_deleted_project_notes_response.status_code == 404
+        assert [project["id"] for project in get_projects_response.json()] == [2]
+        assert delete_again_response.status_code == 404
+
+    def test_delete_project_purges_notes_in_background(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        override_settings,
+        run_job_worker,
+    ):
+        settings = get_settings_override()
+        settings.bulk_delete_batch_size = 1
+        settings.trash_retention_days = 0
+        override_settings(settings)
+
+        delete_project_response = test_app.delete("/projects/1/")
+        job_id = delete_project_response.json()["job_id"]
+        run_job_worker(settings)
+        job = test_app.get(f"/jobs/{job_id}/")
+        result = test_app.get(f"/jobs/{job_id}/result/")
+        create_project_response = test_app.post(
+            "/projects/", data=json.dumps({"name": "project_1"})
+        )
+
+        assert job.json()["status"] == "succeeded"
+        assert job.json()["progress"] == 2
+        assert job.json()["total"] == 2
+        assert result.json() == {"deleted_notes": 2}
+        # the name of the project is released once it is purged
+        assert create_project_response.status_code == 201
+
+    def test_delete_project_keeps_project_in_trash_until_retention_is_over(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        test_app.delete("/projects/1/")
+        jobs_run = run_job_worker()
+        trash_response = test_app.get("/projects/trash/")
+
+        assert jobs_run == 0
+        assert trash_response.status_code == 200
+        assert [project["id"] for project in trash_response.json()] == [1]
+        assert trash_response.json()[0]["deleted_at"]
+
+    def test_restore_project_restores_project_and_cancels_purge(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        run_job_worker,
+    ):
+        job_id = test_app.delete("/projects/1/").json()["job_id"]
+        restore_response = test_app.post("/projects/1/restore/")
+        get_project_response = test_app.get("/projects/1/")
+        get_notes_response = test_app.get("/projects/1/notes/")
+        trash_response = test_app.get("/projects/trash/")
+        job_response = test_app.get(f"/jobs/{job_id}/")
+
+        assert restore_response.status_code == 200
+        assert restore_response.json()["id"] == 1
+        assert get_project_response.status_code == 200
+        assert len(get_notes_response.json()) == 2
+        assert trash_response.json() == []
+        assert job_response.status_code == 404
+
+    def test_restore_project_does_not_restore_purged_project(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+        delete_jobs_data,
+        override_settings,
+        run_job_worker,
+    ):
+        settings = get_settings_override()
+        settings.trash_retention_days = 0
+        override_settings(settings)
+
+        test_app.delete("/projects/1/")
+        run_job_worker(settings)
+        response = test_app.post("/projects/1/restore/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == (
+            "Project id not found in the trash, or already being purged."
+        )
+
+    def test_restore_project_does_not_restore_live_project(
+        self, test_app, add_project_data, delete_project_table_data
+    ):
+        response = test_app.post("/projects/1/restore/")
+
+        assert response.status_code == 404
 
     def test_delete_project_does_not_delete_not_existent_project(self, test_app):
         response = test_app.delete("/projects/999/")
 
         assert response.status_code == 404
         assert response.json()["detail"] == "Project id not found."
+
+
+class TestProjectStats:
+    def test_project_stats_count_notes_and_tags(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        response = test_app.get("/projects/1/")
+
+        assert response.status_code == 200
+        assert response.json()["stats"] == {
+            "note_count": 2,
+            "tag_count": 2,
+            "latest_note_at": "2024-12-01T00:00:00Z",
+            "min_publication_year": 1889,
+            "max_publication_year": 1989,
+        }
+
+    def test_new_project_has_empty_stats(self, test_app, delete_project_table_data):
+        payload = {"name": "test_name", "comment": "test_comment"}
+
+        response = test_app.post("/projects", data=json.dumps(payload))
+
+        project_id = response.json()["id"]
+        response = test_app.get(f"/projects/{project_id}/")
+        assert response.json()["stats"] == {
+            "note_count": 0,
+            "tag_count": 0,
+            "latest_note_at": None,
+            "min_publication_year": None,
+            "max_publication_year": None,
+        }
+
+    def test_project_stats_follow_note_changes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        payload = {
+            "note_name": "note_3",
+            "note_author": "test_author",
+            "note_publication_details": "test_publication_details",
+            "note_publication_year": 2001,
+            "note_comments": "test_comments",
+            "note_tags": ["tag_2", "tag_3"],
+        }
+        test_app.post("/projects/1/notes/", data=json.dumps(payload))
+
+        stats = test_app.get("/projects/1/").json()["stats"]
+        assert stats["note_count"] == 3
+        assert stats["tag_count"] == 3
+        assert stats["max_publication_year"] == 2001
+
+        test_app.delete("/projects/1/notes/1/")
+
+        stats = test_app.get("/projects/1/").json()["stats"]
+        assert stats["note_count"] == 2
+        assert stats["tag_count"] == 2
+        assert stats["min_publication_year"] == 1989
+
+        test_app.post("/projects/1/notes/1/restore/")
+
+        stats = test_app.get("/projects/1/").json()["stats"]
+        assert stats["note_count"] == 3
+        assert stats["tag_count"] == 3
+        assert stats["min_publication_year"] == 1889
+
+    def test_project_stats_follow_tag_changes(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_app.patch("/projects/1/notes/1", data=json.dumps({"tags": ["tag_1"]}))
+
+        assert test_app.get("/projects/1/").json()["stats"]["tag_count"] == 1
+
+        test_app.patch(
+            "/projects/1/notes/2", data=json.dumps({"tags": ["tag_3", "tag_4"]})
+        )
+
+        assert test_app.get("/projects/1/").json()["stats"]["tag_count"] == 3
+
+    async def test_project_stats_are_deleted_with_the_project(
+        self,
+        get_session,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        await get_session.execute(insert(NoteTag).values(note_id=2, tag_id=1))
+        await get_session.commit()
+
+        # the notes and their tags are deleted by the ON DELETE CASCADE
+        # foreign keys, while the project is already gone
+        await get_session.execute(delete(Project).where(Project.id == 1))
+        await get_session.commit()
+
+        stats = select(func.count()).select_from(ProjectStats)
+        assert await get_session.scalar(stats.where(ProjectStats.project_id == 1)) == 0
+        tag_counts = select(func.count()).select_from(ProjectTagCount)
+        assert await get_session.scalar(tag_counts) == 0
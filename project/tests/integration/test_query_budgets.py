@@ -0,0 +1,273 @@
+"""
+Maximum number of SQL statements each endpoint is allowed to execute. A test
+failing here means that a change made an endpoint send more queries to the
+database, usually through an N+1 pattern or an eager loading fan-out.
+"""
+
+import json
+
+import pytest
+
+from app import analytics
+
+
+@pytest.fixture(scope="function")
+def project_notes_data(
+    add_project_notes_data,
+    delete_project_notes_data,
+    delete_tags_data,
+    delete_jobs_data,
+):
+    yield
+
+
+class TestProjectsQueryBudgets:
+    def test_get_projects(self, test_app, project_notes_data, assert_max_queries):
+        with assert_max_queries(1):
+            response = test_app.get("/projects/")
+
+        assert response.status_code == 200
+
+    def test_get_project(self, test_app, project_notes_data, assert_max_queries):
+        with assert_max_queries(1):
+            response = test_app.get("/projects/1/")
+
+        assert response.status_code == 200
+
+    def test_post_project(self, test_app, project_notes_data, assert_max_queries):
+        with assert_max_queries(2):
+            response = test_app.post("/projects/", data=json.dumps({"name": "p_3"}))
+
+        assert response.status_code == 201
+
+    def test_patch_project(self, test_app, project_notes_data, assert_max_queries):
+        with assert_max_queries(2):
+            response = test_app.patch(
+                "/projects/1/", data=json.dumps({"name": "updated_name"})
+            )
+
+        assert response.status_code == 200
+
+    def test_delete_project(self, test_app, project_notes_data, assert_max_queries):
+        with assert_max_queries(2):
+            response = test_app.delete("/projects/1/")
+
+        assert response.status_code == 202
+
+
+class TestProjectNotesQueryBudgets:
+    def test_get_all_project_notes(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(3):
+            response = test_app.get("/projects/1/notes/")
+
+        assert response.status_code == 200
+
+    def test_get_project_note(self, test_app, project_notes_data, assert_max_queries):
+        with assert_max_queries(3):
+            response = test_app.get("/projects/1/notes/1/")
+
+        assert response.status_code == 200
+
+    def test_post_project_note(self, test_app, project_notes_data, assert_max_queries):
+        payload = {"note_name": "note_3", "note_tags": ["tag_1", "new_tag"]}
+
+        with assert_max_queries(7):
+            response = test_app.post("/projects/1/notes/", data=json.dumps(payload))
+
+        assert response.status_code == 200
+
+    def test_patch_project_note(self, test_app, project_notes_data, assert_max_queries):
+        payload = {"name": "updated_name", "tags": ["tag_2", "new_tag"]}
+
+        with assert_max_queries(8):
+            response = test_app.patch("/projects/1/notes/1/", data=json.dumps(payload))
+
+        assert response.status_code == 200
+
+    def test_patch_project_note_without_tags(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        payload = {"name": "updated_name"}
+
+        with assert_max_queries(5):
+            response = test_app.patch("/projects/1/notes/1/", data=json.dumps(payload))
+
+        assert response.status_code == 200
+
+    def test_get_project_note_revisions(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(4):
+            response = test_app.get("/projects/1/notes/1/revisions/")
+
+        assert response.status_code == 200
+
+    def test_get_project_note_revision(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        payload = {"comments": "updated comments"}
+        test_app.patch("/projects/1/notes/1/", data=json.dumps(payload))
+
+        with assert_max_queries(4):
+            response = test_app.get("/projects/1/notes/1/revisions/1/")
+
+        assert response.status_code == 200
+
+    def test_get_project_notes_duplicates(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(2):
+            response = test_app.get("/projects/1/notes/duplicates/")
+
+        assert response.status_code == 200
+
+    def test_check_project_note_duplicates(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        payload = {"note_name": "note_1", "note_author": "test_author"}
+
+        with assert_max_queries(2):
+            response = test_app.post(
+                "/projects/1/notes/duplicates/check/", data=json.dumps(payload)
+            )
+
+        assert response.status_code == 200
+
+    def test_get_project_note_citation(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(1):
+            response = test_app.get("/projects/1/notes/1/citation/")
+
+        assert response.status_code == 200
+
+    def test_get_project_notes_citations(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(2):
+            response = test_app.get("/projects/1/notes/citations/")
+
+        assert response.status_code == 200
+
+    def test_delete_project_note(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(5):
+            response = test_app.delete("/projects/1/notes/1/")
+
+        assert response.status_code == 200
+
+    def test_bulk_update_project_notes_tags(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        payload = {
+            "note_ids": [1, 2],
+            "add_tags": ["new_tag"],
+            "remove_tags": ["tag_1"],
+        }
+
+        with assert_max_queries(7):
+            response = test_app.patch(
+                "/projects/1/notes/bulk/tags/", data=json.dumps(payload)
+            )
+
+        assert response.status_code == 200
+
+    def test_bulk_delete_project_notes(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        with assert_max_queries(2):
+            response = test_app.post(
+                "/projects/1/notes/bulk/delete/",
+                data=json.dumps({"note_ids": [1, 2]}),
+            )
+
+        assert response.status_code == 200
+
+
+class TestAnalyticsQueryBudgets:
+    def test_get_project_tag_cooccurrence(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        analytics.analytics_cache.clear()
+
+        with assert_max_queries(2):
+            response = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+        assert response.status_code == 200
+
+        # served from the cache, only the version is read
+        with assert_max_queries(1):
+            response = test_app.get("/projects/1/analytics/tag-cooccurrence/")
+        assert response.status_code == 200
+
+    def test_get_projects_tag_cooccurrence(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        analytics.analytics_cache.clear()
+
+        with assert_max_queries(2):
+            response = test_app.get("/projects/analytics/tag-cooccurrence/")
+        assert response.status_code == 200
+
+        with assert_max_queries(1):
+            response = test_app.get("/projects/analytics/tag-cooccurrence/")
+        assert response.status_code == 200
+
+    def test_get_project_analytics(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        analytics.analytics_cache.clear()
+
+        with assert_max_queries(2):
+            response = test_app.get("/projects/1/analytics/")
+        assert response.status_code == 200
+
+        with assert_max_queries(1):
+            response = test_app.get("/projects/1/analytics/")
+        assert response.status_code == 200
+
+    def test_get_projects_analytics(
+        self, test_app, project_notes_data, assert_max_queries
+    ):
+        analytics.analytics_cache.clear()
+
+        # however many projects there are
+        with assert_max_queries(2):
+            response = test_app.get("/projects/analytics/")
+        assert response.status_code == 200
+
+        with assert_max_queries(1):
+            response = test_app.get("/projects/analytics/")
+        assert response.status_code == 200
+
+
+class TestTagsQueryBudgets:
+    def test_rename_tag(self, test_app, project_notes_data, assert_max_queries):
+        payload = {"name": "tag_1", "new_name": "renamed_tag"}
+
+        with assert_max_queries(3):
+            response = test_app.post("/tags/rename/", data=json.dumps(payload))
+
+        assert response.status_code == 200
+
+    def test_merge_tags(self, test_app, project_notes_data, assert_max_queries):
+        payload = {"source": "tag_1", "target": "tag_2"}
+
+        with assert_max_queries(5):
+            response = test_app.post("/tags/merge/", data=json.dumps(payload))
+
+        assert response.status_code == 200
+
+
+def test_database_activity_is_sent_in_response_headers(
+    test_app, project_notes_data, assert_max_queries
+):
+    with assert_max_queries(4) as statements:
+        response = test_app.get("/projects/1/notes/")
+
+    assert response.headers["x-db-statements"] == str(len(statements))
+    assert int(response.headers["x-db-rows"]) > 0
+    assert float(response.headers["x-db-time-ms"]) > 0
+    assert "x-db-repeated-statements" not in response.headers
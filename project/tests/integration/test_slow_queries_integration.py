@@ -0,0 +1,108 @@
+import logging
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.crud.project import project_exists
+from app.slow_queries import RateLimiter, SlowQueryLogger
+
+
+async def test_slow_query_logger_logs_statement_and_plan(caplog):
+    engine = create_async_engine(os.environ.get("DATABASE_TEST_URL"))
+    slow_query_logger = SlowQueryLogger(engine=engine, threshold_ms=0, explain=True)
+
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        slow_query_logger.check(
+            statement="SELECT $1::INTEGER + 1",
+            parameters=(41,),
+            duration=0.5,
+            executemany=False,
+            route="/projects/",
+        )
+        await slow_query_logger.explain_task
+    await engine.dispose()
+
+    slow_statement_log, plan_log = caplog.messages
+    assert "Slow SQL statement (500.0 ms) on route /projects/" in slow_statement_log
+    assert "SELECT $1::INTEGER + 1; parameters: (41,)" in slow_statement_log
+    assert "Execution Time" in plan_log
+
+
+async def test_slow_query_logger_does_not_analyze_locking_statements(caplog):
+    engine = create_async_engine(os.environ.get("DATABASE_TEST_URL"))
+    slow_query_logger = SlowQueryLogger(engine=engine, threshold_ms=0, explain=True)
+
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        slow_query_logger.check(
+            statement="SELECT id FROM jobs FOR UPDATE SKIP LOCKED",
+            parameters=(),
+            duration=0.5,
+            executemany=False,
+            route=None,
+        )
+        await slow_query_logger.explain_task
+    await engine.dispose()
+
+    plan_log = caplog.messages[1]
+    assert "LockRows" in plan_log
+    assert "Execution Time" not in plan_log
+
+
+async def test_slow_query_logger_explain_times_out(caplog):
+    engine = create_async_engine(os.environ.get("DATABASE_TEST_URL"))
+    slow_query_logger = SlowQueryLogger(
+        engine=engine, threshold_ms=0, explain=True, explain_timeout_ms=10
+    )
+
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        slow_query_logger.check(
+            statement="SELECT pg_sleep(1)",
+            parameters=(),
+            duration=1.0,
+            executemany=False,
+            route=None,
+        )
+        await slow_query_logger.explain_task
+    await engine.dispose()
+
+    assert caplog.messages[1] == "Could not capture the plan of a slow SQL statement"
+    assert "statement timeout" in caplog.text
+
+
+async def test_slow_query_logger_ignores_fast_statements(caplog):
+    slow_query_logger = SlowQueryLogger(engine=None, threshold_ms=100)
+
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        slow_query_logger.check(
+            statement="SELECT 1",
+            parameters=(),
+            duration=0.05,
+            executemany=False,
+            route=None,
+        )
+
+    assert caplog.messages == []
+    assert slow_query_logger.explain_task is None
+
+
+async def test_slow_query_logger_finds_the_crud_function(caplog):
+    engine = create_async_engine(os.environ.get("DATABASE_TEST_URL"))
+    slow_query_logger = SlowQueryLogger(engine=engine, threshold_ms=0)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def check_statement(conn, cursor, statement, parameters, context, executemany):
+        slow_query_logger.check(statement, parameters, 1.0, executemany, None)
+
+    with caplog.at_level(logging.WARNING, logger="uvicorn"):
+        async with AsyncSession(engine) as session:
+            await project_exists(project_id=1, db_session=session)
+    await engine.dispose()
+
+    assert "from app.crud.project.project_exists" in caplog.messages[0]
+
+
+def test_rate_limiter_allows_at_most_max_per_minute_events():
+    rate_limiter = RateLimiter(max_per_minute=2)
+
+    assert [rate_limiter.allow() for _ in range(3)] == [True, True, False]
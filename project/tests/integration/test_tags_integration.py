@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Tag
+
+
+class TestRenameTag:
+    def test_rename_tag_happy_path(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"name": "tag_1", "new_name": "renamed_tag"}
+
+        response = test_app.post("/tags/rename/", data=json.dumps(test_request_payload))
+        note = test_app.get("/projects/1/notes/1/")
+
+        assert response.status_code == 200
+        assert response.json() == {"id": 1, "name": "renamed_tag"}
+        assert sorted(note.json()["note_tags"]) == ["renamed_tag", "tag_2"]
+
+    def test_rename_tag_cannot_rename_to_an_already_existing_tag(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"name": "tag_1", "new_name": "tag_2"}
+
+        response = test_app.post("/tags/rename/", data=json.dumps(test_request_payload))
+
+        assert response.status_code == 400
+
+    def test_rename_tag_cannot_rename_inexistent_tag(self, test_app):
+        test_request_payload = {"name": "tag_999", "new_name": "renamed_tag"}
+
+        response = test_app.post("/tags/rename/", data=json.dumps(test_request_payload))
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Tag 'tag_999' not found."
+
+
+class TestMergeTags:
+    def test_merge_tags_moves_notes_to_target_tag(
+        self,
+        test_app,
+        add_project_notes_data,
+        add_tags_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"source": "tag_1", "target": "tag_3"}
+
+        response = test_app.post("/tags/merge/", data=json.dumps(test_request_payload))
+        note = test_app.get("/projects/1/notes/1/")
+        merge_again = test_app.post(
+            "/tags/merge/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"id": 3, "name": "tag_3", "moved_notes": 1}
+        assert sorted(note.json()["note_tags"]) == ["tag_2", "tag_3"]
+        # the source tag is deleted after the merge
+        assert merge_again.status_code == 404
+
+    def test_merge_tags_handles_notes_already_having_target_tag(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {"source": "tag_1", "target": "tag_2"}
+
+        response = test_app.post("/tags/merge/", data=json.dumps(test_request_payload))
+        note = test_app.get("/projects/1/notes/1/")
+
+        assert response.status_code == 200
+        assert response.json() == {"id": 2, "name": "tag_2", "moved_notes": 0}
+        assert note.json()["note_tags"] == ["tag_2"]
+
+
+class TestTagNormalization:
+    def test_tag_variants_are_stored_as_one_tag(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        test_request_payload = {
+            "note_name": "note_3",
+            "note_tags": ["NLP", "nlp ", "ＮＬＰ", "Tag_1"],
+        }
+
+        response = test_app.post(
+            "/projects/1/notes/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 200
+        assert sorted(response.json()["note_tags"]) == ["nlp", "tag_1"]
+        assert test_app.get("/projects/1/").json()["stats"]["tag_count"] == 3
+
+    def test_tags_are_looked_up_by_their_normalized_name(
+        self,
+        test_app,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        patch_response = test_app.patch(
+            "/projects/1/notes/2", data=json.dumps({"tags": [" TAG_2"]})
+        )
+        rename_response = test_app.post(
+            "/tags/rename/", data=json.dumps({"name": "Tag_1", "new_name": "Tag_3"})
+        )
+
+        assert patch_response.json()["note_tags"] == ["tag_2"]
+        assert rename_response.status_code == 200
+        assert rename_response.json() == {"id": 1, "name": "tag_3"}
+
+    async def test_database_rejects_tag_variants(
+        self,
+        get_session,
+        add_project_notes_data,
+        delete_project_notes_data,
+        delete_tags_data,
+    ):
+        with pytest.raises(IntegrityError) as exc_info:
+            await get_session.execute(insert(Tag).values(name=" TAG_1"))
+        await get_session.rollback()
+
+        assert "ix_tags_normalized_name" in str(exc_info.value)
@@ -0,0 +1,154 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, select_encoding
+
+LARGE_PAYLOAD = [{"note_name": f"note_{i}", "note_tags": ["tag_1"]} for i in range(200)]
+
+
+def create_test_app(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **options)
+
+    @app.get("/large/")
+    async def large():
+        return LARGE_PAYLOAD
+
+    @app.post("/large/")
+    async def post_large():
+        return LARGE_PAYLOAD
+
+    @app.get("/small/")
+    async def small():
+        return {"note_name": "note_1"}
+
+    @app.get("/stream/")
+    async def stream():
+        async def chunks():
+            for i in range(100):
+                yield f"line {i}\n".encode()
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+@pytest.fixture(scope="function")
+def client():
+    with TestClient(create_test_app(minimum_size=500)) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("deflate", None),
+        ("", None),
+        ("gzip;q=0", None),
+        ("*", next(iter(compression.ENCODINGS))),
+        ("identity, *;q=0", None),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ],
+)
+def test_select_encoding(accept_encoding, expected):
+    assert select_encoding(accept_encoding) == expected
+
+
+def test_large_responses_are_compressed(client):
+    response = client.get("/large/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].endswith('-gzip"')
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == LARGE_PAYLOAD
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/small/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"note_name": "note_1"}
+
+
+def test_responses_are_not_compressed_without_accepted_encoding(client):
+    response = client.get("/large/", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert not response.headers["etag"].endswith('-gzip"')
+    assert response.json() == LARGE_PAYLOAD
+
+
+def test_matching_if_none_match_gets_not_modified(client):
+    first = client.get("/large/", headers={"Accept-Encoding": "gzip"})
+    second = client.get(
+        "/large/",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]},
+    )
+    third = client.get(
+        "/large/",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": '"other"'},
+    )
+
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == first.headers["etag"]
+    assert third.status_code == 200
+
+
+def test_compressed_bodies_are_reused(client, monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def counting_compress(body, encoding, level):
+        calls.append((encoding, level))
+        return compress(body, encoding, level)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+
+    for _ in range(3):
+        response = client.get("/large/", headers={"Accept-Encoding": "gzip"})
+        assert response.json() == LARGE_PAYLOAD
+
+    assert calls == [("gzip", 6)]
+
+
+def test_compression_level_per_route(monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def counting_compress(body, encoding, level):
+        calls.append(level)
+        return compress(body, encoding, level)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+    app = create_test_app(minimum_size=500, level=6, route_levels={"/large/": 1})
+
+    with TestClient(app) as client:
+        client.get("/large/", headers={"Accept-Encoding": "gzip"})
+
+    assert calls == [1]
+
+
+def test_other_methods_are_compressed_without_etag(client):
+    response = client.post("/large/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "etag" not in response.headers
+    assert response.json() == LARGE_PAYLOAD
+
+
+def test_streamed_responses_are_compressed_as_they_go(client):
+    response = client.get("/stream/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert "etag" not in response.headers
+    assert response.text == "".join(f"line {i}\n" for i in range(100))
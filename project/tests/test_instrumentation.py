@@ -0,0 +1,14 @@
+from app.instrumentation import RequestStats
+
+
+def test_request_stats_flags_repeated_statements():
+    stats = RequestStats()
+    for _ in range(5):
+        stats.statement_counts["SELECT tags.name FROM tags WHERE tags.id = $1"] += 1
+    stats.statement_counts["SELECT notes.id FROM notes"] += 1
+
+    assert stats.repeated_statements(threshold=5) == {
+        "SELECT tags.name FROM tags WHERE tags.id = $1": 5
+    }
+    assert (b"x-db-repeated-statements", b"5") in stats.headers(threshold=5)
+    assert stats.repeated_statements(threshold=6) == {}
@@ -0,0 +1,32 @@
+def test_metrics_exposes_request_metrics(test_app_without_db):
+    test_app_without_db.get("/ping")
+
+    response = test_app_without_db.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_requests_total{method="GET",route="/ping",status="200"}' in response.text
+    )
+    assert (
+        'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/ping"}'
+        in response.text
+    )
+    assert "http_requests_in_progress" in response.text
+
+
+def test_metrics_exposes_database_metrics(
+    test_app, add_project_data, delete_project_table_data
+):
+    test_app.get("/projects/1/")
+
+    response = test_app.get("/metrics")
+
+    assert response.status_code == 200
+    assert 'db_statements_total{route="/projects/{project_id}/"}' in response.text
+    assert (
+        'db_statements_duration_seconds_total{route="/projects/{project_id}/"}'
+        in response.text
+    )
+    assert "db_pool_checked_out_connections" in response.text
+    assert "db_pool_wait_seconds_count" in response.text
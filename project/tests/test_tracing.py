@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from app.tracing import (
+    BatchSpanProcessor,
+    FileSpanExporter,
+    current_span,
+    traced,
+    tracer,
+)
+
+
+class ListSpanExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+@pytest.fixture(scope="function")
+def span_exporter():
+    exporter = ListSpanExporter()
+    tracer.configure(BatchSpanProcessor(exporter, flush_interval=0.01))
+    yield exporter
+    tracer.configure(None)
+
+
+@traced
+async def traced_function():
+    return current_span.get()
+
+
+async def test_traced_function_runs_in_child_span(span_exporter):
+    root = tracer.start_span("root")
+    token = current_span.set(root)
+    try:
+        span = await traced_function()
+    finally:
+        current_span.reset(token)
+    tracer.end_span(root)
+    tracer.shutdown()
+
+    assert span.name == "tests.test_tracing.traced_function"
+    assert span.trace_id == root.trace_id
+    assert span.parent_span_id == root.span_id
+    assert span in span_exporter.spans
+    assert current_span.get() is None
+
+
+async def test_traced_function_does_not_create_spans_when_tracing_is_disabled():
+    assert await traced_function() is None
+
+
+def test_request_spans_cover_router_crud_and_sql(
+    test_app,
+    add_project_notes_data,
+    delete_project_notes_data,
+    delete_tags_data,
+    span_exporter,
+):
+    test_app.get("/projects/1/notes/1/")
+    tracer.shutdown()
+
+    spans = {span.span_id: span for span in span_exporter.spans}
+    request_span = next(span for span in spans.values() if span.parent_span_id is None)
+    crud_span = next(
+        span
+        for span in spans.values()
+        if span.name == "app.crud.project_notes.get_note_by_id"
+    )
+    sql_spans = [
+        span for span in spans.values() if span.parent_span_id == crud_span.span_id
+    ]
+
+    assert request_span.name == "GET /projects/{project_id}/notes/{note_id}/"
+    assert request_span.attributes["http.status_code"] == 200
+    assert crud_span.parent_span_id == request_span.span_id
+    assert {span.trace_id for span in spans.values()} == {request_span.trace_id}
+    assert sql_spans
+    assert all(span.name == "SQL SELECT" for span in sql_spans)
+    assert all("db.statement" in span.attributes for span in sql_spans)
+
+
+def test_file_span_exporter_writes_otlp_json_lines(tmp_path):
+    export_path = tmp_path / "traces.jsonl"
+    span = tracer.start_span("test_span", attributes={"rows": 3})
+    tracer.end_span(span)
+
+    FileSpanExporter(str(export_path)).export([span])
+
+    exported = json.loads(export_path.read_text())
+    otlp_span = exported["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["name"] == "test_span"
+    assert otlp_span["traceId"] == span.trace_id
+    assert otlp_span["attributes"] == [{"key": "rows", "value": {"intValue": "3"}}]
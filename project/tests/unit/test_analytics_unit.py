@@ -0,0 +1,258 @@
+from unittest.mock import ANY, AsyncMock
+
+import pytest
+
+from app import analytics as analytics_cache_module
+from app.api.routers import analytics
+
+TAG_COOCCURRENCES = {
+    "note_count": 2,
+    "pairs": [
+        {
+            "tag": "tag_1",
+            "other_tag": "tag_2",
+            "note_count": 1,
+            "lift": 2.0,
+            "pmi": 1.0,
+        }
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_analytics_cache():
+    analytics_cache_module.analytics_cache.clear()
+    yield
+    analytics_cache_module.analytics_cache.clear()
+
+
+class TestGetProjectTagCooccurrence:
+    def test_get_project_tag_cooccurrence_happy_path(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(analytics, "get_project_version", AsyncMock(return_value=7))
+        mock_get_tag_cooccurrences = AsyncMock(return_value=TAG_COOCCURRENCES)
+        monkeypatch.setattr(
+            analytics, "get_tag_cooccurrences", mock_get_tag_cooccurrences
+        )
+
+        response = test_app_without_db.get(
+            "/projects/1/analytics/tag-cooccurrence/?order_by=pmi&min_count=2&limit=5"
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"project_id": 1, **TAG_COOCCURRENCES}
+        mock_get_tag_cooccurrences.assert_called_once_with(
+            project_id=1, order_by="pmi", min_count=2, limit=5, db_session=ANY
+        )
+
+    def test_get_project_tag_cooccurrence_is_cached_per_version(
+        self, test_app_without_db, monkeypatch
+    ):
+        mock_get_project_version = AsyncMock(side_effect=[7, 7, 8])
+        monkeypatch.setattr(analytics, "get_project_version", mock_get_project_version)
+        mock_get_tag_cooccurrences = AsyncMock(return_value=TAG_COOCCURRENCES)
+        monkeypatch.setattr(
+            analytics, "get_tag_cooccurrences", mock_get_tag_cooccurrences
+        )
+
+        for _ in range(3):
+            response = test_app_without_db.get(
+                "/projects/1/analytics/tag-cooccurrence/"
+            )
+            assert response.status_code == 200
+
+        assert mock_get_tag_cooccurrences.call_count == 2
+
+    def test_get_project_tag_cooccurrence_is_cached_per_parameters(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(analytics, "get_project_version", AsyncMock(return_value=7))
+        mock_get_tag_cooccurrences = AsyncMock(return_value=TAG_COOCCURRENCES)
+        monkeypatch.setattr(
+            analytics, "get_tag_cooccurrences", mock_get_tag_cooccurrences
+        )
+
+        test_app_without_db.get("/projects/1/analytics/tag-cooccurrence/")
+        test_app_without_db.get("/projects/1/analytics/tag-cooccurrence/?order_by=lift")
+
+        assert mock_get_tag_cooccurrences.call_count == 2
+
+    def test_get_project_tag_cooccurrence_incorrect_project_id(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            analytics, "get_project_version", AsyncMock(return_value=None)
+        )
+
+        response = test_app_without_db.get("/projects/999/analytics/tag-cooccurrence/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
+    @pytest.mark.parametrize(
+        "query",
+        ["order_by=name", "min_count=0", "limit=0", "limit=1001"],
+    )
+    def test_get_project_tag_cooccurrence_invalid_parameters(
+        self, test_app_without_db, query
+    ):
+        response = test_app_without_db.get(
+            f"/projects/1/analytics/tag-cooccurrence/?{query}"
+        )
+
+        assert response.status_code == 422
+
+
+class TestGetProjectsTagCooccurrence:
+    def test_get_projects_tag_cooccurrence_happy_path(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            analytics, "get_projects_version", AsyncMock(return_value=(7, 2))
+        )
+        mock_get_tag_cooccurrences = AsyncMock(return_value=TAG_COOCCURRENCES)
+        monkeypatch.setattr(
+            analytics, "get_tag_cooccurrences", mock_get_tag_cooccurrences
+        )
+
+        response = test_app_without_db.get("/projects/analytics/tag-cooccurrence/")
+
+        assert response.status_code == 200
+        assert response.json() == {"project_id": None, **TAG_COOCCURRENCES}
+        mock_get_tag_cooccurrences.assert_called_once_with(
+            project_id=None, order_by="count", min_count=1, limit=50, db_session=ANY
+        )
+
+    def test_get_projects_tag_cooccurrence_is_cached_per_version(
+        self, test_app_without_db, monkeypatch
+    ):
+        mock_get_projects_version = AsyncMock(side_effect=[(7, 2), (7, 2), (7, 1)])
+        monkeypatch.setattr(
+            analytics, "get_projects_version", mock_get_projects_version
+        )
+        mock_get_tag_cooccurrences = AsyncMock(return_value=TAG_COOCCURRENCES)
+        monkeypatch.setattr(
+            analytics, "get_tag_cooccurrences", mock_get_tag_cooccurrences
+        )
+
+        for _ in range(3):
+            response = test_app_without_db.get("/projects/analytics/tag-cooccurrence/")
+            assert response.status_code == 200
+
+        assert mock_get_tag_cooccurrences.call_count == 2
+
+
+def project_analytics(note_count):
+    return {
+        "note_count": note_count,
+        "publication_years": [{"year": 1889, "note_count": note_count}],
+        "top_authors": [{"author": "test_author", "note_count": note_count}],
+        "tags": [{"tag": "tag_1", "note_count": note_count}],
+    }
+
+
+class TestGetProjectAnalytics:
+    def test_get_project_analytics_happy_path(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(analytics, "get_project_version", AsyncMock(return_value=7))
+        mock_get_projects_analytics = AsyncMock(return_value={1: project_analytics(1)})
+        monkeypatch.setattr(
+            analytics, "get_projects_analytics", mock_get_projects_analytics
+        )
+
+        response = test_app_without_db.get(
+            "/projects/1/analytics/?year_bucket=10&top_authors=3"
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"project_id": 1, **project_analytics(1)}
+        mock_get_projects_analytics.assert_called_once_with(
+            project_ids=[1], year_bucket=10, top_authors=3, db_session=ANY
+        )
+
+    def test_get_project_analytics_is_cached_per_version(
+        self, test_app_without_db, monkeypatch
+    ):
+        mock_get_project_version = AsyncMock(side_effect=[7, 7, 8])
+        monkeypatch.setattr(analytics, "get_project_version", mock_get_project_version)
+        mock_get_projects_analytics = AsyncMock(return_value={1: project_analytics(1)})
+        monkeypatch.setattr(
+            analytics, "get_projects_analytics", mock_get_projects_analytics
+        )
+
+        for _ in range(3):
+            response = test_app_without_db.get("/projects/1/analytics/")
+            assert response.status_code == 200
+
+        assert mock_get_projects_analytics.call_count == 2
+
+    def test_get_project_analytics_incorrect_project_id(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            analytics, "get_project_version", AsyncMock(return_value=None)
+        )
+
+        response = test_app_without_db.get("/projects/999/analytics/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
+    @pytest.mark.parametrize(
+        "query",
+        ["year_bucket=0", "year_bucket=1001", "top_authors=0", "top_authors=101"],
+    )
+    def test_get_project_analytics_invalid_parameters(self, test_app_without_db, query):
+        response = test_app_without_db.get(f"/projects/1/analytics/?{query}")
+
+        assert response.status_code == 422
+
+
+class TestGetProjectsAnalytics:
+    def test_get_projects_analytics_only_aggregates_changed_projects(
+        self, test_app_without_db, monkeypatch
+    ):
+        mock_get_projects_versions = AsyncMock(side_effect=[{1: 7, 2: 8}, {1: 7, 2: 9}])
+        monkeypatch.setattr(
+            analytics, "get_projects_versions", mock_get_projects_versions
+        )
+        mock_get_projects_analytics = AsyncMock(
+            side_effect=[
+                {1: project_analytics(1), 2: project_analytics(2)},
+                {2: project_analytics(3)},
+            ]
+        )
+        monkeypatch.setattr(
+            analytics, "get_projects_analytics", mock_get_projects_analytics
+        )
+
+        first = test_app_without_db.get("/projects/analytics/")
+        second = test_app_without_db.get("/projects/analytics/")
+
+        assert first.status_code == 200
+        assert first.json() == [
+            {"project_id": 1, **project_analytics(1)},
+            {"project_id": 2, **project_analytics(2)},
+        ]
+        assert second.json() == [
+            {"project_id": 1, **project_analytics(1)},
+            {"project_id": 2, **project_analytics(3)},
+        ]
+        assert mock_get_projects_analytics.call_args_list[1].kwargs["project_ids"] == [
+            2
+        ]
+
+    def test_get_projects_analytics_all_cached(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(
+            analytics, "get_projects_versions", AsyncMock(return_value={1: 7})
+        )
+        mock_get_projects_analytics = AsyncMock(return_value={1: project_analytics(1)})
+        monkeypatch.setattr(
+            analytics, "get_projects_analytics", mock_get_projects_analytics
+        )
+
+        test_app_without_db.get("/projects/analytics/")
+        response = test_app_without_db.get("/projects/analytics/")
+
+        assert response.status_code == 200
+        mock_get_projects_analytics.assert_called_once()
@@ -0,0 +1,142 @@
+import json
+from datetime import datetime
+from unittest.mock import ANY, AsyncMock
+
+from app.api.routers import jobs
+
+
+class MockJob:
+    def __init__(self, id, kind, status, error=None):
+        self.id = id
+        self.kind = kind
+        self.status = status
+        self.project_id = 1
+        self.progress = 0
+        self.total = None
+        self.error = error
+        self.attempts = 0
+        self.created_at = datetime(2024, 12, 1)
+        self.started_at = None
+        self.finished_at = None
+
+
+class TestSubmitJob:
+    def test_submit_job_happy_path(self, test_app_without_db, monkeypatch):
+        test_request_payload = {"kind": "export", "project_id": 1}
+
+        monkeypatch.setattr(jobs, "project_exists", AsyncMock(return_value=True))
+        mock_create_job = AsyncMock(return_value=MockJob(1, "export", "queued"))
+        monkeypatch.setattr(jobs, "create_job", mock_create_job)
+
+        response = test_app_without_db.post(
+            "/jobs/", data=json.dumps(test_request_payload)
+        )
+
+        mock_create_job.assert_called_once_with(
+            kind="export",
+            project_id=1,
+            payload={"kind": "export", "project_id": 1},
+            db_session=ANY,
+        )
+        assert response.status_code == 202
+        assert response.json()["id"] == 1
+        assert response.json()["status"] == "queued"
+
+    def test_submit_job_cannot_submit_for_inexistent_project(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"kind": "export", "project_id": 999}
+
+        monkeypatch.setattr(jobs, "project_exists", AsyncMock(return_value=False))
+
+        response = test_app_without_db.post(
+            "/jobs/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found."
+
+    def test_submit_job_cannot_submit_unknown_kind(self, test_app_without_db):
+        test_request_payload = {"kind": "reindex", "project_id": 1}
+
+        response = test_app_without_db.post(
+            "/jobs/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+
+    def test_submit_job_validates_the_payload_of_its_kind(self, test_app_without_db):
+        test_request_payload = {"kind": "import", "project_id": 1, "notes": []}
+
+        response = test_app_without_db.post(
+            "/jobs/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+
+
+class TestGetJob:
+    def test_get_job_happy_path(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(
+            jobs,
+            "get_job_by_id",
+            AsyncMock(return_value=MockJob(1, "export", "running")),
+        )
+
+        response = test_app_without_db.get("/jobs/1/")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "running"
+
+    def test_get_job_cannot_get_inexistent_job(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(jobs, "get_job_by_id", AsyncMock(return_value=None))
+
+        response = test_app_without_db.get("/jobs/999/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Job id not found."
+
+
+class TestGetJobResult:
+    def test_get_job_result_happy_path(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(
+            jobs,
+            "get_job_by_id",
+            AsyncMock(return_value=MockJob(1, "bulk_tags", "succeeded")),
+        )
+        monkeypatch.setattr(
+            jobs, "get_job_result", AsyncMock(return_value={"added": 2, "removed": 0})
+        )
+
+        response = test_app_without_db.get("/jobs/1/result/")
+
+        assert response.status_code == 200
+        assert response.json() == {"added": 2, "removed": 0}
+
+    def test_get_job_result_cannot_get_result_of_unfinished_job(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            jobs,
+            "get_job_by_id",
+            AsyncMock(return_value=MockJob(1, "export", "queued")),
+        )
+
+        response = test_app_without_db.get("/jobs/1/result/")
+
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Job has not finished yet."
+
+    def test_get_job_result_cannot_get_result_of_failed_job(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            jobs,
+            "get_job_by_id",
+            AsyncMock(return_value=MockJob(1, "export", "failed", error="boom")),
+        )
+
+        response = test_app_without_db.get("/jobs/1/result/")
+
+        assert response.status_code == 409
+        assert response.json()["detail"] == "Job failed: boom"
@@ -1,8 +1,11 @@
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from unittest.mock import ANY, AsyncMock
 
+from app import citations, duplicates
 from app.api.routers import project_notes
+from app.config import Settings, get_settings
+from tests.conftest import get_settings_override, unique_violation
 
 
 class TestPostProjectNotes:
@@ -17,24 +20,8 @@ class TestPostProjectNotes:
         }
         test_project_id = 1
 
-        async def mock_get_project_by_id(session, project_id):
-            return True
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_note_by_name_and_project(note_name, project_id, db_session):
-            return False
-
-        monkeypatch.setattr(
-            project_notes,
-            "get_note_by_name_and_project",
-            mock_get_note_by_name_and_project,
-        )
-
-        mock_insert_missing_tags = AsyncMock()
-
         monkeypatch.setattr(
-            project_notes, "insert_missing_tags", mock_insert_missing_tags
+            project_notes, "project_exists", AsyncMock(return_value=True)
         )
 
         async def mock_insert_note(payload, project_id, db_session):
@@ -56,6 +43,7 @@ class TestPostProjectNotes:
                 publication_year = test_request_payload["note_publication_year"]
                 comments = test_request_payload["note_comments"]
                 created_at = datetime(2024, 12, 1).isoformat()
+                updated_at = datetime(2024, 12, 1).isoformat()
                 tags = all_tags
 
             res = Note()
@@ -67,11 +55,6 @@ class TestPostProjectNotes:
             f"/projects/{test_project_id}/notes/", data=json.dumps(test_request_payload)
         )
 
-        # assert that function with no return value was called correctly
-        mock_insert_missing_tags.assert_called_once_with(
-            tags=test_request_payload["note_tags"], db_session=ANY
-        )
-
         # assert response
         assert response.status_code == 200
         assert response.json()["note_id"] == 1
@@ -103,10 +86,9 @@ class TestPostProjectNotes:
         }
         test_project_id = 1
 
-        async def mock_get_project_by_id(session, project_id):
-            return False
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=False)
+        )
 
         response = test_app_without_db.post(
             f"/projects/{test_project_id}/notes/", data=json.dumps(test_request_payload)
@@ -129,10 +111,14 @@ class TestPostProjectNotes:
         test_project_id = 1
         test_project_name = "test_project_name"
 
-        async def mock_get_project_by_id(session, project_id):
-            return True
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(
+            project_notes,
+            "insert_note",
+            AsyncMock(side_effect=unique_violation("uq_notes_project_id")),
+        )
 
         async def mock_get_note_by_name_and_project(note_name, project_id, db_session):
             class DbRow:
@@ -158,15 +144,54 @@ class TestPostProjectNotes:
             " name for this project."
         )
 
+    def test_post_project_notes_note_name_taken_by_purged_note(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(
+            project_notes,
+            "insert_note",
+            AsyncMock(side_effect=unique_violation("uq_notes_project_id")),
+        )
+        # the note taking the name was purged before it could be looked up
+        monkeypatch.setattr(
+            project_notes,
+            "get_note_by_name_and_project",
+            AsyncMock(return_value=None),
+        )
+
+        response = test_app_without_db.post(
+            "/projects/1/notes/", data=json.dumps({"note_name": "test_name"})
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            "Note 'test_name' already exists for this project. Please select a"
+            " unique note name for this project."
+        )
+
+
+class MockProjectStats:
+    updated_at = datetime(2024, 12, 2, tzinfo=timezone.utc)
+
+
+class MockProject:
+    updated_at = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    stats = MockProjectStats()
+
 
 class TestGetAllProjectNotes:
     def test_get_all_project_notes_happy_flow(self, test_app_without_db, monkeypatch):
         async def mock_get_project_by_id(session, project_id):
-            return True
+            return MockProject()
 
         monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
 
-        async def mock_get_all_notes_for_project(project_id, db_session):
+        async def mock_get_all_notes_for_project(
+            project_id, db_session, updated_since=None
+        ):
             class MockTag:
                 def __init__(self, name):
                     self.name = name
@@ -195,6 +220,7 @@ class TestGetAllProjectNotes:
                     self.publication_year = publication_year
                     self.comments = comments
                     self.created_at = created_at
+                    self.updated_at = datetime(2024, 12, 1, tzinfo=timezone.utc)
                     self.tags = tags
 
             note_1 = MockProjectNotes(
@@ -239,6 +265,7 @@ class TestGetAllProjectNotes:
                 "note_publication_year": 2000,
                 "note_comments": "comm_1",
                 "created_at": datetime(2024, 12, 1).isoformat(),
+                "updated_at": "2024-12-01T00:00:00Z",
                 "note_tags": [],
             },
             {
@@ -250,6 +277,7 @@ class TestGetAllProjectNotes:
                 "note_publication_year": 2001,
                 "note_comments": "comm_2",
                 "created_at": datetime(2024, 12, 1).isoformat(),
+                "updated_at": "2024-12-01T00:00:00Z",
                 "note_tags": ["tag_1", "tag_2"],
             },
         ]
@@ -304,6 +332,7 @@ class TestGetProjectNote:
                     self.publication_year = publication_year
                     self.comments = comments
                     self.created_at = created_at
+                    self.updated_at = datetime(2024, 12, 1, tzinfo=timezone.utc)
                     self.tags = tags
 
             note_1 = MockProjectNotes(
@@ -393,74 +422,40 @@ class TestPatchProjectNote:
             "tags": ["tag_1", "tag_2"],
         }
 
-        async def mock_get_project_by_id(db_session, project_id):
-            return True
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_note_by_id(note_id, db_session):
-            class MockTag:
-                def __init__(self, name):
-                    self.name = name
-
-            tag_3 = MockTag(name="tag_3")
-            tag_4 = MockTag(name="tag_4")
-
-            class MockNote:
-                id = 1
-                project_id = 1
-                name = "test_note_name"
-                tags = [tag_3, tag_4]
-
-            mock_note = MockNote()
-            return mock_note
-
-        monkeypatch.setattr(project_notes, "get_note_by_id", mock_get_note_by_id)
-
-        async def mock_get_note_by_name_and_project(note_name, project_id, db_session):
-            return None
-
-        monkeypatch.setattr(
-            project_notes,
-            "get_note_by_name_and_project",
-            mock_get_note_by_name_and_project,
-        )
-
-        mock_handle_note_tags_update = AsyncMock()
-        monkeypatch.setattr(
-            project_notes, "handle_note_tags_update", mock_handle_note_tags_update
-        )
-
-        async def mock_update_note(payload, note_id, db_session):
-            class MockTag:
-                def __init__(self, name):
-                    self.name = name
-
-            tag_1 = MockTag(name="tag_1")
-            tag_2 = MockTag(name="tag_2")
-
-            class MockNote:
-                id = 1
-                project_id = 1
-                name = test_request_payload["name"]
-                author = test_request_payload["author"]
-                publication_details = test_request_payload["publication_details"]
-                publication_year = test_request_payload["publication_year"]
-                comments = test_request_payload["comments"]
-                created_at = datetime(2024, 12, 1).isoformat()
-                tags = [tag_1, tag_2]
-
-            mock_note = MockNote()
-            return mock_note
-
+        class MockNote:
+            id = 1
+            project_id = 1
+            name = test_request_payload["name"]
+            author = test_request_payload["author"]
+            publication_details = test_request_payload["publication_details"]
+            publication_year = test_request_payload["publication_year"]
+            comments = test_request_payload["comments"]
+            created_at = datetime(2024, 12, 1).isoformat()
+            updated_at = datetime(2024, 12, 1).isoformat()
+            tags = ["tag_1", "tag_2"]
+
+        mock_update_note = AsyncMock(return_value=MockNote())
         monkeypatch.setattr(project_notes, "update_note", mock_update_note)
 
         response = test_app_without_db.patch(
             "/projects/1/notes/1", data=json.dumps(test_request_payload)
         )
 
-        # assert that function with no return value was called
-        mock_handle_note_tags_update.assert_called_once()
+        # assert the fields and the tags are updated together
+        mock_update_note.assert_called_once_with(
+            note_id=1,
+            project_id=1,
+            payload={
+                "name": test_request_payload["name"],
+                "author": test_request_payload["author"],
+                "publication_details": test_request_payload["publication_details"],
+                "publication_year": test_request_payload["publication_year"],
+                "comments": test_request_payload["comments"],
+            },
+            tags=["tag_1", "tag_2"],
+            snapshot_interval=10,
+            db_session=ANY,
+        )
 
         # assert response
         assert response.status_code == 200
@@ -480,73 +475,39 @@ class TestPatchProjectNote:
         assert response.json()["created_at"] == datetime(2024, 12, 1).isoformat()
         assert response.json()["note_tags"] == test_request_payload["tags"]
 
-    def test_patch_note_only_tags_received_happy_path(
+    def test_patch_note_without_tags_does_not_update_tags(
         self, test_app_without_db, monkeypatch
     ):
-        test_request_payload = {
-            "tags": ["tag_1", "tag_2"],
-        }
-
-        async def mock_get_project_by_id(db_session, project_id):
-            return True
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_note_by_id(note_id, db_session):
-            class MockTag:
-                def __init__(self, name):
-                    self.name = name
-
-            tag_3 = MockTag(name="tag_3")
-            tag_4 = MockTag(name="tag_4")
-
-            class MockNote:
-                id = 1
-                project_id = 1
-                name = "test_name"
-                author = "test_author"
-                publication_details = "test_publication_details"
-                publication_year = 1900
-                comments = "test_comments"
-                created_at = datetime(2024, 12, 1).isoformat()
-                tags = [tag_3, tag_4]
-
-            mock_note = MockNote()
-            return mock_note
-
-        monkeypatch.setattr(project_notes, "get_note_by_id", mock_get_note_by_id)
-
-        async def mock_get_note_by_name_and_project(note_name, project_id, db_session):
-            return None
-
-        monkeypatch.setattr(
-            project_notes,
-            "get_note_by_name_and_project",
-            mock_get_note_by_name_and_project,
-        )
-
-        mock_handle_note_tags_update = AsyncMock()
-        monkeypatch.setattr(
-            project_notes, "handle_note_tags_update", mock_handle_note_tags_update
-        )
+        test_request_payload = {"name": "test_name"}
+
+        class MockNote:
+            id = 1
+            project_id = 1
+            name = "test_name"
+            author = "test_author"
+            publication_details = "test_publication_details"
+            publication_year = 1900
+            comments = "test_comments"
+            created_at = datetime(2024, 12, 1).isoformat()
+            updated_at = datetime(2024, 12, 1).isoformat()
+            tags = ["tag_3", "tag_4"]
+
+        mock_update_note = AsyncMock(return_value=MockNote())
+        monkeypatch.setattr(project_notes, "update_note", mock_update_note)
 
         response = test_app_without_db.patch(
             "/projects/1/notes/1", data=json.dumps(test_request_payload)
         )
 
-        # assert that function with no return value was called
-        mock_handle_note_tags_update.assert_called_once()
-
-        # assert response
+        mock_update_note.assert_called_once_with(
+            note_id=1,
+            project_id=1,
+            payload={"name": "test_name"},
+            tags=None,
+            snapshot_interval=10,
+            db_session=ANY,
+        )
         assert response.status_code == 200
-        assert response.json()["note_id"] == 1
-        assert response.json()["project_id"] == 1
-        assert response.json()["note_name"] == "test_name"
-        assert response.json()["note_author"] == "test_author"
-        assert response.json()["note_publication_details"] == "test_publication_details"
-        assert response.json()["note_publication_year"] == 1900
-        assert response.json()["note_comments"] == "test_comments"
-        assert response.json()["created_at"] == datetime(2024, 12, 1).isoformat()
         assert response.json()["note_tags"] == ["tag_3", "tag_4"]
 
     def test_patch_note_not_patching_if_project_does_not_exist(
@@ -556,10 +517,10 @@ class TestPatchProjectNote:
             "name": "test_name",
         }
 
-        async def mock_get_project_by_id(db_session, project_id):
-            return False
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
+        monkeypatch.setattr(project_notes, "update_note", AsyncMock(return_value=None))
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=False)
+        )
 
         response = test_app_without_db.patch(
             "projects/1/notes/1", data=json.dumps(test_request_payload)
@@ -575,15 +536,13 @@ class TestPatchProjectNote:
             "name": "test_name",
         }
 
-        async def mock_get_project_by_id(db_session, project_id):
-            return True
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_note_by_id(note_id, db_session):
-            return False
-
-        monkeypatch.setattr(project_notes, "get_note_by_id", mock_get_note_by_id)
+        monkeypatch.setattr(project_notes, "update_note", AsyncMock(return_value=None))
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(
+            project_notes, "get_note_by_id", AsyncMock(return_value=None)
+        )
 
         response = test_app_without_db.patch(
             "projects/1/notes/1", data=json.dumps(test_request_payload)
@@ -599,19 +558,16 @@ class TestPatchProjectNote:
             "name": "test_name",
         }
 
-        async def mock_get_project_by_id(db_session, project_id):
-            return True
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_note_by_id(note_id, db_session):
-            class MockNote:
-                project_id = 1
-
-            mock_note = MockNote()
-            return mock_note
+        class MockNote:
+            project_id = 1
 
-        monkeypatch.setattr(project_notes, "get_note_by_id", mock_get_note_by_id)
+        monkeypatch.setattr(project_notes, "update_note", AsyncMock(return_value=None))
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(
+            project_notes, "get_note_by_id", AsyncMock(return_value=MockNote())
+        )
 
         response = test_app_without_db.patch(
             "projects/999/notes/1", data=json.dumps(test_request_payload)
@@ -629,32 +585,20 @@ class TestPatchProjectNote:
             "name": "test_name",
         }
 
-        async def mock_get_project_by_id(db_session, project_id):
-            class MockProject:
-                name = "project_1"
-
-            mock_project = MockProject()
-            return mock_project
-
-        monkeypatch.setattr(project_notes, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_note_by_id(note_id, db_session):
-            class MockNote:
-                project_id = 1
-                name = "abc"
-
-            mock_note = MockNote()
-            return mock_note
-
-        monkeypatch.setattr(project_notes, "get_note_by_id", mock_get_note_by_id)
+        monkeypatch.setattr(
+            project_notes,
+            "update_note",
+            AsyncMock(side_effect=unique_violation("uq_notes_project_id")),
+        )
 
-        async def mock_get_note_by_name_and_project(note_name, project_id, db_session):
-            return True
+        class MockNoteInfo:
+            note_name = "test_name"
+            project_name = "project_1"
 
         monkeypatch.setattr(
             project_notes,
             "get_note_by_name_and_project",
-            mock_get_note_by_name_and_project,
+            AsyncMock(return_value=MockNoteInfo()),
         )
 
         response = test_app_without_db.patch(
@@ -668,6 +612,30 @@ class TestPatchProjectNote:
             "try again."
         )
 
+    def test_patch_note_note_name_taken_by_purged_note(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes,
+            "update_note",
+            AsyncMock(side_effect=unique_violation("uq_notes_project_id")),
+        )
+        monkeypatch.setattr(
+            project_notes,
+            "get_note_by_name_and_project",
+            AsyncMock(return_value=None),
+        )
+
+        response = test_app_without_db.patch(
+            "projects/1/notes/1", data=json.dumps({"name": "test_name"})
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            "Note name 'test_name' already exists on this project. Please select"
+            " a unique note name and try again."
+        )
+
 
 class TestDeleteProjectNote:
     def test_delete_project_note_happy_path(self, test_app_without_db, monkeypatch):
@@ -752,3 +720,392 @@ class TestDeleteProjectNote:
         assert (
             response.json()["detail"] == "The note id cannot be found for this project."
         )
+
+
+class TestGetProjectNoteRevisions:
+    def test_get_note_revision_happy_path(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+
+        class MockNote:
+            id = 1
+            project_id = 1
+            created_at = datetime(2024, 12, 1)
+
+        monkeypatch.setattr(
+            project_notes, "get_note_by_id", AsyncMock(return_value=MockNote())
+        )
+        state = {
+            "name": "name_1",
+            "author": "author_1",
+            "publication_details": "details_1",
+            "publication_year": 2000,
+            "comments": "comm_1",
+            "tags": ["tag_1"],
+        }
+        mock_get_note_revision = AsyncMock(return_value=(state, datetime(2024, 12, 2)))
+        monkeypatch.setattr(project_notes, "get_note_revision", mock_get_note_revision)
+
+        response = test_app_without_db.get("/projects/1/notes/1/revisions/2")
+
+        mock_get_note_revision.assert_called_once_with(
+            note_id=1, revision=2, db_session=ANY
+        )
+        assert response.status_code == 200
+        assert response.json()["note_name"] == "name_1"
+        assert response.json()["note_tags"] == ["tag_1"]
+        assert response.json()["revision"] == 2
+
+    def test_get_note_revision_cannot_get_revision_that_does_not_exist(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+
+        class MockNote:
+            project_id = 1
+
+        monkeypatch.setattr(
+            project_notes, "get_note_by_id", AsyncMock(return_value=MockNote())
+        )
+        monkeypatch.setattr(
+            project_notes, "get_note_revision", AsyncMock(return_value=None)
+        )
+
+        response = test_app_without_db.get("/projects/1/notes/1/revisions/2")
+
+        assert response.status_code == 404
+        assert (
+            response.json()["detail"] == "The revision cannot be found for this note."
+        )
+
+    def test_get_note_revisions_cannot_get_for_not_existent_note(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(
+            project_notes, "get_note_by_id", AsyncMock(return_value=None)
+        )
+
+        response = test_app_without_db.get("/projects/1/notes/1/revisions")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Note id not found"
+
+
+class TestProjectNoteDuplicates:
+    def test_signature_ignores_case_punctuation_and_subtitle(self):
+        signature = duplicates.minhash_signature("Deep Learning", "Goodfellow, I.")
+
+        assert signature == duplicates.minhash_signature(
+            "DEEP LEARNING: An MIT Press book", "Goodfellow I"
+        )
+        assert signature != duplicates.minhash_signature("Deep Learning", "LeCun, Y.")
+        assert len(duplicates.lsh_buckets(signature)) == duplicates.BANDS
+
+    def test_get_duplicates_cannot_get_for_inexistent_project(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=False)
+        )
+
+        response = test_app_without_db.get("/projects/1/notes/duplicates/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+    def test_post_note_checking_duplicates_does_not_add_likely_duplicates(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+
+        class MockDuplicate:
+            id = 3
+
+        mock_find_note_duplicates = AsyncMock(return_value=[MockDuplicate()])
+        monkeypatch.setattr(
+            project_notes, "find_note_duplicates", mock_find_note_duplicates
+        )
+        mock_insert_note = AsyncMock()
+        monkeypatch.setattr(project_notes, "insert_note", mock_insert_note)
+        payload = {"note_name": "Deep learning", "note_author": "Goodfellow"}
+
+        response = test_app_without_db.post(
+            "/projects/1/notes/?check_duplicates=true", data=json.dumps(payload)
+        )
+
+        mock_find_note_duplicates.assert_called_once_with(
+            project_id=1,
+            name="Deep learning",
+            author="Goodfellow",
+            threshold=0.5,
+            limit=project_notes.DUPLICATE_CHECK_LIMIT,
+            db_session=ANY,
+        )
+        mock_insert_note.assert_not_called()
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            "Note 'Deep learning' is likely a duplicate of the notes 3 of this"
+            " project. Add it without 'check_duplicates' to keep it anyway."
+        )
+
+
+class MockCitationNote:
+    def __init__(self, version=0, **fields):
+        self.id = 1
+        self.name = "On the Origin of Species"
+        self.author = "Darwin, C."
+        self.publication_details = "John Murray"
+        self.publication_year = 1859
+        self.version = version
+        self.__dict__.update(fields)
+
+
+class TestProjectNoteCitations:
+    def test_get_note_citation_happy_path(self, test_app_without_db, monkeypatch):
+        monkeypatch.setattr(
+            project_notes,
+            "get_notes_for_citation",
+            AsyncMock(return_value=[MockCitationNote()]),
+        )
+        expected_citations = {
+            "apa": "Darwin, C. (1859). On the Origin of Species. John Murray.",
+            "mla": "Darwin, C. On the Origin of Species. John Murray, 1859.",
+            "chicago": "Darwin, C. 1859. On the Origin of Species. John Murray.",
+        }
+
+        for style, expected_citation in expected_citations.items():
+            response = test_app_without_db.get(
+                f"/projects/1/notes/1/citation/?style={style}"
+            )
+
+            assert response.status_code == 200
+            assert response.json() == {
+                "note_id": 1,
+                "style": style,
+                "citation": expected_citation,
+            }
+
+    def test_get_note_citation_in_bibtex_escapes_special_characters(
+        self, test_app_without_db, monkeypatch
+    ):
+        note = MockCitationNote(id=2, publication_details="Smith & Sons", author=None)
+        monkeypatch.setattr(
+            project_notes, "get_notes_for_citation", AsyncMock(return_value=[note])
+        )
+
+        response = test_app_without_db.get("/projects/1/notes/2/citation/?style=bibtex")
+
+        assert response.status_code == 200
+        assert response.json()["citation"] == (
+            "@misc{note2,\n"
+            "  title = {On the Origin of Species},\n"
+            "  howpublished = {Smith \\& Sons},\n"
+            "  year = {1859},\n"
+            "}"
+        )
+
+    def test_get_note_citation_is_rendered_again_for_a_new_note_version(
+        self, test_app_without_db, monkeypatch
+    ):
+        citations.citation_cache.clear()
+        mock_get_notes_for_citation = AsyncMock(return_value=[MockCitationNote()])
+        monkeypatch.setattr(
+            project_notes, "get_notes_for_citation", mock_get_notes_for_citation
+        )
+        test_app_without_db.get("/projects/1/notes/1/citation/")
+
+        # the same version is served from the cache, even if the note changed
+        mock_get_notes_for_citation.return_value = [MockCitationNote(name="Changed")]
+        cached = test_app_without_db.get("/projects/1/notes/1/citation/")
+        mock_get_notes_for_citation.return_value = [
+            MockCitationNote(name="Changed", version=2)
+        ]
+        rendered = test_app_without_db.get("/projects/1/notes/1/citation/")
+
+        assert "On the Origin of Species" in cached.json()["citation"]
+        assert "Changed" in rendered.json()["citation"]
+
+    def test_get_note_citation_cannot_get_for_not_existent_note(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "get_notes_for_citation", AsyncMock(return_value=[])
+        )
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        monkeypatch.setattr(
+            project_notes, "get_note_by_id", AsyncMock(return_value=None)
+        )
+
+        response = test_app_without_db.get("/projects/1/notes/1/citation/")
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Note id not found"
+
+    def test_get_note_citation_cannot_get_for_unknown_style(self, test_app_without_db):
+        response = test_app_without_db.get("/projects/1/notes/1/citation/?style=ieee")
+
+        assert response.status_code == 422
+
+    def test_get_project_notes_citations_renders_large_projects_in_a_thread(
+        self, test_app_without_db, monkeypatch
+    ):
+        monkeypatch.setattr(
+            project_notes, "project_exists", AsyncMock(return_value=True)
+        )
+        notes = [MockCitationNote(id=note_id) for note_id in range(1, 4)]
+        monkeypatch.setattr(
+            project_notes, "get_notes_for_citation", AsyncMock(return_value=notes)
+        )
+        mock_run_in_threadpool = AsyncMock(return_value=["a", "b", "c"])
+        monkeypatch.setattr(project_notes, "run_in_threadpool", mock_run_in_threadpool)
+
+        test_app_without_db.app.dependency_overrides[get_settings] = lambda: Settings(
+            citation_offload_threshold=2
+        )
+        try:
+            response = test_app_without_db.get("/projects/1/notes/citations/")
+        finally:
+            test_app_without_db.app.dependency_overrides[get_settings] = (
+                get_settings_override
+            )
+
+        mock_run_in_threadpool.assert_called_once_with(
+            citations.render_citations, notes, "apa"
+        )
+        assert response.status_code == 200
+        assert [citation["citation"] for citation in response.json()] == [
+            "a",
+            "b",
+            "c",
+        ]
+
+
+class TestBulkUpdateProjectNotesTags:
+    def test_bulk_update_project_notes_tags_happy_path(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {
+            "note_ids": [1, 2],
+            "add_tags": ["tag_1"],
+            "remove_tags": ["tag_2"],
+        }
+
+        async def mock_project_exists(project_id, db_session):
+            return True
+
+        monkeypatch.setattr(project_notes, "project_exists", mock_project_exists)
+
+        mock_bulk_update_notes_tags = AsyncMock(return_value=(2, 1))
+        monkeypatch.setattr(
+            project_notes, "bulk_update_notes_tags", mock_bulk_update_notes_tags
+        )
+
+        response = test_app_without_db.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+
+        mock_bulk_update_notes_tags.assert_called_once_with(
+            project_id=1,
+            selection=ANY,
+            add_tags=["tag_1"],
+            remove_tags=["tag_2"],
+            snapshot_interval=10,
+            db_session=ANY,
+        )
+        assert response.status_code == 200
+        assert response.json() == {"added": 2, "removed": 1}
+
+    def test_bulk_update_project_notes_tags_cannot_update_for_inexistent_project(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"note_ids": [1], "add_tags": ["tag_1"]}
+
+        async def mock_project_exists(project_id, db_session):
+            return False
+
+        monkeypatch.setattr(project_notes, "project_exists", mock_project_exists)
+
+        response = test_app_without_db.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
+
+    def test_bulk_update_project_notes_tags_requires_exactly_one_selection(
+        self, test_app_without_db
+    ):
+        test_request_payload = {
+            "note_ids": [1],
+            "filter": {"tag": "tag_1"},
+            "add_tags": ["tag_2"],
+        }
+
+        response = test_app_without_db.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+
+    def test_bulk_update_project_notes_tags_requires_tags_to_add_or_remove(
+        self, test_app_without_db
+    ):
+        test_request_payload = {"note_ids": [1]}
+
+        response = test_app_without_db.patch(
+            "/projects/1/notes/bulk/tags/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+
+
+class TestBulkDeleteProjectNotes:
+    def test_bulk_delete_project_notes_happy_path(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"filter": {"tag": "tag_1"}}
+
+        async def mock_project_exists(project_id, db_session):
+            return True
+
+        monkeypatch.setattr(project_notes, "project_exists", mock_project_exists)
+
+        mock_bulk_delete_notes = AsyncMock(return_value=(2, 3))
+        monkeypatch.setattr(project_notes, "bulk_delete_notes", mock_bulk_delete_notes)
+
+        response = test_app_without_db.post(
+            "/projects/1/notes/bulk/delete/", data=json.dumps(test_request_payload)
+        )
+
+        mock_bulk_delete_notes.assert_called_once_with(
+            project_id=1, selection=ANY, batch_size=1000, db_session=ANY
+        )
+        assert response.status_code == 200
+        assert response.json() == {"deleted_notes": 2, "deleted_note_tags": 3}
+
+    def test_bulk_delete_project_notes_cannot_delete_for_inexistent_project(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"note_ids": [1]}
+
+        async def mock_project_exists(project_id, db_session):
+            return False
+
+        monkeypatch.setattr(project_notes, "project_exists", mock_project_exists)
+
+        response = test_app_without_db.post(
+            "/projects/1/notes/bulk/delete/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Project id not found"
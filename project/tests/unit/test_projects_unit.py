@@ -1,8 +1,10 @@
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from unittest.mock import ANY, AsyncMock
 
 from app.api.routers import projects
+from tests.conftest import unique_violation
 
 
 class TestPostProject:
@@ -13,13 +15,16 @@ class TestPostProject:
             "name": "test_name",
             "comment": "test_comment",
             "created_at": datetime(2024, 12, 1).isoformat(),
+            "updated_at": datetime(2024, 12, 1).isoformat(),
+            "stats": {
+                "note_count": 0,
+                "tag_count": 0,
+                "latest_note_at": None,
+                "min_publication_year": None,
+                "max_publication_year": None,
+            },
         }
 
-        async def mock_get_project_by_name(project_name, db_session):
-            return None
-
-        monkeypatch.setattr(projects, "get_project_by_name", mock_get_project_by_name)
-
         async def mock_post_project(payload, db_session):
             return test_response_payload
 
@@ -37,10 +42,11 @@ class TestPostProject:
     ):
         project_name = "test_name_1"
 
-        async def mock_get_project_by_name(project_name, db_session):
-            return project_name
-
-        monkeypatch.setattr(projects, "get_project_by_name", mock_get_project_by_name)
+        monkeypatch.setattr(
+            projects,
+            "post_project",
+            AsyncMock(side_effect=unique_violation("ix_projects_name")),
+        )
 
         payload = {"name": project_name, "comment": "test_comment_1"}
 
@@ -61,12 +67,28 @@ class TestGetAllProjects:
                 "name": "test_name",
                 "comment": "test_comment",
                 "created_at": datetime(2024, 12, 1).isoformat(),
+                "updated_at": datetime(2024, 12, 1).isoformat(),
+                "stats": {
+                    "note_count": 2,
+                    "tag_count": 3,
+                    "latest_note_at": datetime(2024, 12, 2).isoformat(),
+                    "min_publication_year": 1889,
+                    "max_publication_year": 1989,
+                },
             },
             {
                 "id": 2,
                 "name": "test_name_2",
                 "comment": "test_comment_2",
                 "created_at": datetime(2024, 1, 1).isoformat(),
+                "updated_at": datetime(2024, 1, 1).isoformat(),
+                "stats": {
+                    "note_count": 0,
+                    "tag_count": 0,
+                    "latest_note_at": None,
+                    "min_publication_year": None,
+                    "max_publication_year": None,
+                },
             },
         ]
 
@@ -84,22 +106,60 @@ class TestGetAllProjects:
 class TestGetProject:
     def test_get_project(self, test_app_without_db, monkeypatch):
         test_id = 1
-        test_data = {
-            "id": test_id,
-            "name": "test_name",
-            "comment": "test_comment",
-            "created_at": datetime(2024, 12, 1).isoformat(),
+        test_stats = {
+            "note_count": 2,
+            "tag_count": 3,
+            "latest_note_at": datetime(2024, 12, 2).isoformat(),
+            "min_publication_year": 1889,
+            "max_publication_year": 1989,
         }
+        test_project = SimpleNamespace(
+            id=test_id,
+            name="test_name",
+            comment="test_comment",
+            created_at=datetime(2024, 12, 1).isoformat(),
+            updated_at=datetime(2024, 12, 1, tzinfo=timezone.utc),
+            stats=SimpleNamespace(
+                **test_stats, updated_at=datetime(2024, 12, 3, tzinfo=timezone.utc)
+            ),
+        )
 
         async def mock_get_project_by_id(fake_db_session, fake_project_id):
-            return test_data
+            return test_project
 
         monkeypatch.setattr(projects, "get_project_by_id", mock_get_project_by_id)
 
         response = test_app_without_db.get(f"/projects/{test_id}/")
 
         assert response.status_code == 200
-        assert response.json() == test_data
+        assert response.json() == {
+            "id": test_id,
+            "name": "test_name",
+            "comment": "test_comment",
+            "created_at": datetime(2024, 12, 1).isoformat(),
+            "updated_at": "2024-12-01T00:00:00Z",
+            "stats": test_stats,
+        }
+        # the stats changed after the project itself
+        assert response.headers["last-modified"] == "Tue, 03 Dec 2024 00:00:00 GMT"
+
+    def test_get_project_not_modified(self, test_app_without_db, monkeypatch):
+        test_project = SimpleNamespace(
+            updated_at=datetime(2024, 12, 1, 10, 30, 15, 500, tzinfo=timezone.utc),
+            stats=None,
+        )
+        monkeypatch.setattr(
+            projects, "get_project_by_id", AsyncMock(return_value=test_project)
+        )
+
+        response = test_app_without_db.get(
+            "/projects/1/",
+            headers={"If-Modified-Since": "Sun, 01 Dec 2024 10:30:15 GMT"},
+        )
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["last-modified"] == "Sun, 01 Dec 2024 10:30:15 GMT"
 
     def test_get_not_existent_project(
         self,
@@ -126,17 +186,7 @@ class TestPatchProject:
             name = "test_name"
             comment = "test_comment"
             created_at = datetime(2024, 12, 1).isoformat()
-
-        async def mock_get_project_by_id(fake_db_session, fake_project_id):
-            dummy_project = DummyProject()
-            return dummy_project
-
-        monkeypatch.setattr(projects, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_project_by_name(fake_db_session, fake_project_id):
-            return None
-
-        monkeypatch.setattr(projects, "get_project_by_name", mock_get_project_by_name)
+            updated_at = datetime(2024, 12, 1).isoformat()
 
         async def mock_update_project(project_id, payload, db_session):
             updated_dummy_project = DummyProject()
@@ -158,10 +208,7 @@ class TestPatchProject:
     def test_patch_project_cannot_update_not_existing_project(
         self, test_app_without_db, monkeypatch
     ):
-        async def mock_get_project_by_id(fake_db_session, fake_project_id):
-            return None
-
-        monkeypatch.setattr(projects, "get_project_by_id", mock_get_project_by_id)
+        monkeypatch.setattr(projects, "update_project", AsyncMock(return_value=None))
 
         test_request_payload = {
             "name": "name",
@@ -183,22 +230,11 @@ class TestPatchProject:
             "comment": "updated_comment",
         }
 
-        class DummyProject:
-            id = 1
-            name = "test_name"
-            comment = "test_comment"
-            created_at = datetime(2024, 12, 1).isoformat()
-
-        async def mock_get_project_by_id(db_session, project_id):
-            dummy_project = DummyProject()
-            return dummy_project
-
-        monkeypatch.setattr(projects, "get_project_by_id", mock_get_project_by_id)
-
-        async def mock_get_project_by_name(name, db_session):
-            return True
-
-        monkeypatch.setattr(projects, "get_project_by_name", mock_get_project_by_name)
+        monkeypatch.setattr(
+            projects,
+            "update_project",
+            AsyncMock(side_effect=unique_violation("ix_projects_name")),
+        )
 
         response = test_app_without_db.patch(
             "/projects/1/", data=json.dumps(payload_request)
@@ -214,28 +250,25 @@ class TestPatchProject:
 
 class TestDeleteProject:
     def test_delete_project_deletes_project(self, test_app_without_db, monkeypatch):
-        async def mock_get_project_by_id(db_session, project_id):
-            return True
+        class MockJob:
+            id = 5
 
-        monkeypatch.setattr(projects, "get_project_by_id", mock_get_project_by_id)
-
-        mock_remove_project = AsyncMock()
+        mock_remove_project = AsyncMock(return_value=MockJob())
 
         monkeypatch.setattr(projects, "remove_project", mock_remove_project)
 
         response = test_app_without_db.delete("/projects/1/")
 
-        mock_remove_project.assert_called_once_with(project_id=1, db_session=ANY)
-        assert response.status_code == 200
-        assert response.json()["message"] == "Project deleted"
+        mock_remove_project.assert_called_once_with(
+            project_id=1, retention=timedelta(days=30), db_session=ANY
+        )
+        assert response.status_code == 202
+        assert response.json() == {"message": "Project deleted", "job_id": 5}
 
     def test_delete_project_cannot_delete_not_existent_project(
         self, test_app_without_db, monkeypatch
     ):
-        async def mock_get_project_by_id(db_session, project_id):
-            return None
-
-        monkeypatch.setattr(projects, "get_project_by_id", mock_get_project_by_id)
+        monkeypatch.setattr(projects, "remove_project", AsyncMock(return_value=None))
 
         response = test_app_without_db.delete("/projects/1/")
 
@@ -0,0 +1,186 @@
+import json
+from unittest.mock import ANY, AsyncMock
+
+from app.api.routers import tags
+from tests.conftest import unique_violation
+
+
+class MockTag:
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+class TestRenameTag:
+    def test_rename_tag_happy_path(self, test_app_without_db, monkeypatch):
+        test_request_payload = {"name": "ml", "new_name": "machine-learning"}
+
+        async def mock_get_tag_by_name(tag_name, db_session):
+            if tag_name == "ml":
+                return MockTag(id=1, name="ml")
+            return None
+
+        monkeypatch.setattr(tags, "get_tag_by_name", mock_get_tag_by_name)
+
+        mock_rename_tag = AsyncMock(return_value=MockTag(id=1, name="machine-learning"))
+        monkeypatch.setattr(tags, "rename_tag", mock_rename_tag)
+
+        response = test_app_without_db.post(
+            "/tags/rename/", data=json.dumps(test_request_payload)
+        )
+
+        mock_rename_tag.assert_called_once_with(
+            tag_id=1, new_name="machine-learning", db_session=ANY
+        )
+        assert response.status_code == 200
+        assert response.json() == {"id": 1, "name": "machine-learning"}
+
+    def test_rename_tag_normalizes_tag_names(self, test_app_without_db, monkeypatch):
+        test_request_payload = {"name": " ML ", "new_name": "Ｍachine-Learning"}
+
+        mock_get_tag_by_name = AsyncMock(side_effect=[MockTag(id=1, name="ml"), None])
+        monkeypatch.setattr(tags, "get_tag_by_name", mock_get_tag_by_name)
+
+        mock_rename_tag = AsyncMock(return_value=MockTag(id=1, name="machine-learning"))
+        monkeypatch.setattr(tags, "rename_tag", mock_rename_tag)
+
+        response = test_app_without_db.post(
+            "/tags/rename/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 200
+        assert mock_get_tag_by_name.call_args_list[0].kwargs["tag_name"] == "ml"
+        mock_rename_tag.assert_called_once_with(
+            tag_id=1, new_name="machine-learning", db_session=ANY
+        )
+
+    def test_rename_tag_cannot_rename_to_a_blank_name(self, test_app_without_db):
+        test_request_payload = {"name": "ml", "new_name": " \t "}
+
+        response = test_app_without_db.post(
+            "/tags/rename/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+
+    def test_rename_tag_cannot_rename_to_a_name_too_long_once_normalized(
+        self, test_app_without_db
+    ):
+        # 6 characters, 36 once NFKC normalised
+        test_request_payload = {"name": "ml", "new_name": "㎯" * 6}
+
+        response = test_app_without_db.post(
+            "/tags/rename/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+        assert "longer than 32 characters" in response.text
+
+    def test_rename_tag_cannot_rename_inexistent_tag(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"name": "ml", "new_name": "machine-learning"}
+
+        async def mock_get_tag_by_name(tag_name, db_session):
+            return None
+
+        monkeypatch.setattr(tags, "get_tag_by_name", mock_get_tag_by_name)
+
+        response = test_app_without_db.post(
+            "/tags/rename/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Tag 'ml' not found."
+
+    def test_rename_tag_cannot_rename_to_an_already_existing_tag(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"name": "ml", "new_name": "machine-learning"}
+
+        async def mock_get_tag_by_name(tag_name, db_session):
+            return MockTag(id=1, name=tag_name)
+
+        monkeypatch.setattr(tags, "get_tag_by_name", mock_get_tag_by_name)
+
+        mock_rename_tag = AsyncMock(
+            side_effect=unique_violation("ix_tags_normalized_name")
+        )
+        monkeypatch.setattr(tags, "rename_tag", mock_rename_tag)
+
+        response = test_app_without_db.post(
+            "/tags/rename/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == (
+            "Tag 'machine-learning' already exists. Merge the two tags"
+            " instead of renaming."
+        )
+
+
+class TestMergeTags:
+    def test_merge_tags_happy_path(self, test_app_without_db, monkeypatch):
+        test_request_payload = {"source": "ml", "target": "machine-learning"}
+
+        async def mock_get_tag_by_name(tag_name, db_session):
+            tag_ids = {"ml": 1, "machine-learning": 2}
+            return MockTag(id=tag_ids[tag_name], name=tag_name)
+
+        monkeypatch.setattr(tags, "get_tag_by_name", mock_get_tag_by_name)
+
+        mock_merge_tags = AsyncMock(return_value=5)
+        monkeypatch.setattr(tags, "merge_tags", mock_merge_tags)
+
+        response = test_app_without_db.post(
+            "/tags/merge/", data=json.dumps(test_request_payload)
+        )
+
+        mock_merge_tags.assert_called_once_with(
+            source_id=1, target_id=2, db_session=ANY
+        )
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": 2,
+            "name": "machine-learning",
+            "moved_notes": 5,
+        }
+
+    def test_merge_tags_cannot_merge_inexistent_target_tag(
+        self, test_app_without_db, monkeypatch
+    ):
+        test_request_payload = {"source": "ml", "target": "machine-learning"}
+
+        async def mock_get_tag_by_name(tag_name, db_session):
+            if tag_name == "ml":
+                return MockTag(id=1, name="ml")
+            return None
+
+        monkeypatch.setattr(tags, "get_tag_by_name", mock_get_tag_by_name)
+
+        response = test_app_without_db.post(
+            "/tags/merge/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Tag 'machine-learning' not found."
+
+    def test_merge_tags_cannot_merge_tag_into_itself(self, test_app_without_db):
+        test_request_payload = {"source": "ml", "target": "ml"}
+
+        response = test_app_without_db.post(
+            "/tags/merge/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422
+
+    def test_merge_tags_cannot_merge_tag_into_a_variant_of_itself(
+        self, test_app_without_db
+    ):
+        test_request_payload = {"source": "ML", "target": "ml "}
+
+        response = test_app_without_db.post(
+            "/tags/merge/", data=json.dumps(test_request_payload)
+        )
+
+        assert response.status_code == 422